@@ -1,6 +1,6 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, Index, JSON
 from app.shared.config.db import Base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, synonym
 from app.models.interfaces import GroupType, EducationLevel
 
 
@@ -16,6 +16,19 @@ class Forum(Base):
     grade = Column(Integer, nullable=False)
     privacy = Column(Enum(GroupType), nullable=False)
     user_name = Column(String(100), nullable=False)
-    id_user = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    id_user = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
     password = Column(String(255), nullable=True, default=None)
+    # Variantes redimensionadas {nombre: url} de cada imagen (ver app/shared/utils/image_variants.py)
+    image_variants = Column(JSON(none_as_null=True), nullable=True)
+    background_image_variants = Column(JSON(none_as_null=True), nullable=True)
+    # Contadores mantenidos por los endpoints de posts y membresias (ver app/shared/utils/counters.py)
+    post_count = Column(Integer, nullable=False, default=0, server_default="0")
+    member_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Nombre usado por ForumResponse
+    users_count = synonym("member_count")
+
+    __table_args__ = (
+        Index("ix_forum_grade_education_level", "grade", "education_level"),
+        Index("ix_forum_creation_date_id_forum", "creation_date", "id_forum"),
+    )
     
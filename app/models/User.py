@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, LargeBinary
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, LargeBinary, UniqueConstraint, JSON, Index
 from app.shared.config.db import Base
 from sqlalchemy.orm import relationship
 from app.models.interfaces import EducationLevel, State
@@ -10,8 +10,11 @@ class User(Base):
     name = Column(String(255), nullable=False)
     background_image_url = Column(Text, nullable=True)
     profile_image_url = Column(Text, nullable=True)
+    # Variantes redimensionadas {nombre: url} de cada imagen (ver app/shared/utils/image_variants.py)
+    profile_image_variants = Column(JSON(none_as_null=True), nullable=True)
+    background_image_variants = Column(JSON(none_as_null=True), nullable=True)
     lastname = Column(String(255), nullable=False)
-    mail = Column(String(255), nullable=False)
+    mail = Column(String(255), nullable=False, unique=True, index=True)
     password = Column(String(255), nullable=False)
     user_type = Column(String(255), nullable=False)
     education_level = Column(Enum(EducationLevel), nullable=False)
@@ -19,6 +22,12 @@ class User(Base):
     creation_date = Column(DateTime, nullable=False)
     state = Column(Enum(State), nullable=True, default=State.Activo)
     deleted = Column(Boolean, nullable=True, default=False)
+    # Contadores mantenidos por follow/unfollow (ver app/shared/utils/counters.py)
+    follower_count = Column(Integer, nullable=False, default=0, server_default="0")
+    following_count = Column(Integer, nullable=False, default=0, server_default="0")
+    # Momento en que se construyo el timeline del feed (ver app/shared/utils/timeline.py); un
+    # timeline vacio no obliga a recalcularlo en cada peticion
+    timeline_built_at = Column(DateTime, nullable=True)
 
     # Relación inversa con SalePost
     sale_posts = relationship("SalePost", back_populates="seller")
@@ -30,3 +39,11 @@ class Follower(Base):
     id_user = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)  # User being followed
     follower_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)  # User who follows
 
+    # Un usuario solo puede seguir una vez a otro; el indice tambien cubre las busquedas por id_user.
+    # Los listados de seguidores y seguidos se paginan por id_follower desde estos indices.
+    __table_args__ = (
+        UniqueConstraint("id_user", "follower_id", name="uq_follower_user_follower"),
+        Index("ix_follower_id_user_id_follower", "id_user", "id_follower"),
+        Index("ix_follower_follower_id_id_follower", "follower_id", "id_follower"),
+    )
+
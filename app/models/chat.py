@@ -1,4 +1,4 @@
-from sqlalchemy import Column, ForeignKey, Integer
+from sqlalchemy import Column, ForeignKey, Integer, Index
 from app.shared.config.db import Base
 
 
@@ -6,4 +6,6 @@ class Chat(Base):
     __tablename__ = "chat"
     id_chat = Column(Integer, primary_key=True, autoincrement=True)
     sender_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
-    receiver_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    receiver_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
+
+    __table_args__ = (Index("ix_chat_sender_id_receiver_id", "sender_id", "receiver_id"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from app.shared.config.db import Base
 import enum
@@ -12,4 +12,9 @@ class Comment(Base):
     comment_text = Column(Text, nullable=False)
     comment_date = Column(DateTime, nullable=False)
     post_id = Column(Integer, ForeignKey("forum_posts.id_post", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
-    post = relationship("ForumPosts", back_populates="comments")
\ No newline at end of file
+    post = relationship("ForumPosts", back_populates="comments")
+
+    __table_args__ = (
+        Index("ix_comment_post_id_comment_date", "post_id", "comment_date", "id_comment"),
+        Index("ix_comment_user_id", "user_id"),
+    )
\ No newline at end of file
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, JSON
 from sqlalchemy.orm import relationship
 from app.shared.config.db import Base
 import enum
@@ -6,8 +6,10 @@ import enum
 class Files(Base):
     __tablename__ = "post_files"
     id_file = Column(Integer, primary_key=True, autoincrement=True)
-    post_id = Column(Integer, ForeignKey("forum_posts.id_post", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    post_id = Column(Integer, ForeignKey("forum_posts.id_post", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
     url = Column(String(255), nullable=False)
+    # Variantes redimensionadas {nombre: url}, generadas en segundo plano (ver app/shared/utils/image_variants.py)
+    variants = Column(JSON(none_as_null=True), nullable=True)
     
     # Relación con ForumPosts
     post = relationship("ForumPosts", back_populates="files")
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, Index
 from sqlalchemy.orm import relationship
 from app.shared.config.db import Base
 import enum
@@ -12,10 +12,19 @@ class ForumPosts(Base):
     publication_date = Column(DateTime, nullable=False)
     forum_id = Column(Integer, ForeignKey("forum.id_forum", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     user_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
-    tag = Column(String(100), nullable=True)
+    tag = Column(String(100), nullable=True, index=True)
+    # Contador mantenido por los endpoints de comentarios (ver app/shared/utils/counters.py)
+    comment_count = Column(Integer, nullable=False, default=0, server_default="0")
     user = relationship("User", backref="posts")
     comments = relationship("Comment", back_populates="post", cascade="all, delete-orphan")
     files = relationship("Files", back_populates="post", cascade="all, delete-orphan")
+
+    # Indices alineados con la clave de paginacion (publication_date, id_post)
+    __table_args__ = (
+        Index("ix_forum_posts_publication_date_id_post", "publication_date", "id_post"),
+        Index("ix_forum_posts_forum_id_publication_date", "forum_id", "publication_date", "id_post"),
+        Index("ix_forum_posts_user_id_publication_date", "user_id", "publication_date", "id_post"),
+    )
     
 
 
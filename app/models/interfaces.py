@@ -38,3 +38,8 @@ class UserType(enum.Enum):
     User = "User"
     Admin = "Admin"
 
+
+class JobStatus(enum.Enum):
+    Pendiente = "Pendiente"
+    EnCurso = "EnCurso"
+    Fallido = "Fallido"
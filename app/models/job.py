@@ -0,0 +1,24 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, Enum, Index, Integer, JSON, String, Text
+from app.shared.config.db import Base
+from app.models.interfaces import JobStatus
+
+
+# Trabajo en segundo plano (ver app/shared/utils/jobs.py). Se inserta en la misma transaccion
+# que la escritura que lo origina y se borra al completarse; los que agotan sus reintentos
+# quedan como Fallido para inspeccionarlos o reintentarlos desde /jobs/failed
+class Job(Base):
+    __tablename__ = "job"
+    id_job = Column(Integer, primary_key=True, autoincrement=True)
+    kind = Column(String(100), nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.Pendiente)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_at = Column(DateTime, nullable=False, default=datetime.now)
+    locked_at = Column(DateTime, nullable=True)
+    locked_by = Column(String(100), nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, nullable=False, default=datetime.now)
+
+    __table_args__ = (Index("ix_job_status_run_at", "status", "run_at"),)
@@ -1,4 +1,5 @@
-from sqlalchemy import Column, ForeignKey, Integer, Text, DateTime
+from datetime import datetime
+from sqlalchemy import Column, ForeignKey, Integer, Text, DateTime, Index
 from app.shared.config.db import Base
 
 class Message(Base):
@@ -7,4 +8,14 @@ class Message(Base):
     sender_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     chat_id = Column(Integer, ForeignKey("chat.id_chat", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
     message = Column(Text, nullable=False)
-    date_message = Column(DateTime, nullable=False)
\ No newline at end of file
+    date_message = Column(DateTime, nullable=False)
+    # Cualquier cambio (creacion, edicion o borrado) actualiza updated_at para la sincronizacion incremental
+    updated_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+    # Borrado logico: el mensaje se conserva vacio para poder informar el borrado a los clientes
+    deleted_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_messages_chat_id_date_message", "chat_id", "date_message", "id_message"),
+        Index("ix_messages_sender_id", "sender_id"),
+        Index("ix_messages_chat_id_updated_at", "chat_id", "updated_at", "id_message"),
+    )
@@ -0,0 +1,27 @@
+from datetime import datetime
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, UniqueConstraint
+from app.shared.config.db import Base
+
+
+# Ultimo mensaje leido por cada participante de un chat; los mensajes con id mayor
+# (enviados por el otro participante) cuentan como no leidos
+class ChatReadMarker(Base):
+    __tablename__ = "chat_read_marker"
+    id_marker = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    chat_id = Column(Integer, ForeignKey("chat.id_chat", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
+    last_read_message_id = Column(Integer, nullable=False, default=0)
+    read_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (UniqueConstraint("user_id", "chat_id", name="uq_chat_read_marker_user_chat"),)
+
+
+class SaleChatReadMarker(Base):
+    __tablename__ = "sale_chat_read_marker"
+    id_marker = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    sale_chat_id = Column(Integer, ForeignKey("sale_chat.id_sale_chat", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
+    last_read_message_id = Column(Integer, nullable=False, default=0)
+    read_at = Column(DateTime, nullable=False, default=datetime.now, onupdate=datetime.now)
+
+    __table_args__ = (UniqueConstraint("user_id", "sale_chat_id", name="uq_sale_chat_read_marker_user_sale_chat"),)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, Numeric
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, String, Boolean, Enum, Text, Numeric, Index, JSON
 from sqlalchemy.orm import relationship
 from app.shared.config.db import Base
 from app.models.interfaces import PostStatus, SaleType
@@ -12,11 +12,18 @@ class SalePost(Base):
     description = Column(Text, nullable=False)
     price = Column(Numeric(10, 2), nullable=False)
     image_url = Column(Text, nullable=True)
+    # Variantes redimensionadas {nombre: url} (ver app/shared/utils/image_variants.py)
+    image_variants = Column(JSON(none_as_null=True), nullable=True)
     publication_date = Column(DateTime, nullable=False)
-    sale_type = Column(Enum(SaleType), nullable=False)
+    sale_type = Column(Enum(SaleType), nullable=False, index=True)
     status = Column(Enum(PostStatus), nullable=True, default=PostStatus.Disponible)
     seller_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
 
     # Definir la relación con el modelo User
     seller = relationship("User", back_populates="sale_posts")  # Asegúrate de que 'User' tenga la relación inversa
 
+    __table_args__ = (
+        Index("ix_sale_posts_seller_id_status", "seller_id", "status"),
+        Index("ix_sale_posts_publication_date_id_sale_post", "publication_date", "id_sale_post"),
+    )
+
@@ -0,0 +1,17 @@
+from sqlalchemy import Column, DateTime, ForeignKey, Index, Integer, UniqueConstraint
+from app.shared.config.db import Base
+
+
+# Timeline precalculado de cada usuario (fan-out on write): una fila por post que debe ver
+# en su feed. publication_date se copia del post para paginar sin unir con forum_posts
+class TimelineEntry(Base):
+    __tablename__ = "timeline_entry"
+    id_entry = Column(Integer, primary_key=True, autoincrement=True)
+    user_id = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    post_id = Column(Integer, ForeignKey("forum_posts.id_post", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
+    publication_date = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "post_id", name="uq_timeline_entry_user_post"),
+        Index("ix_timeline_entry_user_id_publication_date", "user_id", "publication_date", "post_id"),
+    )
@@ -1,10 +1,13 @@
-from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey
+from sqlalchemy import Column, DateTime, Integer, String, Boolean, ForeignKey, UniqueConstraint
 from app.shared.config.db import Base
 
 class UserForum(Base):
     __tablename__ = "user_forum"
     id_member = Column(Integer, primary_key=True, autoincrement=True, index=True)
     id_user = Column(Integer, ForeignKey("user.id_user", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
-    id_forum = Column(Integer, ForeignKey("forum.id_forum", ondelete="CASCADE", onupdate="CASCADE"), nullable=False)
+    id_forum = Column(Integer, ForeignKey("forum.id_forum", ondelete="CASCADE", onupdate="CASCADE"), nullable=False, index=True)
     join_date = Column(DateTime, nullable=False)
 
+    # Un usuario pertenece una sola vez a cada foro; el indice tambien cubre las busquedas por id_user
+    __table_args__ = (UniqueConstraint("id_user", "id_forum", name="uq_user_forum_user_forum"),)
+
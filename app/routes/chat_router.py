@@ -4,11 +4,13 @@ from sqlalchemy.orm import Session
 from typing import List
 from app.models.User import User
 from app.models.chat import Chat
-from app.schemas.chat_schema import ChatCreate, ChatResponse, SaleChatResponse
+from app.schemas.chat_schema import ChatCreate, ChatResponse, InboxChatResponse, InboxSaleChatResponse, SaleChatResponse
+from app.schemas.message_schema import MessageResponse, SaleMessageResponse
 from app.schemas.user_schema import UserResponse
 from app.shared.config.db import get_db
 from app.routes.user_router import get_current_user
 from app.models.sale_schat import SaleChat
+from app.shared.utils.inbox import CHAT_INBOX, SALE_CHAT_INBOX, load_inbox, mark_read
 
 chatRoutes = APIRouter()
 
@@ -22,8 +24,10 @@ async def create_chat(receiver_id: int, db: Session = Depends(get_db), current_u
     # Comprobar si ya existe un chat con este usuario pero con las ids invertidas
     if db.query(Chat).filter(Chat.sender_id == receiver_id, Chat.receiver_id == current_user.id_user).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Este chat ya existe")
-    sender = db.query(User).filter(User.id_user == current_user.id_user).first()
+    sender = current_user
     receiver = db.query(User).filter(User.id_user == receiver_id).first()
+    if not receiver:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
     db_chat = Chat(sender_id=current_user.id_user, receiver_id=receiver_id)
     db.add(db_chat)
     db.commit()
@@ -42,6 +46,27 @@ async def get_all_chats(db: Session = Depends(get_db), current_user: int = Depen
         result.append(chat_response)
     return result
 
+# Inbox: chats del usuario actual con ambos participantes, el ultimo mensaje y los no leidos,
+# ordenados por actividad reciente. Debe declararse antes de /chat/{id_chat}
+@chatRoutes.get('/chat/inbox', response_model=List[InboxChatResponse], tags=["Chats"])
+async def get_chat_inbox(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    entries, users = load_inbox(db, CHAT_INBOX, current_user.id_user)
+    result = []
+    for chat, last_message, unread_count in entries:
+        last = None
+        if last_message is not None:
+            last = MessageResponse(id_message=last_message.id_message, message=last_message.message, chat_id=last_message.chat_id, sender=UserResponse.model_validate(users[last_message.sender_id]), date_message=last_message.date_message)
+        result.append(InboxChatResponse(id_chat=chat.id_chat, sender=users[chat.sender_id], receiver=users[chat.receiver_id], last_message=last, unread_count=unread_count))
+    return result
+
+# Marcar como leidos los mensajes de un chat para el usuario actual
+@chatRoutes.post('/chat/{id_chat}/read', status_code=status.HTTP_204_NO_CONTENT, tags=["Chats"])
+async def mark_chat_read(id_chat: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    chat = db.query(Chat).filter(Chat.id_chat == id_chat).first()
+    if not chat or current_user.id_user not in (chat.sender_id, chat.receiver_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat not found")
+    mark_read(db, CHAT_INBOX, id_chat, current_user.id_user)
+
 # Obtener un chat por ID
 @chatRoutes.get('/chat/{id_chat}', response_model=ChatResponse, tags=["Chats"])
 async def get_chat_by_id(id_chat: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
@@ -109,6 +134,26 @@ async def get_sale_chats_by_user(id_user: int, db: Session = Depends(get_db), cu
     sale_chats = db.query(SaleChat).filter((SaleChat.seller_id == id_user) | (SaleChat.buyer_id == id_user)).all()
     return [SaleChatResponse(id_sale_chat=sale_chat.id_sale_chat, seller=UserResponse.from_orm(db.query(User).filter(User.id_user == sale_chat.seller_id).first()), buyer=UserResponse.from_orm(db.query(User).filter(User.id_user == sale_chat.buyer_id).first())) for sale_chat in sale_chats]
 
+# Inbox de chats de venta del usuario actual. Debe declararse antes de /sale_chat/{id_sale_chat}
+@chatRoutes.get('/sale_chat/inbox', response_model=List[InboxSaleChatResponse], tags=["Sale Chat"])
+async def get_sale_chat_inbox(db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    entries, users = load_inbox(db, SALE_CHAT_INBOX, current_user.id_user)
+    result = []
+    for sale_chat, last_message, unread_count in entries:
+        last = None
+        if last_message is not None:
+            last = SaleMessageResponse(id_sale_message=last_message.id_sale_message, message=last_message.message, sale_chat_id=last_message.sale_chat_id, sender=UserResponse.model_validate(users[last_message.sender_id]), date_message=last_message.date_message)
+        result.append(InboxSaleChatResponse(id_sale_chat=sale_chat.id_sale_chat, seller=users[sale_chat.seller_id], buyer=users[sale_chat.buyer_id], last_message=last, unread_count=unread_count))
+    return result
+
+# Marcar como leidos los mensajes de un chat de venta para el usuario actual
+@chatRoutes.post('/sale_chat/{id_sale_chat}/read', status_code=status.HTTP_204_NO_CONTENT, tags=["Sale Chat"])
+async def mark_sale_chat_read(id_sale_chat: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    sale_chat = db.query(SaleChat).filter(SaleChat.id_sale_chat == id_sale_chat).first()
+    if not sale_chat or current_user.id_user not in (sale_chat.seller_id, sale_chat.buyer_id):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale chat not found")
+    mark_read(db, SALE_CHAT_INBOX, id_sale_chat, current_user.id_user)
+
 # Obtener un chat de venta por ID
 @chatRoutes.get('/sale_chat/{id_sale_chat}', response_model=SaleChatResponse, tags=["Sale Chat"])
 async def get_sale_chat_by_id(id_sale_chat: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
@@ -1,15 +1,38 @@
 from datetime import datetime
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 from typing import List
 from app.models.User import User
 from app.models.comment import Comment
-from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentResponseWithUser
+from app.models.forum_posts import ForumPosts
+from app.schemas.comment_schema import CommentCreate, CommentResponse, CommentResponseWithUser, CommentThread
 from app.shared.config.db import get_db
+from app.schemas.pagination_schema import Page
+from app.shared.utils.pagination import PageParams, paginate
 from app.routes.user_router import get_current_user
+from app.shared.middlewares.response_cache import response_cache
+from app.shared.utils.counters import adjust_counter
 
 commentRoutes = APIRouter()
 
+
+# Respuestas con autor: los autores de todos los comentarios se cargan en una sola consulta
+def _comments_with_user(db: Session, comments) -> List[CommentResponseWithUser]:
+    user_ids = {comment.user_id for comment in comments}
+    users = {user.id_user: user for user in db.query(User).filter(User.id_user.in_(user_ids)).all()} if user_ids else {}
+    return [
+        CommentResponseWithUser(
+            id_comment=comment.id_comment,
+            comment_text=comment.comment_text,
+            post_id=comment.post_id,
+            comment_date=comment.comment_date,
+            user_id=comment.user_id,
+            user=users[comment.user_id]
+        )
+        for comment in comments
+    ]
+
 # Crear un nuevo comentario
 @commentRoutes.post('/comment/', status_code=status.HTTP_201_CREATED, response_model=CommentResponse, tags=["Comentarios"])
 async def create_comment(comment: CommentCreate, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
@@ -19,14 +42,17 @@ async def create_comment(comment: CommentCreate, db: Session = Depends(get_db),
         user_id=current_user.id_user
     )
     db.add(db_comment)
+    adjust_counter(db, ForumPosts.comment_count, db_comment.post_id, 1)
     db.commit()
+    # El detalle del post incluye comment_count
+    await response_cache.invalidate(f"post:{db_comment.post_id}")
     return db_comment
 
 # Obtener todos los comentarios
-@commentRoutes.get('/comment/', response_model=List[CommentResponse], tags=["Comentarios"])
-async def get_comments(db: Session = Depends(get_db)):
-    comments = db.query(Comment).all()
-    return comments
+@commentRoutes.get('/comment/', response_model=Page[CommentResponse], tags=["Comentarios"])
+async def get_comments(page: PageParams = Depends(), db: Session = Depends(get_db)):
+    comments, next_cursor = paginate(db.query(Comment), (Comment.comment_date, Comment.id_comment), page.cursor, page.limit)
+    return Page[CommentResponse](items=comments, next_cursor=next_cursor)
 
 # Obtener un comentario por ID
 @commentRoutes.get('/comment/{id_comment}', response_model=CommentResponse, tags=["Comentarios"])
@@ -53,14 +79,24 @@ async def delete_comment(id_comment: int, db: Session = Depends(get_db)):
     db_comment = db.query(Comment).filter(Comment.id_comment == id_comment).first()
     if not db_comment:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Comment not found")
+    post_id = db_comment.post_id
     db.delete(db_comment)
+    adjust_counter(db, ForumPosts.comment_count, post_id, -1)
     db.commit()
+    await response_cache.invalidate(f"post:{post_id}")
     
 # Obtener comentarios por ID de post
 @commentRoutes.get('/comments/post/{post_id}', response_model=List[CommentResponseWithUser], tags=["Comentarios"])
 async def get_comments_by_post_id(post_id: int, db: Session = Depends(get_db)):
-    comments = db.query(Comment).filter(Comment.post_id == post_id).all()
-    for comment in comments:
-        user = db.query(User).filter(User.id_user == comment.user_id).first()
-        comment.user = user
-    return comments
+    comments = db.query(Comment).filter(Comment.post_id == post_id).order_by(Comment.comment_date, Comment.id_comment).all()
+    return _comments_with_user(db, comments)
+
+# Hilo de comentarios de un post paginado del mas antiguo al mas reciente, con el total de
+# comentarios. Usa tres consultas sin importar el largo del hilo: la pagina (indice
+# (post_id, comment_date, id_comment)), los autores y el COUNT.
+@commentRoutes.get('/comments/post/{post_id}/thread', response_model=CommentThread, tags=["Comentarios"])
+async def get_comment_thread(post_id: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(Comment).filter(Comment.post_id == post_id)
+    comments, next_cursor = paginate(query, (Comment.comment_date, Comment.id_comment), page.cursor, page.limit, descending=False)
+    total = db.query(func.count(Comment.id_comment)).filter(Comment.post_id == post_id).scalar()
+    return CommentThread(items=_comments_with_user(db, comments), next_cursor=next_cursor, total=total)
@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.orm import Session
+from app.models.User import User
+from app.schemas.pagination_schema import Page
+from app.schemas.post_schema import PostResponse
+from app.shared.config.db import get_db
+from app.shared.utils.pagination import PageParams, paginate
+from app.shared.utils.post_hydration import build_post_responses
+from app.shared.utils.timeline import ensure_timeline, feed_query
+from app.routes.user_router import get_current_user
+
+feedRoutes = APIRouter()
+
+# Feed de inicio del usuario actual: posts de sus foros y de los usuarios que sigue,
+# del mas reciente al mas antiguo. Cada pagina lee solo page.limit entradas del timeline
+@feedRoutes.get('/feed/', response_model=Page[PostResponse], tags=["Feed"])
+async def get_home_feed(page: PageParams = Depends(), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    ensure_timeline(db, current_user.id_user)
+    query, columns = feed_query(db, current_user.id_user)
+    rows, next_cursor = paginate(query, columns, page.cursor, page.limit)
+    return Page[PostResponse](items=build_post_responses(db, [row.id_post for row in rows]), next_cursor=next_cursor)
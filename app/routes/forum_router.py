@@ -1,3 +1,4 @@
+import asyncio
 from datetime import datetime
 from fastapi import APIRouter, Depends, Form, HTTPException, status, File, UploadFile
 from sqlalchemy.orm import Session
@@ -8,25 +9,28 @@ from app.models.User import User
 from app.schemas.user_schema import UserResponse
 from app.schemas.forum_schema import ForumCreate, ForumResponse, ForumResponseWithCreator
 from app.schemas.user_forum_schema import UserForumResponse
+from app.schemas.upload_schema import ConfirmForumImages
+from app.schemas.pagination_schema import Page
+from app.shared.utils.pagination import PageParams, paginate
+from app.shared.utils.counters import adjust_counter
+from app.shared.utils.forum_hydration import attach_forum_stats
+from app.shared.utils.image_variants import image_pipeline
+from app.shared.utils.timeline import on_forum_joined, on_forum_left
 from app.shared.config.db import get_db
+from app.shared.config.s3_files import upload_service
 from app.routes.user_router import get_current_user
-from app.shared.middlewares.security import get_password_hash, verify_password
-import boto3
-import os
-from dotenv import load_dotenv
-import time
+from app.shared.middlewares.security import get_password_hash_async, verify_password_async
+from app.shared.middlewares.response_cache import CachedRoute, cache_response, response_cache
 
-forumRoutes = APIRouter()
+forumRoutes = APIRouter(route_class=CachedRoute)
 
-load_dotenv()
 
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("aws_access_key_id"),
-    aws_secret_access_key=os.getenv("aws_secret_access_key"),
-    aws_session_token=os.getenv("aws_session_token"),
-    region_name=os.getenv("AWS_REGION", "us-east-1")
-)
+# Sube la imagen y el fondo del foro en paralelo; devuelve None para las que no se enviaron
+async def _upload_forum_images(image: UploadFile | None, background_image: UploadFile | None):
+    async def upload(file):
+        return await upload_service.upload(file) if file else None
+    return await asyncio.gather(upload(image), upload(background_image))
+
 
 # Crear un nuevo foro
 @forumRoutes.post('/forum/', status_code=status.HTTP_201_CREATED, response_model=ForumResponseWithCreator, tags=["Foros"])
@@ -56,13 +60,14 @@ async def create_forum(
             detail="La contraseña es obligatoria para foros privados"
         )
     
-    hashed_password = get_password_hash(password) if password else None
+    hashed_password = await get_password_hash_async(password) if password else None
     db_forum = Forum(
         **forum.model_dump(exclude={'creation_date', 'user_name', 'password'}),
         creation_date=datetime.now(),
         user_name=current_user.name,
         id_user=current_user.id_user,
-        password=hashed_password
+        password=hashed_password,
+        member_count=1
     )
     
     # if db_forum.background_image_url is None:
@@ -70,68 +75,54 @@ async def create_forum(
     # if db_forum.image_url is None:
     #     db_forum.image_url = "https://educalinkbucket.s3.us-east-1.amazonaws.com/default_user.png"
         
-    # Si se ingresaron imagenes entonces subirlas a S3
-    if image:
-        file_key = f"{int(time.time())}_{image.filename}"
-        s3.upload_fileobj(image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': image.content_type})
-        db_forum.image_url = f"https://educalinkbucket.s3.us-east-1.amazonaws.com/{file_key}"
-    else:
-        db_forum.image_url = "https://educalinkbucket.s3.us-east-1.amazonaws.com/default_group.png"
-    if background_image:
-        file_key = f"{int(time.time())}_{background_image.filename}"
-        s3.upload_fileobj(background_image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': background_image.content_type})
-        db_forum.background_image_url = f"https://educalinkbucket.s3.us-east-1.amazonaws.com/{file_key}"
-    else:
-        db_forum.background_image_url = "https://educalinkbucket.s3.us-east-1.amazonaws.com/default_portrait_white.png"
+    # Si se ingresaron imagenes entonces subirlas a S3 (ambas en paralelo)
+    image_url, background_image_url = await _upload_forum_images(image, background_image)
+    db_forum.image_url = image_url or "https://educalinkbucket.s3.us-east-1.amazonaws.com/default_group.png"
+    db_forum.background_image_url = background_image_url or "https://educalinkbucket.s3.us-east-1.amazonaws.com/default_portrait_white.png"
         
     db_forum.creator = current_user
     db.add(db_forum)
-    db.commit()
-    db.refresh(db_forum)
-    
-    # Unir al usuario al foro recién creado
-    user_forum = UserForum(
+    db.flush()
+
+    # Unir al usuario al foro recién creado, en la misma transaccion
+    db.add(UserForum(
         id_user=current_user.id_user,
         id_forum=db_forum.id_forum,
         join_date=datetime.now()
-    )
-    
-    db.add(user_forum)
+    ))
+    image_pipeline.schedule(db, "forum_image", image_url)
+    image_pipeline.schedule(db, "forum_background", background_image_url)
     db.commit()
-    db.refresh(user_forum)
+    db.refresh(db_forum)
+    await response_cache.invalidate("forums")
 
     return db_forum
 
 # Obtener todos los foros
-@forumRoutes.get('/forum/', response_model=List[ForumResponseWithCreator], tags=["Foros"])
-async def get_forums(db: Session = Depends(get_db)):
-    forums = db.query(Forum).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum.id_forum).all()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
-    return forums
+@forumRoutes.get('/forum/', response_model=Page[ForumResponseWithCreator], tags=["Foros"])
+@cache_response(ttl=60, tags=lambda params: ["forums"])
+async def get_forums(page: PageParams = Depends(), include_users: bool = False, db: Session = Depends(get_db)):
+    forums, next_cursor = paginate(db.query(Forum), (Forum.creation_date, Forum.id_forum), page.cursor, page.limit)
+    attach_forum_stats(db, forums, include_users=include_users)
+    return Page[ForumResponseWithCreator](items=forums, next_cursor=next_cursor)
 
 # Obtener un foro por ID
 @forumRoutes.get('/forum/{forum_id}', response_model=ForumResponseWithCreator, tags=["Foros"])
-async def get_forum(forum_id: int, db: Session = Depends(get_db)):
+@cache_response(ttl=60, tags=lambda params: [f"forum:{params['forum_id']}"])
+async def get_forum(forum_id: int, include_users: bool = False, db: Session = Depends(get_db)):
     forum = db.query(Forum).filter(Forum.id_forum == forum_id).first()
     if not forum:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foro no encontrado")
-    forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum_id).count()
-    forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum_id).all()
-    forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, [forum], include_users=include_users)
     return forum
 
 # Obtener un foro por nombre
 @forumRoutes.get('/forum/name/{name}', response_model=ForumResponseWithCreator, tags=["Foros"])
-async def get_forum_by_name(name: str, db: Session = Depends(get_db)):
+async def get_forum_by_name(name: str, include_users: bool = False, db: Session = Depends(get_db)):
     forum = db.query(Forum).filter(Forum.name == name).first()
     if not forum:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foro no encontrado")
-    forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-    forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum.id_forum).all()
-    forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, [forum], include_users=include_users)
     return forum
 
 
@@ -162,30 +153,54 @@ async def update_forum(
     if description is not None:
         db_forum.description = description
     if password is not None and privacy == GroupType.Privado:
-        db_forum.password = get_password_hash(password)
+        db_forum.password = await get_password_hash_async(password)
     if education_level is not None:
         db_forum.education_level = education_level
     if grade is not None:
         db_forum.grade = grade
-    if image:
-        file_key = f"{int(time.time())}_{image.filename}"
-        s3.upload_fileobj(image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': image.content_type})
-        db_forum.image_url = f"https://educalinkbucket.s3.us-east-1.amazonaws.com/{file_key}"
-    else:
-        db_forum.image_url = db_forum.image_url
-    if background_image:
-        file_key = f"{int(time.time())}_{background_image.filename}"
-        s3.upload_fileobj(background_image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': background_image.content_type})
-        db_forum.background_image_url = f"https://educalinkbucket.s3.us-east-1.amazonaws.com/{file_key}"
-    else:
-        db_forum.background_image_url = db_forum.background_image_url
+    image_url, background_image_url = await _upload_forum_images(image, background_image)
+    if image_url:
+        db_forum.image_url = image_url
+    if background_image_url:
+        db_forum.background_image_url = background_image_url
     db_forum.privacy = privacy
+    image_pipeline.schedule(db, "forum_image", image_url)
+    image_pipeline.schedule(db, "forum_background", background_image_url)
     db.commit()
     db.refresh(db_forum)
 
-    # Agregar el creador a la respuesta
-    db_forum.creator = db.query(User).filter(User.id_user == db_forum.id_user).first()
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
+
+    # Agregar el creador y el numero de miembros a la respuesta
+    attach_forum_stats(db, [db_forum])
+
+    return db_forum
 
+# Confirmar imagenes del foro subidas con URL prefirmada (/upload/presign)
+@forumRoutes.post('/forum/{forum_id}/images/confirm', response_model=ForumResponseWithCreator, tags=["Foros"])
+async def confirm_forum_images(
+    forum_id: int,
+    confirmation: ConfirmForumImages,
+    db: Session = Depends(get_db),
+    current_user: int = Depends(get_current_user)
+):
+    db_forum = db.query(Forum).filter(Forum.id_forum == forum_id).first()
+    if not db_forum:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foro no encontrado")
+    if db_forum.id_user != current_user.id_user:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No puedes modificar este foro")
+    keys = {"image_url": confirmation.image_key, "background_image_url": confirmation.background_image_key}
+    keys = {field: key for field, key in keys.items() if key}
+    urls = await upload_service.confirm_many(current_user.id_user, list(keys.values()))
+    if None in urls:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Archivo no encontrado o no válido")
+    for field, url in zip(keys.keys(), urls):
+        setattr(db_forum, field, url)
+    image_pipeline.schedule_fields(db, db_forum, keys.keys())
+    db.commit()
+    db.refresh(db_forum)
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
+    attach_forum_stats(db, [db_forum])
     return db_forum
 
 # Eliminar un foro
@@ -197,6 +212,7 @@ async def delete_forum(forum_id: int, db: Session = Depends(get_db), current_use
         
     db.delete(db_forum)
     db.commit()
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
     return
 
 # Funcion para obtener todos los usuarios de un foro
@@ -209,12 +225,10 @@ async def get_users_by_forum(forum_id: int, db: Session = Depends(get_db)):
 
 # Funcion para obtener los foros en base a education_level
 @forumRoutes.get('/forum/education_level/{education_level}', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
+@cache_response(ttl=60, tags=lambda params: ["forums"])
 async def get_forums_by_education_level(education_level: str, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.education_level == education_level).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum.id_forum).all()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Funcion para obtener un foro por nombre
@@ -223,9 +237,7 @@ async def get_forum_by_name(name: str, db: Session = Depends(get_db)):
     forum = db.query(Forum).filter(Forum.name == name).first()
     if not forum:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foro no encontrado")
-    forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-    forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum.id_forum).all()
-    forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, [forum], include_creator=False)
     return forum  
 
 # Funcion para unir un usuario a un foro
@@ -236,7 +248,7 @@ async def join_forum(forum_id: int, password: str | None = '', db: Session = Dep
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Foro no encontrado")
     
     if db_forum.privacy == GroupType.Privado and db_forum.password:
-        if not verify_password(password, db_forum.password):
+        if not await verify_password_async(password, db_forum.password):
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Contraseña incorrecta")
     if db.query(UserForum).filter(UserForum.id_user == current_user.id_user, UserForum.id_forum == forum_id).first():
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario ya pertenece al foro")
@@ -247,8 +259,11 @@ async def join_forum(forum_id: int, password: str | None = '', db: Session = Dep
         join_date=datetime.now()
     )
     db.add(user_forum)
+    adjust_counter(db, Forum.member_count, forum_id, 1)
+    on_forum_joined(db, current_user.id_user, forum_id)
     db.commit()
     db.refresh(user_forum)
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
     return user_forum
 
 # Funcion para salir de un foro (duplicado en user_router, lo quiero ordenar)
@@ -261,70 +276,60 @@ async def leave_forum(user_id: int, forum_id: int, db: Session = Depends(get_db)
     if db.query(UserForum).filter(UserForum.id_user == user_id).count() == 1:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario debe pertenecer a al menos un foro")
     db.delete(user_forum)
+    adjust_counter(db, Forum.member_count, forum_id, -1)
+    on_forum_left(db, user_id, forum_id)
     db.commit()
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
     return
 
 # Funcion para obtener todos los foros de un usuario (duplicado en user_router, lo quiero ordenar x2)
 @forumRoutes.get('/forum/user/{user_id}', status_code=status.HTTP_200_OK, response_model=List[ForumResponseWithCreator], tags=["Foros"])
 async def get_forums_by_user(user_id: int, db: Session = Depends(get_db)):
     forums = db.query(Forum).join(UserForum, Forum.id_forum == UserForum.id_forum).filter(UserForum.id_user == user_id).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        # forum.users = db.query(User).join(UserForum, User.id_user == UserForum.id_user).filter(UserForum.id_forum == forum.id_forum).all()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first() 
+    attach_forum_stats(db, forums)
     forums.sort(key=lambda x: x.users_count, reverse=True)
     return forums
 
 # Filtrar foros por grade
 @forumRoutes.get('/forum/grade/{grade}', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
+@cache_response(ttl=60, tags=lambda params: ["forums"])
 async def get_forums_by_grade(grade: int, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.grade == grade).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Filtrar foros por grado y educación
 @forumRoutes.get('/forum/grade/{grade}/education_level/{education_level}', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
+@cache_response(ttl=60, tags=lambda params: ["forums"])
 async def get_forums_by_grade_and_education_level(grade: int, education_level: str, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.grade == grade, Forum.education_level == education_level).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Funcion para obtener los foros en los que el usuario no pertenece y ademas esta filtrado por grade y education_level
 @forumRoutes.get('/forum/user/{user_id}/not_in/{grade}/{education_level}', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
 async def get_forums_by_user_not_in_grade_and_education_level(user_id: int, grade: int, education_level: str, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.grade == grade, Forum.education_level == education_level, Forum.id_forum.notin_(db.query(UserForum.id_forum).filter(UserForum.id_user == user_id))).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Funcion para obtener los foros en los que el usuario no pertenece y ademas esta filtrado education_level
 @forumRoutes.get('/forum/user/{user_id}/not_in/{education_level}', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
 async def get_forums_by_user_not_in_education_level(user_id: int, education_level: str, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.education_level == education_level, Forum.id_forum.notin_(db.query(UserForum.id_forum).filter(UserForum.id_user == user_id))).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Funcion para obtener los foros en los que el usuario no pertenece 
 @forumRoutes.get('/forum/user/{user_id}/not_in', status_code=status.HTTP_200_OK, response_model=List[ForumResponse], tags=["Foros"])
 async def get_forums_by_user_not_in(user_id: int, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.id_forum.notin_(db.query(UserForum.id_forum).filter(UserForum.id_user == user_id))).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums, include_creator=False)
     return forums
 
 # Funcion para obtener los foros por un nombre parecido
 @forumRoutes.get('/forum/search/{name}', status_code=status.HTTP_200_OK, response_model=List[ForumResponseWithCreator], tags=["Foros"])
 async def get_forums_by_name(name: str, db: Session = Depends(get_db)):
     forums = db.query(Forum).filter(Forum.name.ilike(f"%{name}%")).all()
-    for forum in forums:
-        forum.users_count = db.query(UserForum).filter(UserForum.id_forum == forum.id_forum).count()
-        forum.creator = db.query(User).filter(User.id_user == forum.id_user).first()
+    attach_forum_stats(db, forums)
     return forums
\ No newline at end of file
@@ -0,0 +1,60 @@
+from typing import List
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from app.models.interfaces import JobStatus
+from app.models.job import Job
+from app.models.User import User
+from app.routes.user_router import get_current_user
+from app.schemas.job_schema import JobResponse, JobStats
+from app.schemas.pagination_schema import Page
+from app.shared.config.db import get_db
+from app.shared.utils.jobs import retry_job
+from app.shared.utils.pagination import PageParams, paginate
+
+jobsRoutes = APIRouter()
+
+
+def require_admin(current_user: User = Depends(get_current_user)) -> User:
+    if current_user.user_type != "Admin":
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No tienes permisos para ver los trabajos")
+    return current_user
+
+
+def _get_failed_job(db: Session, id_job: int) -> Job:
+    job = db.query(Job).filter(Job.id_job == id_job, Job.status == JobStatus.Fallido).first()
+    if not job:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Trabajo fallido no encontrado")
+    return job
+
+
+# Cantidad de trabajos pendientes, en curso y fallidos por tipo
+@jobsRoutes.get('/jobs/stats', response_model=List[JobStats], tags=["Trabajos"])
+async def get_job_stats(db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    rows = db.query(Job.kind, Job.status, func.count(Job.id_job)).group_by(Job.kind, Job.status).all()
+    return [JobStats(kind=kind, status=job_status, count=count) for kind, job_status, count in rows]
+
+
+# Trabajos que agotaron sus reintentos (dead letter), del mas reciente al mas antiguo
+@jobsRoutes.get('/jobs/failed', response_model=Page[JobResponse], tags=["Trabajos"])
+async def get_failed_jobs(kind: str | None = None, page: PageParams = Depends(), db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    query = db.query(Job).filter(Job.status == JobStatus.Fallido)
+    if kind:
+        query = query.filter(Job.kind == kind)
+    jobs, next_cursor = paginate(query, (Job.id_job,), page.cursor, page.limit)
+    return Page[JobResponse](items=jobs, next_cursor=next_cursor)
+
+
+# Volver a encolar un trabajo fallido
+@jobsRoutes.post('/jobs/{id_job}/retry', response_model=JobResponse, tags=["Trabajos"])
+async def retry_failed_job(id_job: int, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    job = _get_failed_job(db, id_job)
+    retry_job(db, job)
+    return job
+
+
+# Descartar un trabajo fallido
+@jobsRoutes.delete('/jobs/{id_job}', status_code=status.HTTP_204_NO_CONTENT, tags=["Trabajos"])
+async def delete_failed_job(id_job: int, db: Session = Depends(get_db), current_user: User = Depends(require_admin)):
+    db.delete(_get_failed_job(db, id_job))
+    db.commit()
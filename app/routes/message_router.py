@@ -1,5 +1,5 @@
 from datetime import datetime
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, WebSocket, WebSocketDisconnect, status
 from sqlalchemy.orm import Session
 from typing import List
 from app.models.User import User
@@ -7,41 +7,187 @@ from app.models.chat import Chat
 from app.models.message import Message
 from app.models.sale_message import SaleMessage
 from app.models.sale_schat import SaleChat
-from app.schemas.message_schema import MessageCreate, MessageResponse, SaleMessageResponse
+from app.schemas.message_schema import MessageBatch, MessageBatchResult, MessageCreate, MessageResponse, MessageSync, SaleMessageResponse, SaleMessageSync
 from app.schemas.user_schema import UserResponse
-from app.shared.config.db import get_db
-from app.routes.user_router import get_current_user
+from app.shared.config.db import SessionLocal, get_db
+from app.schemas.pagination_schema import Page
+from app.shared.utils.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, PageParams, paginate, paginate_since
+from app.shared.utils.chat_hub import chat_channel, chat_hub, sale_chat_channel
+from app.routes.user_router import get_current_user, get_user_from_token
 
 messageRoutes = APIRouter()
 
+
+# Carga los remitentes de una lista de mensajes en una sola consulta
+def _senders(db: Session, messages) -> dict:
+    sender_ids = {message.sender_id for message in messages}
+    if not sender_ids:
+        return {}
+    return {user.id_user: UserResponse.model_validate(user) for user in db.query(User).filter(User.id_user.in_(sender_ids)).all()}
+
+
+def _message_response(message: Message, sender) -> MessageResponse:
+    return MessageResponse(id_message=message.id_message, message=message.message, chat_id=message.chat_id, sender=UserResponse.model_validate(sender), date_message=message.date_message)
+
+
+def _sale_message_response(message: SaleMessage, sender) -> SaleMessageResponse:
+    return SaleMessageResponse(id_sale_message=message.id_sale_message, message=message.message, sale_chat_id=message.sale_chat_id, sender=UserResponse.model_validate(sender), date_message=message.date_message)
+
+
+# Carga el chat y verifica que el usuario sea uno de sus participantes, igual que el websocket
+def _participant_chat(db: Session, chat_id: int, user: User) -> Chat:
+    chat = db.query(Chat).filter(Chat.id_chat == chat_id).first()
+    if not chat:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Chat no existe")
+    if user.id_user not in (chat.sender_id, chat.receiver_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No perteneces a este chat")
+    return chat
+
+
+def _participant_sale_chat(db: Session, sale_chat_id: int, user: User) -> SaleChat:
+    sale_chat = db.query(SaleChat).filter(SaleChat.id_sale_chat == sale_chat_id).first()
+    if not sale_chat:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale chat not found")
+    if user.id_user not in (sale_chat.seller_id, sale_chat.buyer_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No perteneces a este chat")
+    return sale_chat
+
+
+def _save_message(db: Session, chat_id: int, sender: User, text: str) -> MessageResponse:
+    db_message = Message(message=text, chat_id=chat_id, sender_id=sender.id_user, date_message=datetime.now())
+    db.add(db_message)
+    db.commit()
+    return _message_response(db_message, sender)
+
+
+def _save_sale_message(db: Session, sale_chat_id: int, sender: User, text: str) -> SaleMessageResponse:
+    db_sale_message = SaleMessage(message=text, sale_chat_id=sale_chat_id, sender_id=sender.id_user, date_message=datetime.now())
+    db.add(db_sale_message)
+    db.commit()
+    return _sale_message_response(db_sale_message, sender)
+
+
+# Atiende un websocket ya autorizado: recibe mensajes de texto, los guarda y los reparte
+# por el hub a todos los participantes conectados (en este u otros workers).
+# La sesion de base de datos solo se abre para guardar cada mensaje.
+async def _serve_chat_socket(websocket: WebSocket, channel: str, save):
+    await websocket.accept()
+    await chat_hub.connect(channel, websocket)
+    try:
+        while True:
+            text = await websocket.receive_text()
+            if not text.strip():
+                continue
+            with SessionLocal() as db:
+                response = save(db, text)
+            await chat_hub.publish(channel, "message.created", response.model_dump(mode="json"))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        await chat_hub.disconnect(channel, websocket)
+
+
+# Websocket de un chat: /ws/chat/{chat_id}?token=<jwt>. Solo para los dos participantes
+@messageRoutes.websocket('/ws/chat/{chat_id}')
+async def chat_socket(websocket: WebSocket, chat_id: int, token: str | None = None):
+    with SessionLocal() as db:
+        user = get_user_from_token(token, db)
+        chat = db.query(Chat).filter(Chat.id_chat == chat_id).first() if user else None
+    if chat is None or user.id_user not in (chat.sender_id, chat.receiver_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _serve_chat_socket(websocket, chat_channel(chat_id), lambda db, text: _save_message(db, chat_id, user, text))
+
+
+# Websocket de un chat de venta: /ws/sale_chat/{sale_chat_id}?token=<jwt>
+@messageRoutes.websocket('/ws/sale_chat/{sale_chat_id}')
+async def sale_chat_socket(websocket: WebSocket, sale_chat_id: int, token: str | None = None):
+    with SessionLocal() as db:
+        user = get_user_from_token(token, db)
+        sale_chat = db.query(SaleChat).filter(SaleChat.id_sale_chat == sale_chat_id).first() if user else None
+    if sale_chat is None or user.id_user not in (sale_chat.seller_id, sale_chat.buyer_id):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await _serve_chat_socket(websocket, sale_chat_channel(sale_chat_id), lambda db, text: _save_sale_message(db, sale_chat_id, user, text))
+
+# Enviar varios mensajes (a uno o varios chats) en una sola peticion: los chats se validan con
+# una consulta, los mensajes se insertan en una transaccion y despues se reparten por el hub.
+# Devuelve el resultado de cada mensaje en el orden recibido.
+@messageRoutes.post('/message/batch', status_code=status.HTTP_200_OK, response_model=List[MessageBatchResult], tags=["Mensajes"])
+async def create_messages_batch(batch: MessageBatch, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    chat_ids = list({item.chat_id for item in batch.messages})
+    chats = {chat.id_chat: chat for chat in db.query(Chat).filter(Chat.id_chat.in_(chat_ids))}
+    date_message = datetime.now()
+    results = []
+    created = []
+    for item in batch.messages:
+        chat = chats.get(item.chat_id)
+        if chat is None:
+            results.append(MessageBatchResult(id=item.chat_id, status="not_found", detail="Chat no existe"))
+        elif current_user.id_user not in (chat.sender_id, chat.receiver_id):
+            results.append(MessageBatchResult(id=item.chat_id, status="unauthorized", detail="No perteneces a este chat"))
+        elif not item.message.strip():
+            results.append(MessageBatchResult(id=item.chat_id, status="invalid", detail="Mensaje vacio"))
+        else:
+            db_message = Message(message=item.message, chat_id=item.chat_id, sender_id=current_user.id_user, date_message=date_message)
+            created.append((len(results), db_message))
+            results.append(None)
+    if created:
+        db.add_all([db_message for _, db_message in created])
+        db.flush()  # Un INSERT para todos los mensajes; asigna los id_message
+        for position, db_message in created:
+            results[position] = MessageBatchResult(id=db_message.chat_id, status="ok", message=_message_response(db_message, current_user))
+        db.commit()
+        for position, _ in created:
+            response = results[position].message
+            await chat_hub.publish(chat_channel(response.chat_id), "message.created", response.model_dump(mode="json"))
+    return results
+
 # Crear un nuevo mensaje
 @messageRoutes.post('/message/{chat_id}', status_code=status.HTTP_201_CREATED, response_model=MessageResponse, tags=["Mensajes"])
 async def create_message(chat_id: int, message: str, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
-    print(current_user.id_user or "No user")
-    # Verificar si el chat existe
-    if not db.query(Chat).filter(Chat.id_chat == chat_id).first():
+    # Verificar si el chat existe y si el usuario participa en el
+    chat = db.query(Chat).filter(Chat.id_chat == chat_id).first()
+    if not chat:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Chat no existe")
-    sender = db.query(User).filter(User.id_user == current_user.id_user).first()
-    db_message = Message(message=message, chat_id=chat_id, sender_id=current_user.id_user, date_message=datetime.now())
-    db.add(db_message)
-    db.commit()
-    return MessageResponse(id_message=db_message.id_message, message=db_message.message, chat_id=db_message.chat_id, sender=UserResponse.from_orm(sender), date_message=db_message.date_message)
-
-# Obtener todos los mensajes de un chat
-@messageRoutes.get('/message/chat/{chat_id}', response_model=List[MessageResponse], tags=["Mensajes"])
-async def get_messages_by_chat(chat_id: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    messages = db.query(Message).filter(Message.chat_id == chat_id).all()
-    result = [] 
-    for message in messages:
-        sender = db.query(User).filter(User.id_user == message.sender_id).first()
-        result.append(MessageResponse(id_message=message.id_message, message=message.message, chat_id=message.chat_id, sender=UserResponse.from_orm(sender), date_message=message.date_message))
-    return result
+    if current_user.id_user not in (chat.sender_id, chat.receiver_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No perteneces a este chat")
+    response = _save_message(db, chat_id, current_user, message)
+    await chat_hub.publish(chat_channel(chat_id), "message.created", response.model_dump(mode="json"))
+    return response
+
+# Obtener los mensajes de un chat, del mas reciente al mas antiguo
+@messageRoutes.get('/message/chat/{chat_id}', response_model=Page[MessageResponse], tags=["Mensajes"])
+async def get_messages_by_chat(chat_id: int, page: PageParams = Depends(), db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
+    query = db.query(Message).filter(Message.chat_id == chat_id, Message.deleted_at.is_(None))
+    messages, next_cursor = paginate(query, (Message.date_message, Message.id_message), page.cursor, page.limit)
+    senders = _senders(db, messages)
+    result = [_message_response(message, senders[message.sender_id]) for message in messages]
+    return Page[MessageResponse](items=result, next_cursor=next_cursor)
+
+# Sincronizacion incremental: cambios (nuevos, editados y borrados) posteriores al cursor "since",
+# en orden de modificacion. Sin "since" se recorre la conversacion desde el inicio; el cliente
+# guarda next_cursor y lo envia como "since" en la siguiente llamada. Los cambios se entregan
+# con un retraso de SYNC_SETTLE_SECONDS para no saltar transacciones que confirman tarde.
+@messageRoutes.get('/message/chat/{chat_id}/sync', response_model=MessageSync, tags=["Mensajes"])
+async def sync_messages_by_chat(chat_id: int, since: str | None = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    _participant_chat(db, chat_id, current_user)
+    query = db.query(Message).filter(Message.chat_id == chat_id)
+    changes, next_cursor, has_more = paginate_since(query, (Message.updated_at, Message.id_message), since, limit)
+    messages = [message for message in changes if message.deleted_at is None]
+    senders = _senders(db, messages)
+    return MessageSync(
+        items=[_message_response(message, senders[message.sender_id]) for message in messages],
+        deleted=[message.id_message for message in changes if message.deleted_at is not None],
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
 
 # Obtener un mensaje por ID
 @messageRoutes.get('/message/{id_message}', response_model=MessageResponse, tags=["Mensajes"])
 async def get_message_by_id(id_message: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
     # Cambios realizados aquí
-    message = db.query(Message).filter(Message.id_message == id_message, Message.sender_id == current_user.id_user).first()
+    message = db.query(Message).filter(Message.id_message == id_message, Message.sender_id == current_user.id_user, Message.deleted_at.is_(None)).first()
     if not message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
     sender = db.query(User).filter(User.id_user == message.sender_id).first()
@@ -50,7 +196,7 @@ async def get_message_by_id(id_message: int, db: Session = Depends(get_db), curr
 # Actualizar un mensaje por ID
 @messageRoutes.put('/message/{id_message}', response_model=MessageResponse, tags=["Mensajes"])
 async def update_message(id_message: int, message: MessageCreate, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    db_message = db.query(Message).filter(Message.id_message == id_message, Message.sender_id == current_user.id_user).first()
+    db_message = db.query(Message).filter(Message.id_message == id_message, Message.sender_id == current_user.id_user, Message.deleted_at.is_(None)).first()
     if not db_message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
     
@@ -63,44 +209,64 @@ async def update_message(id_message: int, message: MessageCreate, db: Session =
     
     db.commit()
     db.refresh(db_message)  # Refrescar el objeto para obtener los valores actualizados
-    sender = db.query(User).filter(User.id_user == db_message.sender_id).first()
-    return MessageResponse(id_message=db_message.id_message, message=db_message.message, chat_id=db_message.chat_id, sender=UserResponse.from_orm(sender), date_message=db_message.date_message)
+    response = _message_response(db_message, current_user)
+    await chat_hub.publish(chat_channel(db_message.chat_id), "message.updated", response.model_dump(mode="json"))
+    return response
 
 # Eliminar un mensaje por ID
 @messageRoutes.delete('/message/{id_message}', status_code=status.HTTP_204_NO_CONTENT, tags=["Mensajes"])
 async def delete_message(id_message: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    db_message = db.query(Message).filter(Message.id_message == id_message).first()
+    db_message = db.query(Message).filter(Message.id_message == id_message, Message.deleted_at.is_(None)).first()
     if not db_message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Message not found")
-    db.delete(db_message)
+    chat_id = db_message.chat_id
+    # Borrado logico para que la sincronizacion pueda informar el borrado
+    db_message.message = ""
+    db_message.deleted_at = datetime.now()
     db.commit()
+    await chat_hub.publish(chat_channel(chat_id), "message.deleted", {"id_message": id_message, "chat_id": chat_id})
     
 # SECCIÓN DE MENSAJES DE VENTA
 @messageRoutes.post('/sale_message/{sale_chat_id}', status_code=status.HTTP_201_CREATED, response_model=SaleMessageResponse, tags=["Sale Messages"])
 async def create_sale_message(sale_chat_id: int, message: str, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    # Verificar si el chat de venta existe
-    if not db.query(SaleChat).filter(SaleChat.id_sale_chat == sale_chat_id).first():
+    # Verificar si el chat de venta existe y si el usuario participa en el
+    sale_chat = db.query(SaleChat).filter(SaleChat.id_sale_chat == sale_chat_id).first()
+    if not sale_chat:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Sale chat not found")
-    sender = db.query(User).filter(User.id_user == current_user.id_user).first()
-    db_sale_message = SaleMessage(message=message, sale_chat_id=sale_chat_id, sender_id=current_user.id_user, date_message=datetime.now())
-    db.add(db_sale_message)
-    db.commit()
-    return SaleMessageResponse(id_sale_message=db_sale_message.id_sale_message, message=db_sale_message.message, sale_chat_id=db_sale_message.sale_chat_id, sender=UserResponse.from_orm(sender), date_message=db_sale_message.date_message)
-
-# Obtener todos los mensajes de un chat de venta
-@messageRoutes.get('/sale_message/chat/{sale_chat_id}', response_model=List[SaleMessageResponse], tags=["Sale Messages"])
-async def get_sale_messages_by_chat(sale_chat_id: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    messages = db.query(SaleMessage).filter(SaleMessage.sale_chat_id == sale_chat_id).all()
-    result = []
-    for message in messages:
-        sender = db.query(User).filter(User.id_user == message.sender_id).first()
-        result.append(SaleMessageResponse(id_sale_message=message.id_sale_message, message=message.message, sale_chat_id=message.sale_chat_id, sender=UserResponse.from_orm(sender), date_message=message.date_message))
-    return result
+    if current_user.id_user not in (sale_chat.seller_id, sale_chat.buyer_id):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="No perteneces a este chat")
+    response = _save_sale_message(db, sale_chat_id, current_user, message)
+    await chat_hub.publish(sale_chat_channel(sale_chat_id), "message.created", response.model_dump(mode="json"))
+    return response
+
+# Obtener los mensajes de un chat de venta, del mas reciente al mas antiguo
+@messageRoutes.get('/sale_message/chat/{sale_chat_id}', response_model=Page[SaleMessageResponse], tags=["Sale Messages"])
+async def get_sale_messages_by_chat(sale_chat_id: int, page: PageParams = Depends(), db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
+    query = db.query(SaleMessage).filter(SaleMessage.sale_chat_id == sale_chat_id, SaleMessage.deleted_at.is_(None))
+    messages, next_cursor = paginate(query, (SaleMessage.date_message, SaleMessage.id_sale_message), page.cursor, page.limit)
+    senders = _senders(db, messages)
+    result = [_sale_message_response(message, senders[message.sender_id]) for message in messages]
+    return Page[SaleMessageResponse](items=result, next_cursor=next_cursor)
+
+# Sincronizacion incremental de un chat de venta
+@messageRoutes.get('/sale_message/chat/{sale_chat_id}/sync', response_model=SaleMessageSync, tags=["Sale Messages"])
+async def sync_sale_messages_by_chat(sale_chat_id: int, since: str | None = None, limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    _participant_sale_chat(db, sale_chat_id, current_user)
+    query = db.query(SaleMessage).filter(SaleMessage.sale_chat_id == sale_chat_id)
+    changes, next_cursor, has_more = paginate_since(query, (SaleMessage.updated_at, SaleMessage.id_sale_message), since, limit)
+    messages = [message for message in changes if message.deleted_at is None]
+    senders = _senders(db, messages)
+    return SaleMessageSync(
+        items=[_sale_message_response(message, senders[message.sender_id]) for message in messages],
+        deleted=[message.id_sale_message for message in changes if message.deleted_at is not None],
+        next_cursor=next_cursor,
+        has_more=has_more
+    )
 
 # Obtener un mensaje de venta por ID
 @messageRoutes.get('/sale_message/{id_sale_message}', response_model=SaleMessageResponse, tags=["Sale Messages"])
 async def get_sale_message_by_id(id_sale_message: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    message = db.query(SaleMessage).filter(SaleMessage.id_sale_message == id_sale_message, SaleMessage.sender_id == current_user.id_user).first()
+    message = db.query(SaleMessage).filter(SaleMessage.id_sale_message == id_sale_message, SaleMessage.sender_id == current_user.id_user, SaleMessage.deleted_at.is_(None)).first()
     if not message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale message not found")
     sender = db.query(User).filter(User.id_user == message.sender_id).first()
@@ -110,10 +276,13 @@ async def get_sale_message_by_id(id_sale_message: int, db: Session = Depends(get
 # Eliminar un mensaje de venta por ID
 @messageRoutes.delete('/sale_message/{id_sale_message}', status_code=status.HTTP_204_NO_CONTENT, tags=["Sale Messages"])
 async def delete_sale_message(id_sale_message: int, db: Session = Depends(get_db), current_user: int = Depends(get_current_user)):
-    db_sale_message = db.query(SaleMessage).filter(SaleMessage.id_sale_message == id_sale_message, SaleMessage.sender_id == current_user.id_user).first()
+    db_sale_message = db.query(SaleMessage).filter(SaleMessage.id_sale_message == id_sale_message, SaleMessage.sender_id == current_user.id_user, SaleMessage.deleted_at.is_(None)).first()
     if not db_sale_message:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale message not found")
-    db.delete(db_sale_message)
+    sale_chat_id = db_sale_message.sale_chat_id
+    db_sale_message.message = ""
+    db_sale_message.deleted_at = datetime.now()
     db.commit()
+    await chat_hub.publish(sale_chat_channel(sale_chat_id), "message.deleted", {"id_sale_message": id_sale_message, "sale_chat_id": sale_chat_id})
     
 # FIN SECCIÓN DE MENSAJES DE VENTA
\ No newline at end of file
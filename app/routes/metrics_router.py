@@ -0,0 +1,33 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+from app.shared.config import db
+from app.shared.config.db_pool import get_pool_snapshot
+from app.shared.middlewares.request_metrics import metrics_registry
+
+metricsRoutes = APIRouter()
+
+
+def _pool_snapshots():
+    pools = {"sync": get_pool_snapshot(db.engine.pool, "sync")}
+    if db.async_engine is not None:
+        pools["async"] = get_pool_snapshot(db.async_engine.sync_engine.pool, "async")
+    return pools
+
+
+# Estado del pool de conexiones para dimensionarlo segun el numero de workers
+@metricsRoutes.get('/metrics/db-pool', tags=["Metricas"])
+async def get_db_pool_metrics():
+    return _pool_snapshots()
+
+
+# Metricas de este worker en formato de exposicion de Prometheus: latencia, sentencias SQL
+# y tiempo en la base de datos por ruta, consultas lentas y estado del pool
+@metricsRoutes.get('/metrics', tags=["Metricas"], response_class=PlainTextResponse)
+async def get_prometheus_metrics():
+    lines = ["# HELP db_pool Estado del pool de conexiones", "# TYPE db_pool gauge"]
+    for name, snapshot in _pool_snapshots().items():
+        for key, value in snapshot.items():
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                lines.append(f'db_pool_{key}{{pool="{name}"}} {value}')
+    body = metrics_registry.render() + "\n".join(lines) + "\n"
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
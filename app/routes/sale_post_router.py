@@ -6,25 +6,19 @@ from app.models.interfaces import PostStatus
 from app.models.sale_post import SalePost
 from app.schemas.sale_post_schema import SalePostCreate, SalePostResponse
 from app.shared.config.db import get_db
+from app.shared.config.s3_files import upload_service
+from app.schemas.pagination_schema import Page
+from app.shared.utils.image_variants import image_pipeline
+from app.shared.utils.pagination import PageParams, paginate
 from app.routes.user_router import get_current_user
+from app.shared.middlewares.response_cache import CachedRoute, cache_response, response_cache
 from sqlalchemy.orm import joinedload
-import time
-import boto3
-import os
-from dotenv import load_dotenv
-import time
 
-load_dotenv()
 
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("aws_access_key_id"),
-    aws_secret_access_key=os.getenv("aws_secret_access_key"),
-    aws_session_token=os.getenv("aws_session_token"),
-    region_name=os.getenv("AWS_REGION", "us-east-1")
-)
+salePostRoutes = APIRouter(route_class=CachedRoute)
 
-salePostRoutes = APIRouter()
+# Clave de orden para paginar posts de venta (mas recientes primero)
+SALE_POST_PAGE_KEY = (SalePost.publication_date, SalePost.id_sale_post)
 
 # Crear un nuevo post de venta
 @salePostRoutes.post('/sale-post/', status_code=status.HTTP_201_CREATED, response_model=SalePostResponse, tags=["Posts de venta"])
@@ -39,9 +33,7 @@ async def create_sale_post(
 ):
 
     # Subir imagen a S3
-    image_key = f"{int(time.time())}_{image.filename}"
-    s3.upload_fileobj(image.file, 'educalinkbucket', image_key, ExtraArgs={'ContentType': image.content_type})
-    image_url = f"https://educalinkbucket.s3.amazonaws.com/{image_key}"
+    image_url = await upload_service.upload(image)
     # Raise si no se pudo subir la imagen
     if not image_url:
         raise HTTPException(status_code=500, detail="Error subiendo la imagen")
@@ -58,12 +50,9 @@ async def create_sale_post(
     )
 
     db.add(db_sale_post)
+    image_pipeline.schedule(db, "sale_post", image_url)
     db.commit()
-    
-    # Guardar la URL de la imagen en el post
-    db_sale_post.image_url = image_url  # Asignar la URL de la imagen al campo image_url
-
-    db.commit()  # Asegúrate de hacer commit después de agregar el post
+    await response_cache.invalidate("sale_posts")
 
     return SalePostResponse(
         id_sale_post=db_sale_post.id_sale_post,
@@ -72,17 +61,19 @@ async def create_sale_post(
         price=db_sale_post.price,
         sale_type=db_sale_post.sale_type,
         image_url=db_sale_post.image_url,  # Incluir la URL de la imagen
+        image_variants=db_sale_post.image_variants,
         publication_date=db_sale_post.publication_date,
         status=db_sale_post.status,
         seller=db_sale_post.seller
     )
 
 # Obtener todos los posts de venta
-@salePostRoutes.get('/sale-post/', response_model=List[SalePostResponse], tags=["Posts de venta"])
-async def get_all_sale_posts(db: Session = Depends(get_db)):
+@salePostRoutes.get('/sale-post/', response_model=Page[SalePostResponse], tags=["Posts de venta"])
+@cache_response(ttl=60, tags=lambda params: ["sale_posts"])
+async def get_all_sale_posts(page: PageParams = Depends(), db: Session = Depends(get_db)):
     # Obtener al usuario de la venta
-    sale_posts = db.query(SalePost).options(joinedload(SalePost.seller)).all()
-    return sale_posts
+    sale_posts, next_cursor = paginate(db.query(SalePost).options(joinedload(SalePost.seller)), SALE_POST_PAGE_KEY, page.cursor, page.limit)
+    return Page[SalePostResponse](items=sale_posts, next_cursor=next_cursor)
 
 # Obtener un post de venta por su ID
 @salePostRoutes.get('/sale-post/{id_sale_post}', response_model=SalePostResponse, tags=["Posts de venta"])
@@ -96,6 +87,7 @@ async def get_sale_post_by_id(id_sale_post: int, db: Session = Depends(get_db)):
         description=sale_post.description,
         price=sale_post.price,
         image_url=sale_post.image_url,
+        image_variants=sale_post.image_variants,
         publication_date=sale_post.publication_date,
         status=sale_post.status,
         seller=sale_post.seller
@@ -109,6 +101,7 @@ async def update_sale_post(id_sale_post: int, sale_post: SalePostCreate, db: Ses
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale post not found")
     db_sale_post.title = sale_post.title
     db.commit()
+    await response_cache.invalidate("sale_posts")
     return db_sale_post
 
 # Eliminar un post de venta
@@ -119,24 +112,29 @@ async def delete_sale_post(id_sale_post: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale post not found")
     db.delete(db_sale_post)
     db.commit()
+    await response_cache.invalidate("sale_posts")
     
 # Obtener post por su tipo 
-@salePostRoutes.get('/sale-post/type/{sale_type}', response_model=List[SalePostResponse], tags=["Posts de venta"])
-async def get_sale_post_by_type(sale_type: str, db: Session = Depends(get_db)):
-    sale_posts = db.query(SalePost).filter(SalePost.sale_type == sale_type).all()
-    return [
+@salePostRoutes.get('/sale-post/type/{sale_type}', response_model=Page[SalePostResponse], tags=["Posts de venta"])
+@cache_response(ttl=60, tags=lambda params: ["sale_posts"])
+async def get_sale_post_by_type(sale_type: str, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(SalePost).options(joinedload(SalePost.seller)).filter(SalePost.sale_type == sale_type)
+    sale_posts, next_cursor = paginate(query, SALE_POST_PAGE_KEY, page.cursor, page.limit)
+    items = [
         SalePostResponse(
             id_sale_post=sale_post.id_sale_post,
             title=sale_post.title,
             description=sale_post.description,
             price=sale_post.price,
             image_url=sale_post.image_url,
+            image_variants=sale_post.image_variants,
             publication_date=sale_post.publication_date,
             status=sale_post.status,
             seller=sale_post.seller
         )
         for sale_post in sale_posts
     ]
+    return Page[SalePostResponse](items=items, next_cursor=next_cursor)
 
 
 # Obtener posts de venta por el usuario que lo vende
@@ -154,6 +152,7 @@ async def change_sale_post_status(id_sale_post: int, status: PostStatus, db: Ses
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Sale post not found")
     db_sale_post.status = status
     db.commit()
+    await response_cache.invalidate("sale_posts")
     return db_sale_post
 
 # Funcion para obtener posts de venta por un nombre parecido
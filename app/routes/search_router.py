@@ -0,0 +1,70 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session, joinedload
+from app.models.Forum import Forum
+from app.models.sale_post import SalePost
+from app.models.User import User
+from app.schemas.forum_schema import ForumResponseWithCreator
+from app.schemas.pagination_schema import Page
+from app.schemas.post_schema import PostResponse
+from app.schemas.sale_post_schema import SalePostResponse
+from app.schemas.search_schema import SearchHit, SearchType
+from app.schemas.user_schema import UserResponse
+from app.shared.config.db import get_db
+from app.shared.utils.forum_hydration import attach_forum_stats
+from app.shared.utils.pagination import PageParams, decode_cursor, encode_cursor
+from app.shared.utils.post_hydration import build_post_responses
+from app.shared.utils.search_engine import search_engine
+
+searchRoutes = APIRouter()
+
+
+def _load_items(db: Session, type: SearchType, ids):
+    if type == SearchType.posts:
+        return {post.id_post: post for post in build_post_responses(db, ids)}
+    if type == SearchType.forums:
+        forums = db.query(Forum).filter(Forum.id_forum.in_(ids)).all()
+        return {forum.id_forum: forum for forum in attach_forum_stats(db, forums)}
+    if type == SearchType.users:
+        return {user.id_user: user for user in db.query(User).filter(User.id_user.in_(ids)).all()}
+    sale_posts = db.query(SalePost).options(joinedload(SalePost.seller)).filter(SalePost.id_sale_post.in_(ids)).all()
+    return {sale_post.id_sale_post: sale_post for sale_post in sale_posts}
+
+
+# Campo de SearchHit y esquema de respuesta de cada tipo
+HIT_FIELDS = {
+    SearchType.posts: ("post", PostResponse),
+    SearchType.forums: ("forum", ForumResponseWithCreator),
+    SearchType.users: ("user", UserResponse),
+    SearchType.sale_posts: ("sale_post", SalePostResponse),
+}
+
+
+# Busqueda de texto completo sobre posts, foros, usuarios o posts de venta, ordenada por relevancia.
+# El cursor guarda el desplazamiento dentro del ranking.
+@searchRoutes.get('/search/', status_code=status.HTTP_200_OK, response_model=Page[SearchHit], tags=["Busqueda"])
+async def search(
+    q: str = Query(..., min_length=1, max_length=200),
+    type: SearchType = SearchType.posts,
+    page: PageParams = Depends(),
+    db: Session = Depends(get_db)
+):
+    offset = 0
+    if page.cursor:
+        values = decode_cursor(page.cursor)
+        if len(values) != 1 or not isinstance(values[0], int) or values[0] < 0:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+        offset = values[0]
+
+    # Se pide un resultado extra para saber si existe una pagina siguiente
+    ranked = search_engine.search(db, type.value, q, offset, page.limit + 1)
+    next_cursor = encode_cursor([offset + page.limit]) if len(ranked) > page.limit else None
+    ranked = ranked[:page.limit]
+
+    items = _load_items(db, type, [doc_id for doc_id, _ in ranked]) if ranked else {}
+    field, schema = HIT_FIELDS[type]
+    hits = [
+        SearchHit(type=type, rank=rank, **{field: schema.model_validate(items[doc_id])})
+        for doc_id, rank in ranked
+        if doc_id in items
+    ]
+    return Page(items=hits, next_cursor=next_cursor)
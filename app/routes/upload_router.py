@@ -1,37 +1,53 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import boto3
-import os
-from dotenv import load_dotenv
+import hmac
 import time
-
-load_dotenv()
-
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("aws_access_key_id"),
-    aws_secret_access_key=os.getenv("aws_secret_access_key"),
-    aws_session_token=os.getenv("aws_session_token"),
-    region_name=os.getenv("AWS_REGION", "us-east-1")
+from fastapi import APIRouter, Depends, Form, UploadFile, File, HTTPException, status
+from app.models.User import User
+from app.routes.user_router import get_current_user
+from app.schemas.upload_schema import PresignedUploadRequest, PresignedUploadResponse
+from app.shared.config.s3_files import (
+    ALLOWED_UPLOAD_CONTENT_TYPES,
+    PRESIGNED_UPLOAD_MAX_SIZE,
+    STORAGE_BACKEND,
+    sign_local_upload,
+    upload_service
 )
 
 uploadRoutes = APIRouter()
 
 @uploadRoutes.post("/upload/")
 async def upload_files(files: list[UploadFile] = File(...)):
-    file_urls = []  # Lista para almacenar las URLs de los archivos subidos
     try:
-        bucket_name = 'educalinkbucket'  # Reemplaza con tu nombre de bucket
-
-        for file in files:
-            file_key = f"{int(time.time())}_{file.filename}"  # Nombre único del archivo
-
-            # Subir el archivo a S3
-            s3.upload_fileobj(file.file, bucket_name, file_key, ExtraArgs={'ContentType': file.content_type})
-
-            # Generar la URL del archivo subido
-            file_url = f"https://{bucket_name}.s3.amazonaws.com/{file_key}"
-            file_urls.append(file_url)  # Agregar la URL a la lista
-
+        # Subir los archivos en paralelo y obtener sus URLs
+        file_urls = await upload_service.upload_many(files)
         return {"message": "Archivos subidos con éxito", "fileUrls": file_urls}
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error subiendo los archivos: {str(e)}") 
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error subiendo los archivos: {str(e)}") 
+
+# Obtener una URL prefirmada para subir un archivo directamente al bucket.
+# Luego se confirma la clave en /post/{id}/files/confirm, /forum/{id}/images/confirm o /user/images/confirm
+@uploadRoutes.post("/upload/presign", response_model=PresignedUploadResponse, tags=["Archivos"])
+async def create_presigned_upload(upload: PresignedUploadRequest, current_user: User = Depends(get_current_user)):
+    if upload.content_type not in ALLOWED_UPLOAD_CONTENT_TYPES:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Tipo de archivo no permitido")
+    if upload.size <= 0 or upload.size > PRESIGNED_UPLOAD_MAX_SIZE:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo excede el tamaño permitido")
+    return upload_service.presign(current_user.id_user, upload.filename, upload.content_type)
+
+
+# Con el almacenamiento local se recibe el POST que en produccion va directo a S3
+if STORAGE_BACKEND == "local":
+    @uploadRoutes.post("/upload/local", status_code=status.HTTP_204_NO_CONTENT, tags=["Archivos"])
+    async def local_presigned_upload(
+        key: str = Form(...),
+        content_type: str = Form(..., alias="Content-Type"),
+        max_size: str = Form(...),
+        expires: str = Form(...),
+        signature: str = Form(...),
+        file: UploadFile = File(...)
+    ):
+        fields = {"key": key, "Content-Type": content_type, "max_size": max_size, "expires": expires}
+        if not hmac.compare_digest(signature, sign_local_upload(fields)) or int(expires) < time.time():
+            raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Firma inválida o expirada")
+        if file.size is not None and file.size > int(max_size):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="El archivo excede el tamaño permitido")
+        await upload_service.upload(file, key=key)
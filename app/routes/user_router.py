@@ -1,41 +1,40 @@
-from fastapi import APIRouter, Depends, status, HTTPException, Security, Response, File, UploadFile, Form
+from fastapi import APIRouter, Depends, status, HTTPException, Query, Security, Response, File, UploadFile, Form
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError
 import jwt
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, insert
+from sqlalchemy.orm import Session, aliased
 from typing import List
 from datetime import datetime, timedelta
-from app.models.Forum import Forum
+from app.models.Forum import Forum, GroupType
+from app.schemas.batch_schema import MAX_BATCH_SIZE, BatchItemResult, FollowBatch, JoinForumBatch
 from app.models.forum_posts import ForumPosts
-from app.schemas.follower_schema import FollowerResponse
+from app.schemas.follower_schema import FollowCounts, FollowerResponse, FollowStatus
 from app.schemas.forum_schema import ForumResponse
 from app.schemas.post_schema import PostResponse
 from app.shared.config.db import get_db
+from app.shared.config.s3_files import upload_service
+from app.shared.middlewares.response_cache import response_cache
+from app.shared.middlewares.user_cache import user_cache
+from app.shared.utils.counters import adjust_counter, adjust_counters, release_user_counters
+from app.shared.utils.image_variants import image_pipeline
+from app.shared.utils.timeline import on_forum_joined, on_forum_left, on_forums_joined, on_user_followed, on_user_unfollowed, on_users_followed
 from app.models.User import Follower, User
 from app.schemas.user_schema import UserCreate, UserResponse, Token
+from app.schemas.upload_schema import ConfirmUserImages
 from app.models.user_forum import UserForum
 from app.schemas.user_forum_schema import UserForumCreate, UserForumResponse
+from app.schemas.pagination_schema import Page
+from app.shared.utils.pagination import PageParams, paginate
 from app.shared.middlewares.security import (
     ALGORITHM,
     SECRET_KEY,
-    verify_password,
-    get_password_hash,
+    verify_and_update_password_async,
+    verify_password_async,
+    get_password_hash_async,
     create_access_token,
     ACCESS_TOKEN_EXPIRE_MINUTES
 )
-import boto3
-import time
-import os
-from dotenv import load_dotenv
-load_dotenv()
-
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("aws_access_key_id"),
-    aws_secret_access_key=os.getenv("aws_secret_access_key"),
-    aws_session_token=os.getenv("aws_session_token"),
-    region_name=os.getenv("AWS_REGION", "us-east-1")
-)
 
 userRoutes = APIRouter()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
@@ -48,12 +47,20 @@ async def login_for_access_token(
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.mail == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password):
+    verified, new_hash = (False, None)
+    if user:
+        verified, new_hash = await verify_and_update_password_async(form_data.password, user.password)
+    if not verified:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Correo o contraseña incorrectos",
             headers={"WWW-Authenticate": "Bearer"},
         )
+    # Si el costo de bcrypt cambio, se guarda el hash recalculado
+    if new_hash:
+        user.password = new_hash
+        db.commit()
+        user_cache.invalidate(user.mail)
     access_token_expires = timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
     access_token = create_access_token(
         data={"sub": user.mail}, expires_delta=access_token_expires
@@ -89,11 +96,13 @@ async def create_user(user: UserCreate, db: Session = Depends(get_db)):
         )
 
     # Crear usuario con contraseña hasheada
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await get_password_hash_async(user.password)
     db_user = User(
         **user.model_dump(exclude={'password', 'creation_date'}),
         password=hashed_password,
-        creation_date=datetime.now()
+        creation_date=datetime.now(),
+        # Un usuario nuevo empieza con el timeline vacio; los hooks de union y seguimiento lo llenan
+        timeline_built_at=datetime.now()
     )
     db.add(db_user)
     db.commit()
@@ -110,17 +119,34 @@ async def get_current_user(
         detail="No se pudieron validar las credenciales",
         headers={"WWW-Authenticate": "Bearer"},
     )
+    user = get_user_from_token(token, db)
+    if user is None:
+        raise credentials_exception
+    return user
+
+# Resuelve el usuario de un token JWT o devuelve None si no es valido; tambien lo usan los websockets
+def get_user_from_token(token: str | None, db: Session) -> User | None:
+    if not token:
+        return None
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         mail: str = payload.get("sub")
         if mail is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+            return None
+    except (JWTError, jwt.PyJWTError):
+        return None
+
+    # Primero se busca en la cache de usuarios autenticados
+    user = user_cache.get(mail)
+    if user is not None:
+        return user
 
     user = db.query(User).filter(User.mail == mail).first()
     if user is None:
-        raise credentials_exception
+        return None
+    # Se separa de la sesion para poder reutilizarlo en otras peticiones
+    db.expunge(user)
+    user_cache.set(mail, user)
     return user
 
 # Ejemplo de endpoint protegido
@@ -128,13 +154,14 @@ async def get_current_user(
 async def read_users_me(current_user: User = Depends(get_current_user)):
     return current_user
 
-@userRoutes.get('/user/', response_model=List[UserResponse], tags=["Usuarios"])
+@userRoutes.get('/user/', response_model=Page[UserResponse], tags=["Usuarios"])
 async def get_users(
+    page: PageParams = Depends(),
     db: Session = Depends(get_db),
     # current_user: User = Depends(get_current_user)
 ):
-    all_users = db.query(User).all()
-    return all_users
+    users, next_cursor = paginate(db.query(User), (User.creation_date, User.id_user), page.cursor, page.limit)
+    return Page[UserResponse](items=users, next_cursor=next_cursor)
 
 # Funcion para obtener usuario por id
 @userRoutes.get('/user/{user_id}', status_code=status.HTTP_200_OK, response_model=UserResponse, tags=["Usuarios"])
@@ -156,8 +183,11 @@ async def join_forum(forum_id: int, db: Session = Depends(get_db), current_user:
         join_date=datetime.now()    
     )
     db.add(user_forum)
+    adjust_counter(db, Forum.member_count, forum_id, 1)
+    on_forum_joined(db, current_user.id_user, forum_id)
     db.commit()
     db.refresh(user_forum)
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
     return user_forum
 
 # Funcion para obtener los foros a los que pertenece un usuario
@@ -167,6 +197,12 @@ async def get_forums_by_user(user_id: int, db: Session = Depends(get_db)):
     return forums
 
 
+# Los contadores de seguidores se actualizan con UPDATE de Core: se descartan del cache de
+# usuarios autenticados tanto el usuario actual como los usuarios seguidos o dejados de seguir
+def _invalidate_follow_counts(db: Session, current_user: User, user_ids: List[int]):
+    mails = [row.mail for row in db.query(User.mail).filter(User.id_user.in_(user_ids))]
+    user_cache.invalidate(current_user.mail, *mails)
+
 # Funcion para seguir a un usuario
 @userRoutes.post('/user/follow/{user_id}', status_code=status.HTTP_200_OK, response_model=FollowerResponse, tags=["Usuarios"])
 async def follow_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
@@ -177,25 +213,60 @@ async def follow_user(user_id: int, db: Session = Depends(get_db), current_user:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario ya seguido")
     new_follower = Follower(id_user=user_id, follower_id=current_user.id_user)
     db.add(new_follower)
+    adjust_counter(db, User.follower_count, user_id, 1)
+    adjust_counter(db, User.following_count, current_user.id_user, 1)
+    on_user_followed(db, current_user.id_user, user_id)
     db.commit()
     db.refresh(new_follower)
+    _invalidate_follow_counts(db, current_user, [user_id])
     return new_follower  # This return should match FollowerResponse
 
 
 
-# Funcion para obtener los seguidores de un usuario
-@userRoutes.get('/user/followers/{id_user}', status_code=status.HTTP_200_OK, response_model=List[UserResponse], tags=["Usuarios"])
-async def get_followers_by_user(id_user: int, db: Session = Depends(get_db)):
-    followers = db.query(Follower).filter(Follower.id_user == id_user).all()
-    users = db.query(User).filter(User.id_user.in_(db.query(Follower.follower_id).filter(Follower.id_user == id_user))).all()
-    return users
+# Funcion para obtener los seguidores de un usuario, del seguimiento mas reciente al mas antiguo
+@userRoutes.get('/user/followers/{id_user}', status_code=status.HTTP_200_OK, response_model=Page[UserResponse], tags=["Usuarios"])
+async def get_followers_by_user(id_user: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(User, Follower.id_follower).join(Follower, Follower.follower_id == User.id_user).filter(Follower.id_user == id_user)
+    rows, next_cursor = paginate(query, (Follower.id_follower,), page.cursor, page.limit)
+    return Page[UserResponse](items=[user for user, _ in rows], next_cursor=next_cursor)
 
 # Funcion para obtener los usuarios que un usuario sigue
-@userRoutes.get('/user/following/{id_user}', status_code=status.HTTP_200_OK, response_model=List[UserResponse], tags=["Usuarios"])
-async def get_following_by_user(id_user: int, db: Session = Depends(get_db)):
-    following = db.query(Follower).filter(Follower.follower_id == id_user).all()
-    users = db.query(User).filter(User.id_user.in_(db.query(Follower.id_user).filter(Follower.follower_id == id_user))).all()
-    return users
+@userRoutes.get('/user/following/{id_user}', status_code=status.HTTP_200_OK, response_model=Page[UserResponse], tags=["Usuarios"])
+async def get_following_by_user(id_user: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    query = db.query(User, Follower.id_follower).join(Follower, Follower.id_user == User.id_user).filter(Follower.follower_id == id_user)
+    rows, next_cursor = paginate(query, (Follower.id_follower,), page.cursor, page.limit)
+    return Page[UserResponse](items=[user for user, _ in rows], next_cursor=next_cursor)
+
+# Funcion para obtener los seguimientos mutuos de un usuario (lo sigue y el lo sigue)
+@userRoutes.get('/user/mutuals/{id_user}', status_code=status.HTTP_200_OK, response_model=Page[UserResponse], tags=["Usuarios"])
+async def get_mutuals_by_user(id_user: int, page: PageParams = Depends(), db: Session = Depends(get_db)):
+    following = aliased(Follower)
+    followed_by = aliased(Follower)
+    query = (
+        db.query(User, following.id_follower)
+        .join(following, following.id_user == User.id_user)
+        .join(followed_by, and_(followed_by.follower_id == User.id_user, followed_by.id_user == following.follower_id))
+        .filter(following.follower_id == id_user)
+    )
+    rows, next_cursor = paginate(query, (following.id_follower,), page.cursor, page.limit)
+    return Page[UserResponse](items=[user for user, _ in rows], next_cursor=next_cursor)
+
+# Funcion para obtener la cantidad de seguidores y seguidos (contadores desnormalizados)
+@userRoutes.get('/user/follow_counts/{id_user}', status_code=status.HTTP_200_OK, response_model=FollowCounts, tags=["Usuarios"])
+async def get_follow_counts(id_user: int, db: Session = Depends(get_db)):
+    counts = db.query(User.id_user, User.follower_count, User.following_count).filter(User.id_user == id_user).first()
+    if not counts:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    return counts
+
+# Funcion para saber si el usuario autenticado sigue (y es seguido por) cada usuario de la lista,
+# p. ej. para los botones de seguir de un listado: /user/follow_status/?user_ids=1&user_ids=2
+@userRoutes.get('/user/follow_status/', status_code=status.HTTP_200_OK, response_model=List[FollowStatus], tags=["Usuarios"])
+async def get_follow_status(user_ids: List[int] = Query(..., max_length=MAX_BATCH_SIZE), db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    user_ids = list(dict.fromkeys(user_ids))
+    following = {row.id_user for row in db.query(Follower.id_user).filter(Follower.follower_id == current_user.id_user, Follower.id_user.in_(user_ids))}
+    followed_by = {row.follower_id for row in db.query(Follower.follower_id).filter(Follower.id_user == current_user.id_user, Follower.follower_id.in_(user_ids))}
+    return [FollowStatus(id_user=user_id, following=user_id in following, followed_by=user_id in followed_by) for user_id in user_ids]
 
 
 
@@ -206,9 +277,73 @@ async def unfollow_user(user_id: int, db: Session = Depends(get_db), current_use
     if not follower:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario no seguido")
     db.delete(follower)
+    adjust_counter(db, User.follower_count, user_id, -1)
+    adjust_counter(db, User.following_count, current_user.id_user, -1)
+    on_user_unfollowed(db, current_user.id_user, user_id)
     db.commit()
+    _invalidate_follow_counts(db, current_user, [user_id])
     return {"message": "Usuario dejado de seguir"}
 
+# Seguir a varios usuarios en una sola peticion (p. ej. en el onboarding): las validaciones se
+# hacen con una consulta por tipo, las filas nuevas en un solo INSERT y todo en una transaccion.
+# Devuelve el resultado de cada id (sin repetidos) en el orden recibido.
+@userRoutes.post('/user/batch/follow', status_code=status.HTTP_200_OK, response_model=List[BatchItemResult], tags=["Usuarios"])
+async def follow_users_batch(batch: FollowBatch, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    user_ids = list(dict.fromkeys(batch.user_ids))
+    existing = {row.id_user for row in db.query(User.id_user).filter(User.id_user.in_(user_ids))}
+    followed = {row.id_user for row in db.query(Follower.id_user).filter(Follower.follower_id == current_user.id_user, Follower.id_user.in_(user_ids))}
+    results = []
+    to_follow = []
+    for user_id in user_ids:
+        if user_id == current_user.id_user:
+            results.append(BatchItemResult(id=user_id, status="invalid", detail="No puedes seguir a ti mismo"))
+        elif user_id not in existing:
+            results.append(BatchItemResult(id=user_id, status="not_found", detail="Usuario no encontrado"))
+        elif user_id in followed:
+            results.append(BatchItemResult(id=user_id, status="duplicate", detail="Usuario ya seguido"))
+        else:
+            to_follow.append(user_id)
+            results.append(BatchItemResult(id=user_id, status="ok"))
+    if to_follow:
+        db.execute(insert(Follower.__table__), [{"id_user": user_id, "follower_id": current_user.id_user} for user_id in to_follow])
+        adjust_counters(db, User.follower_count, to_follow, 1)
+        adjust_counter(db, User.following_count, current_user.id_user, len(to_follow))
+        on_users_followed(db, current_user.id_user, to_follow)
+        db.commit()
+        _invalidate_follow_counts(db, current_user, to_follow)
+    return results
+
+# Unirse a varios foros en una sola peticion, con las mismas reglas que /forum/{forum_id}/join
+# (los foros privados con contrasena la reciben en "passwords")
+@userRoutes.post('/user/batch/join_forum', status_code=status.HTTP_200_OK, response_model=List[BatchItemResult], tags=["Usuarios"])
+async def join_forums_batch(batch: JoinForumBatch, db: Session = Depends(get_db), current_user: User = Depends(get_current_user)):
+    forum_ids = list(dict.fromkeys(batch.forum_ids))
+    forums = {forum.id_forum: forum for forum in db.query(Forum.id_forum, Forum.privacy, Forum.password).filter(Forum.id_forum.in_(forum_ids))}
+    joined = {row.id_forum for row in db.query(UserForum.id_forum).filter(UserForum.id_user == current_user.id_user, UserForum.id_forum.in_(forum_ids))}
+    results = []
+    to_join = []
+    for forum_id in forum_ids:
+        forum = forums.get(forum_id)
+        if forum is None:
+            results.append(BatchItemResult(id=forum_id, status="not_found", detail="Foro no encontrado"))
+        elif forum_id in joined:
+            results.append(BatchItemResult(id=forum_id, status="duplicate", detail="Usuario ya pertenece al foro"))
+        elif forum.privacy == GroupType.Privado and forum.password and not await verify_password_async(batch.passwords.get(forum_id, ''), forum.password):
+            results.append(BatchItemResult(id=forum_id, status="unauthorized", detail="Contraseña incorrecta"))
+        else:
+            to_join.append(forum_id)
+            results.append(BatchItemResult(id=forum_id, status="ok"))
+    if to_join:
+        join_date = datetime.now()
+        db.execute(insert(UserForum.__table__), [
+            {"id_user": current_user.id_user, "id_forum": forum_id, "join_date": join_date} for forum_id in to_join
+        ])
+        adjust_counters(db, Forum.member_count, to_join, 1)
+        on_forums_joined(db, current_user.id_user, to_join)
+        db.commit()
+        await response_cache.invalidate("forums", *(f"forum:{forum_id}" for forum_id in to_join))
+    return results
+
 # Función para actualizar un usuario
 from typing import Optional
 
@@ -230,6 +365,7 @@ async def update_user(
     db_user = db.query(User).filter(User.id_user == user_id).first()
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    previous_mail = db_user.mail
 
     # Actualiza solo los campos enviados
     if name is not None:
@@ -239,7 +375,7 @@ async def update_user(
     if mail is not None:
         db_user.mail = mail
     if password:
-        db_user.password = get_password_hash(password)
+        db_user.password = await get_password_hash_async(password)
     if education_level is not None:
         db_user.education_level = education_level
     if user_type is not None:
@@ -249,19 +385,40 @@ async def update_user(
     if grade is not None:
         db_user.grade = grade
 
-    # Subir y asignar nuevas URLs de imágenes si se proporcionan
-    if background_image:
-        file_key = f"{int(time.time())}_{background_image.filename}"
-        s3.upload_fileobj(background_image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': background_image.content_type})
-        db_user.background_image_url = f"https://educalinkbucket.s3.amazonaws.com/{file_key}"
+    # Subir y asignar nuevas URLs de imágenes si se proporcionan (en paralelo)
+    images = {"background_image_url": background_image, "profile_image_url": profile_image}
+    images = {field: file for field, file in images.items() if file}
+    if images:
+        urls = await upload_service.upload_many(list(images.values()))
+        for field, url in zip(images.keys(), urls):
+            setattr(db_user, field, url)
+
+    image_pipeline.schedule_fields(db, db_user, images.keys())
+    db.commit()
+    db.refresh(db_user)
+    user_cache.invalidate(previous_mail, db_user.mail)
+    return db_user
 
-    if profile_image:
-        file_key = f"{int(time.time())}_{profile_image.filename}"
-        s3.upload_fileobj(profile_image.file, 'educalinkbucket', file_key, ExtraArgs={'ContentType': profile_image.content_type})
-        db_user.profile_image_url = f"https://educalinkbucket.s3.amazonaws.com/{file_key}"
 
+# Funcion para confirmar imagenes de perfil subidas con URL prefirmada (/upload/presign)
+@userRoutes.post('/user/images/confirm', status_code=status.HTTP_200_OK, response_model=UserResponse, tags=["Usuarios"])
+async def confirm_user_images(
+    confirmation: ConfirmUserImages,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user)
+):
+    keys = {"profile_image_url": confirmation.profile_image_key, "background_image_url": confirmation.background_image_key}
+    keys = {field: key for field, key in keys.items() if key}
+    urls = await upload_service.confirm_many(current_user.id_user, list(keys.values()))
+    if None in urls:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Archivo no encontrado o no válido")
+    db_user = db.query(User).filter(User.id_user == current_user.id_user).first()
+    for field, url in zip(keys.keys(), urls):
+        setattr(db_user, field, url)
+    image_pipeline.schedule_fields(db, db_user, keys.keys())
     db.commit()
     db.refresh(db_user)
+    user_cache.invalidate(db_user.mail)
     return db_user
 
 
@@ -271,8 +428,17 @@ async def delete_user(user_id: int, db: Session = Depends(get_db)):
     db_user = db.query(User).filter(User.id_user == user_id).first()
     if not db_user:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Usuario no encontrado")
+    # Las filas hijas se borran en cascada en la base: sus contadores se descuentan antes
+    released = release_user_counters(db, user_id)
+    mails = [db_user.mail] + [row.mail for row in db.query(User.mail).filter(User.id_user.in_(list(released.user_ids)))]
     db.delete(db_user)
     db.commit()
+    user_cache.invalidate(*mails)
+    await response_cache.invalidate(
+        "forums",
+        *(f"forum:{forum_id}" for forum_id in released.forum_ids),
+        *(f"post:{post_id}" for post_id in released.post_ids)
+    )
     return
 
 # Funcion para que un usuario deje un foro
@@ -285,7 +451,10 @@ async def leave_forum(user_id: int, forum_id: int, db: Session = Depends(get_db)
     if db.query(UserForum).filter(UserForum.id_user == user_id).count() == 1:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Usuario debe pertenecer a al menos un foro")
     db.delete(user_forum)
+    adjust_counter(db, Forum.member_count, forum_id, -1)
+    on_forum_left(db, user_id, forum_id)
     db.commit()
+    await response_cache.invalidate("forums", f"forum:{forum_id}")
     return
 
 # Funcion para buscar usuario por nombre y apellido (si es que el usuario lo ingresó)
@@ -316,4 +485,5 @@ async def update_user_state(id_user: int, state: str, db: Session = Depends(get_
     user.state = state
     db.commit()
     db.refresh(user)
+    user_cache.invalidate(user.mail)
     return user
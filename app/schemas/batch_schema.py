@@ -0,0 +1,22 @@
+from typing import Dict, List, Literal
+from pydantic import BaseModel, Field
+
+# Cantidad maxima de elementos por peticion en las operaciones en lote
+MAX_BATCH_SIZE = 100
+
+
+class FollowBatch(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+class JoinForumBatch(BaseModel):
+    forum_ids: List[int] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+    # Contrasenas de los foros privados que la requieren, por id de foro
+    passwords: Dict[int, str] = {}
+
+
+# Resultado de cada elemento del lote: los errores de un elemento no impiden procesar el resto
+class BatchItemResult(BaseModel):
+    id: int
+    status: Literal["ok", "not_found", "duplicate", "invalid", "unauthorized"]
+    detail: str | None = None
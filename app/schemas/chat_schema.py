@@ -1,5 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict
+from app.schemas.message_schema import MessageResponse, SaleMessageResponse
 from app.schemas.user_schema import UserResponse
 class ChatBase(BaseModel):
     # sender_id: int
@@ -23,3 +24,12 @@ class SaleChatResponse(BaseModel):
     id_sale_chat: int
     
     model_config = ConfigDict(from_attributes=True)
+
+# Conversacion del inbox con el ultimo mensaje y la cantidad de mensajes sin leer
+class InboxChatResponse(ChatResponse):
+    last_message: MessageResponse | None = None
+    unread_count: int = 0
+
+class InboxSaleChatResponse(SaleChatResponse):
+    last_message: SaleMessageResponse | None = None
+    unread_count: int = 0
@@ -1,6 +1,7 @@
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict
 
+from app.schemas.pagination_schema import Page
 from app.schemas.user_schema import UserResponse
 
 class CommentBase(BaseModel):
@@ -19,4 +20,8 @@ class CommentResponse(CommentBase):
     
 class CommentResponseWithUser(CommentResponse):
     user: UserResponse
-    comment_date: datetime
\ No newline at end of file
+    comment_date: datetime
+
+# Pagina de un hilo de comentarios con el total de comentarios del post
+class CommentThread(Page[CommentResponseWithUser]):
+    total: int
@@ -8,5 +8,19 @@ class FollowerResponse(BaseModel):
     
 
     model_config = ConfigDict(from_attributes=True)
-    
 
+
+class FollowCounts(BaseModel):
+    id_user: int
+    follower_count: int
+    following_count: int
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Relacion del usuario autenticado con otro usuario
+class FollowStatus(BaseModel):
+    id_user: int
+    following: bool
+    followed_by: bool
+    
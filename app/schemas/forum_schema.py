@@ -1,5 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict, field_serializer
+from typing import Dict, List
 
 from app.schemas.user_schema import UserResponse
 from app.shared.utils.date_reformater import format_date
@@ -24,9 +25,15 @@ class ForumResponse(ForumBase):
     user_name: str
     id_user: int
     users_count: int | None = 1
+    post_count: int | None = 0
+    # Variantes redimensionadas {nombre: url}; None mientras se generan
+    image_variants: Dict[str, str] | None = None
+    background_image_variants: Dict[str, str] | None = None
     
 class ForumResponseWithCreator(ForumResponse):
     creator: UserResponse
+    # Solo se incluye cuando se pide include_users=true
+    users: List[UserResponse] | None = None
 
     # @field_serializer('creation_date')
     # def serialize_datetime(self, creation_date: datetime):
@@ -0,0 +1,25 @@
+from datetime import datetime
+from typing import Any, Dict
+from pydantic import BaseModel, ConfigDict
+from app.models.interfaces import JobStatus
+
+
+class JobResponse(BaseModel):
+    id_job: int
+    kind: str
+    payload: Dict[str, Any]
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    run_at: datetime
+    last_error: str | None = None
+    created_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+# Cantidad de trabajos por tipo y estado
+class JobStats(BaseModel):
+    kind: str
+    status: JobStatus
+    count: int
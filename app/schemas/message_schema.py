@@ -1,6 +1,8 @@
 from datetime import datetime
-from pydantic import BaseModel, ConfigDict
+from typing import List
+from pydantic import BaseModel, ConfigDict, Field
 
+from app.schemas.batch_schema import MAX_BATCH_SIZE, BatchItemResult
 from app.schemas.user_schema import UserResponse
 
 class MessageBase(BaseModel):
@@ -17,6 +19,16 @@ class MessageResponse(MessageBase):
     id_message: int
     sender: UserResponse
     date_message: datetime
+
+
+# Envio de varios mensajes (a uno o varios chats) en una sola peticion
+class MessageBatch(BaseModel):
+    messages: List[MessageCreate] = Field(..., min_length=1, max_length=MAX_BATCH_SIZE)
+
+
+# id es el chat_id del mensaje enviado
+class MessageBatchResult(BatchItemResult):
+    message: MessageResponse | None = None
     
 class SaleMessageBase(BaseModel):
     message: str
@@ -30,3 +42,19 @@ class SaleMessageResponse(SaleMessageBase):
     sender: UserResponse
     date_message: datetime
 
+
+
+# Respuesta de la sincronizacion incremental: mensajes nuevos o editados e ids borrados
+# desde el cursor "since". next_cursor siempre se devuelve para la siguiente llamada.
+class MessageSync(BaseModel):
+    items: List[MessageResponse]
+    deleted: List[int]
+    next_cursor: str | None = None
+    has_more: bool = False
+
+
+class SaleMessageSync(BaseModel):
+    items: List[SaleMessageResponse]
+    deleted: List[int]
+    next_cursor: str | None = None
+    has_more: bool = False
@@ -0,0 +1,9 @@
+from typing import Generic, List, TypeVar
+from pydantic import BaseModel
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: str | None = None
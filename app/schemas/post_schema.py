@@ -4,7 +4,7 @@ from app.models.interfaces import EducationLevel
 from app.schemas.forum_schema import ForumResponse
 from app.schemas.user_schema import UserResponse
 from app.shared.utils.date_reformater import format_date
-from typing import List
+from typing import Dict, List
 
 class PostBase(BaseModel):
     content: str
@@ -22,6 +22,8 @@ class PostResponse(PostBase):
     user: UserResponse
     comment_count: int | None = 0
     image_urls: List[str] | None = None
+    # Variantes {nombre: url} de cada archivo, en el mismo orden que image_urls
+    image_variants: List[Dict[str, str] | None] | None = None
     forum: ForumResponse
     model_config = ConfigDict(from_attributes=True)
 
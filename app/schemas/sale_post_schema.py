@@ -1,4 +1,5 @@
 from datetime import datetime
+from typing import Dict
 from pydantic import BaseModel, ConfigDict
 
 from app.schemas.user_schema import UserResponse
@@ -19,3 +20,5 @@ class SalePostResponse(SalePostBase):
     publication_date: datetime
     status: str
     seller: UserResponse
+    # Variantes redimensionadas {nombre: url}; None mientras se generan
+    image_variants: Dict[str, str] | None = None
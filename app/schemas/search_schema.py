@@ -0,0 +1,23 @@
+import enum
+from pydantic import BaseModel
+from app.schemas.forum_schema import ForumResponseWithCreator
+from app.schemas.post_schema import PostResponse
+from app.schemas.sale_post_schema import SalePostResponse
+from app.schemas.user_schema import UserResponse
+
+
+class SearchType(str, enum.Enum):
+    posts = "posts"
+    forums = "forums"
+    users = "users"
+    sale_posts = "sale_posts"
+
+
+# Solo se llena el campo que corresponde al tipo buscado
+class SearchHit(BaseModel):
+    type: SearchType
+    rank: float
+    post: PostResponse | None = None
+    forum: ForumResponseWithCreator | None = None
+    user: UserResponse | None = None
+    sale_post: SalePostResponse | None = None
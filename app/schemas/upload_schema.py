@@ -0,0 +1,32 @@
+from typing import Dict, List
+from pydantic import BaseModel, ConfigDict
+
+
+class PresignedUploadRequest(BaseModel):
+    filename: str
+    content_type: str
+    size: int
+
+
+class PresignedUploadResponse(BaseModel):
+    key: str
+    url: str
+    fields: Dict[str, str]
+    expires_in: int
+    public_url: str
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ConfirmPostFiles(BaseModel):
+    keys: List[str]
+
+
+class ConfirmUserImages(BaseModel):
+    profile_image_key: str | None = None
+    background_image_key: str | None = None
+
+
+class ConfirmForumImages(BaseModel):
+    image_key: str | None = None
+    background_image_key: str | None = None
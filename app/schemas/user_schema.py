@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import BaseModel, ConfigDict, EmailStr, Field
-from typing import Optional
+from typing import Dict, Optional
 
 # Modelo base con los campos comunes
 class UserBase(BaseModel):
@@ -31,6 +31,11 @@ class UserCreate(UserBase):
 class UserResponse(UserBase):
     id_user: int
     creation_date: datetime
+    follower_count: int | None = 0
+    following_count: int | None = 0
+    # Variantes redimensionadas {nombre: url}; None mientras se generan
+    profile_image_variants: Dict[str, str] | None = None
+    background_image_variants: Dict[str, str] | None = None
 
 class TokenData(BaseModel):
     id_user : int | None = None
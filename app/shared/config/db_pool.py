@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+# Configuracion del pool de conexiones (variables de entorno)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 5))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", 10))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", 30))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", 1800))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+# Tiempo maximo por sentencia en milisegundos (0 = sin limite), solo en Postgres
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", 0))
+
+
+class PoolStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.invalidated = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool):
+        with self._lock:
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+            if timed_out:
+                self.timeouts += 1
+
+    def increment(self, name: str):
+        with self._lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+
+# Estadisticas por nombre de pool ("sync", "async")
+pool_stats = {}
+
+
+class _WaitTimingMixin:
+    # Mide el tiempo de espera para obtener una conexion del pool
+    def _do_get(self):
+        start = time.perf_counter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            if self._stats is not None:
+                self._stats.record_wait(time.perf_counter() - start, timed_out)
+
+
+class InstrumentedQueuePool(_WaitTimingMixin, QueuePool):
+    _stats = None
+
+
+class InstrumentedAsyncQueuePool(_WaitTimingMixin, AsyncAdaptedQueuePool):
+    _stats = None
+
+
+def get_engine_kwargs(url: str, asynchronous: bool = False) -> dict:
+    # SQLite (tests y desarrollo local) usa el pool por defecto de SQLAlchemy
+    if url.startswith("sqlite"):
+        return {}
+    kwargs = {
+        "poolclass": InstrumentedAsyncQueuePool if asynchronous else InstrumentedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+    if DB_STATEMENT_TIMEOUT_MS and url.startswith("postgresql"):
+        if asynchronous:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}"}
+    return kwargs
+
+
+# Registra los eventos del pool de un engine bajo el nombre indicado
+def instrument_pool(pool, name: str):
+    stats = PoolStats()
+    pool_stats[name] = stats
+    pool._stats = stats
+    event.listen(pool, "checkout", lambda *args: stats.increment("checkouts"))
+    event.listen(pool, "checkin", lambda *args: stats.increment("checkins"))
+    event.listen(pool, "connect", lambda *args: stats.increment("connects"))
+    event.listen(pool, "invalidate", lambda *args: stats.increment("invalidated"))
+
+
+def get_pool_snapshot(pool, name: str) -> dict:
+    stats = pool_stats.get(name)
+    snapshot = {"status": pool.status()}
+    if isinstance(pool, QueuePool):
+        snapshot.update({
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "checked_in": pool.checkedin(),
+            "overflow": max(pool.overflow(), 0),
+            "max_overflow": pool._max_overflow,
+            "timeout": pool.timeout(),
+        })
+    if stats:
+        snapshot.update({
+            "checkouts": stats.checkouts,
+            "checkins": stats.checkins,
+            "connects": stats.connects,
+            "invalidated": stats.invalidated,
+            "timeouts": stats.timeouts,
+            "wait_seconds_total": round(stats.wait_seconds_total, 6),
+            "wait_seconds_max": round(stats.wait_seconds_max, 6),
+        })
+    return snapshot
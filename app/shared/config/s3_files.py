@@ -1,31 +1,171 @@
-
-# Step 1: Import necessary modules
+import asyncio
+import hashlib
+import hmac
+import os
+import shutil
 import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List
 import boto3
-import os
 from dotenv import load_dotenv
+from fastapi import UploadFile
 
 load_dotenv()
 
-s3 = boto3.client(
-    's3',
-    aws_access_key_id=os.getenv("aws_access_key_id"),
-    aws_secret_access_key=os.getenv("aws_secret_access_key"),
-    region_name=os.getenv("AWS_REGION", "us-east-1")
-)
+# "s3" en produccion, "local" para desarrollo y tests (guarda en disco)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "s3")
+S3_BUCKET = os.getenv("S3_BUCKET", "educalinkbucket")
+S3_PUBLIC_URL = os.getenv("S3_PUBLIC_URL", f"https://{S3_BUCKET}.s3.amazonaws.com")
+# Permite apuntar a un servidor compatible (moto, minio) en lugar de AWS
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL")
+LOCAL_STORAGE_PATH = os.getenv("LOCAL_STORAGE_PATH", "uploads")
+LOCAL_STORAGE_URL = os.getenv("LOCAL_STORAGE_URL", "/static/uploads")
+# Numero maximo de subidas simultaneas por worker
+UPLOAD_MAX_WORKERS = int(os.getenv("UPLOAD_MAX_WORKERS", 8))
+# Subidas directas con URL prefirmada
+PRESIGNED_UPLOAD_MAX_SIZE = int(os.getenv("PRESIGNED_UPLOAD_MAX_SIZE", 10 * 1024 * 1024))
+PRESIGNED_UPLOAD_EXPIRES = int(os.getenv("PRESIGNED_UPLOAD_EXPIRES", 900))
+ALLOWED_UPLOAD_CONTENT_TYPES = os.getenv(
+    "ALLOWED_UPLOAD_CONTENT_TYPES",
+    "image/jpeg,image/png,image/webp,image/gif,application/pdf"
+).split(",")
+
+
+class S3Storage:
+    def __init__(self):
+        self.bucket = S3_BUCKET
+        self.client = boto3.client(
+            's3',
+            aws_access_key_id=os.getenv("aws_access_key_id"),
+            aws_secret_access_key=os.getenv("aws_secret_access_key"),
+            aws_session_token=os.getenv("aws_session_token"),
+            region_name=os.getenv("AWS_REGION", "us-east-1"),
+            endpoint_url=S3_ENDPOINT_URL
+        )
+
+    def put(self, fileobj, key: str, content_type: str | None):
+        extra_args = {'ContentType': content_type} if content_type else None
+        self.client.upload_fileobj(fileobj, self.bucket, key, ExtraArgs=extra_args)
+
+    def get(self, key: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=key)["Body"].read()
+
+    def url(self, key: str) -> str:
+        return f"{S3_PUBLIC_URL}/{key}"
+
+    # POST prefirmado: S3 valida el tipo de contenido y el tamaño maximo
+    def presign_post(self, key: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        return self.client.generate_presigned_post(
+            Bucket=self.bucket,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[{"Content-Type": content_type}, ["content-length-range", 1, max_size]],
+            ExpiresIn=expires_in
+        )
+
+    # Devuelve el tamaño del objeto o None si no existe
+    def object_size(self, key: str) -> int | None:
+        try:
+            return self.client.head_object(Bucket=self.bucket, Key=key)["ContentLength"]
+        except self.client.exceptions.ClientError:
+            return None
+
+
+class LocalStorage:
+    def __init__(self):
+        self.root = Path(LOCAL_STORAGE_PATH)
+
+    def put(self, fileobj, key: str, content_type: str | None):
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as destination:
+            shutil.copyfileobj(fileobj, destination)
+
+    def get(self, key: str) -> bytes:
+        return (self.root / key).read_bytes()
+
+    def url(self, key: str) -> str:
+        return f"{LOCAL_STORAGE_URL}/{key}"
+
+    # Imita el POST prefirmado de S3 contra el endpoint /upload/local de la API
+    def presign_post(self, key: str, content_type: str, max_size: int, expires_in: int) -> dict:
+        expires = int(time.time()) + expires_in
+        fields = {"key": key, "Content-Type": content_type, "max_size": str(max_size), "expires": str(expires)}
+        fields["signature"] = sign_local_upload(fields)
+        return {"url": "/upload/local", "fields": fields}
+
+    def object_size(self, key: str) -> int | None:
+        path = self.root / key
+        return path.stat().st_size if path.is_file() else None
+
+
+def sign_local_upload(fields: dict) -> str:
+    message = "|".join(fields[name] for name in ("key", "Content-Type", "max_size", "expires"))
+    return hmac.new((os.getenv("SECRET_KEY") or "").encode(), message.encode(), hashlib.sha256).hexdigest()
+
+
+# Servicio de subida compartido: las subidas se ejecutan en un pool de hilos acotado
+# para no bloquear el event loop, y los archivos de una misma peticion se suben en paralelo
+class UploadService:
+    def __init__(self, storage, max_workers: int):
+        self.storage = storage
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload")
+
+    def build_key(self, filename: str | None, prefix: str = "") -> str:
+        name = os.path.basename(filename or "file")
+        return f"{prefix}{int(time.time())}_{uuid.uuid4().hex[:12]}_{name}"
+
+    async def upload(self, file: UploadFile, key: str | None = None) -> str:
+        key = key or self.build_key(file.filename)
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self.storage.put, file.file, key, file.content_type)
+        return self.storage.url(key)
+
+    async def upload_many(self, files: List[UploadFile]) -> List[str]:
+        return list(await asyncio.gather(*(self.upload(file) for file in files)))
+
+    # Clave de un objeto a partir de su URL publica (None si no es de este almacenamiento)
+    def key_for_url(self, url: str) -> str | None:
+        prefix = self.storage.url("")
+        if not url.startswith(prefix) or ".." in url[len(prefix):].split("/"):
+            return None
+        return url[len(prefix):]
+
+    # Las subidas directas de cada usuario quedan bajo su propio prefijo
+    def user_prefix(self, user_id: int) -> str:
+        return f"uploads/{user_id}/"
+
+    def presign(self, user_id: int, filename: str, content_type: str) -> dict:
+        key = self.build_key(filename, prefix=self.user_prefix(user_id))
+        presigned = self.storage.presign_post(key, content_type, PRESIGNED_UPLOAD_MAX_SIZE, PRESIGNED_UPLOAD_EXPIRES)
+        return {
+            "key": key,
+            "url": presigned["url"],
+            "fields": presigned["fields"],
+            "expires_in": PRESIGNED_UPLOAD_EXPIRES,
+            "public_url": self.storage.url(key)
+        }
+
+    # Verifica que la clave sea del usuario y que el objeto ya exista; devuelve su URL publica
+    async def confirm(self, user_id: int, key: str) -> str | None:
+        if not key.startswith(self.user_prefix(user_id)) or ".." in key.split("/"):
+            return None
+        loop = asyncio.get_running_loop()
+        size = await loop.run_in_executor(self.executor, self.storage.object_size, key)
+        if size is None or size > PRESIGNED_UPLOAD_MAX_SIZE:
+            return None
+        return self.storage.url(key)
 
-def upload_single_file_to_s3(file, educalinkbucket):
-    
-    file_key = f"{int(time.time())}_{file.filename}"
-    
-    s3.upload_fileobj(file, educalinkbucket, file_key, ExtraArgs={'ContentType': file.content_type})
-    return f"https://educalinkbucket.s3.amazonaws.com/{file_key}"
+    async def confirm_many(self, user_id: int, keys: List[str]) -> List[str | None]:
+        return list(await asyncio.gather(*(self.confirm(user_id, key) for key in keys)))
 
-def upload_multiple_files_to_s3(files, educalinkbucket):
-    for file in files:
-        file_key = f"{int(time.time())}_{file.filename}"
-        s3.upload_fileobj(file, educalinkbucket, file_key, ExtraArgs={'ContentType': file.content_type})
-        return f"https://educalinkbucket.s3.amazonaws.com/{file_key}"
 
+def build_storage():
+    if STORAGE_BACKEND == "local":
+        return LocalStorage()
+    return S3Storage()
 
 
+upload_service = UploadService(build_storage(), UPLOAD_MAX_WORKERS)
@@ -0,0 +1,171 @@
+import logging
+import os
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+# Consultas mas lentas que esto se registran en el log junto con su ruta
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 200))
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STATEMENT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+# Estadisticas de base de datos de la peticion en curso
+@dataclass
+class RequestStats:
+    route: str = "unmatched"
+    statements: int = 0
+    db_seconds: float = 0.0
+
+
+current_request: ContextVar[RequestStats | None] = ContextVar("current_request", default=None)
+
+
+class Histogram:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+def _labels(**labels) -> str:
+    escaped = (f'{name}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for name, value in labels.items())
+    return "{" + ",".join(escaped) + "}"
+
+
+# Metricas por (metodo, ruta) de este worker en formato de exposicion de Prometheus
+class MetricsRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests: Dict[Tuple[str, str, int], int] = defaultdict(int)
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        self.statements: Dict[Tuple[str, str], Histogram] = {}
+        self.db_seconds: Dict[Tuple[str, str], float] = defaultdict(float)
+        self.slow_queries: Dict[str, int] = defaultdict(int)
+
+    def record_request(self, method: str, route: str, status: int, seconds: float, stats: RequestStats):
+        key = (method, route)
+        with self._lock:
+            self.requests[(method, route, status)] += 1
+            self.latency.setdefault(key, Histogram(LATENCY_BUCKETS)).observe(seconds)
+            self.statements.setdefault(key, Histogram(STATEMENT_BUCKETS)).observe(stats.statements)
+            self.db_seconds[key] += stats.db_seconds
+
+    def record_slow_query(self, route: str):
+        with self._lock:
+            self.slow_queries[route] += 1
+
+    def _histogram_lines(self, name: str, histograms: Dict[Tuple[str, str], Histogram]) -> List[str]:
+        lines = []
+        for (method, route), histogram in sorted(histograms.items()):
+            cumulative = 0
+            for bound, count in zip(histogram.buckets, histogram.counts):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(method=method, route=route, le=bound)} {cumulative}")
+            lines.append(f"{name}_bucket{_labels(method=method, route=route, le='+Inf')} {histogram.count}")
+            lines.append(f"{name}_sum{_labels(method=method, route=route)} {histogram.sum}")
+            lines.append(f"{name}_count{_labels(method=method, route=route)} {histogram.count}")
+        return lines
+
+    def render(self) -> str:
+        with self._lock:
+            lines = ["# HELP http_requests_total Peticiones HTTP por ruta y estado", "# TYPE http_requests_total counter"]
+            for (method, route, status), count in sorted(self.requests.items()):
+                lines.append(f"http_requests_total{_labels(method=method, route=route, status=status)} {count}")
+            lines += ["# HELP http_request_duration_seconds Latencia de las peticiones HTTP", "# TYPE http_request_duration_seconds histogram"]
+            lines += self._histogram_lines("http_request_duration_seconds", self.latency)
+            lines += ["# HELP db_statements_per_request Sentencias SQL ejecutadas por peticion", "# TYPE db_statements_per_request histogram"]
+            lines += self._histogram_lines("db_statements_per_request", self.statements)
+            lines += ["# HELP db_time_seconds_total Tiempo total en la base de datos por ruta", "# TYPE db_time_seconds_total counter"]
+            for (method, route), seconds in sorted(self.db_seconds.items()):
+                lines.append(f"db_time_seconds_total{_labels(method=method, route=route)} {seconds}")
+            lines += ["# HELP db_slow_queries_total Consultas que superaron SLOW_QUERY_MS", "# TYPE db_slow_queries_total counter"]
+            for route, count in sorted(self.slow_queries.items()):
+                lines.append(f"db_slow_queries_total{_labels(route=route)} {count}")
+        return "\n".join(lines) + "\n"
+
+
+metrics_registry = MetricsRegistry()
+
+
+# Los eventos se registran sobre la clase Engine, asi cubren el engine sync y el async
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info["query_start"].pop()
+    stats = current_request.get()
+    route = stats.route if stats else "background"
+    if stats is not None:
+        stats.statements += 1
+        stats.db_seconds += elapsed
+    if elapsed * 1000 >= SLOW_QUERY_MS:
+        metrics_registry.record_slow_query(route)
+        logger.warning("Consulta lenta (%.1f ms) en %s: %s", elapsed * 1000, route, " ".join(statement.split())[:500])
+
+
+# Si la sentencia falla no hay after_cursor_execute: se descarta su marca de inicio
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    starts = context.connection.info.get("query_start") if context.connection is not None else None
+    if starts:
+        starts.pop()
+
+
+# Middleware ASGI: mide cada peticion HTTP, registra las metricas con la plantilla de la ruta
+# (p. ej. /forum/{forum_id}) y agrega el encabezado Server-Timing
+class RequestMetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats()
+        token = current_request.set(stats)
+        start = time.perf_counter()
+        status_code = 500
+
+        def resolve_route():
+            route = scope.get("route")
+            if route is not None:
+                stats.route = getattr(route, "path", stats.route)
+
+        async def send_wrapper(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                resolve_route()
+                if SERVER_TIMING_ENABLED:
+                    total_ms = (time.perf_counter() - start) * 1000
+                    timing = f'app;dur={total_ms:.1f}, db;dur={stats.db_seconds * 1000:.1f};desc="{stats.statements} queries"'
+                    message = {**message, "headers": list(message.get("headers", [])) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            resolve_route()
+            metrics_registry.record_request(scope["method"], stats.route, status_code, time.perf_counter() - start, stats)
+            current_request.reset(token)
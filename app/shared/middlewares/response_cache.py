@@ -0,0 +1,169 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+# Cache de respuestas para endpoints publicos de lectura. Sin RESPONSE_CACHE_URL cada worker
+# tiene su propia cache en memoria (la invalidacion solo alcanza a ese worker y el resto
+# espera al TTL); con varios workers se recomienda un backend compartido (redis://...)
+RESPONSE_CACHE_URL = os.getenv("RESPONSE_CACHE_URL")
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 2048))
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+
+
+@dataclass
+class CachedResponse:
+    body: bytes
+    etag: str
+    media_type: str
+
+
+# Cada entrada se guarda bajo una clave que incluye la version actual de sus tags;
+# invalidar un tag incrementa su version y deja huerfanas las entradas anteriores
+class InMemoryResponseCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._versions: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        with self._lock:
+            return [self._versions.get(tag, 0) for tag in tags]
+
+    async def get(self, key: str) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, response = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return response
+
+    async def set(self, key: str, response: CachedResponse, ttl: int):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, response)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    async def invalidate(self, *tags: str):
+        self.invalidate_sync(*tags)
+
+    # Para codigo sincrono fuera del event loop (p. ej. los hilos de trabajos en segundo plano)
+    def invalidate_sync(self, *tags: str):
+        with self._lock:
+            for tag in tags:
+                self._versions[tag] = self._versions.get(tag, 0) + 1
+
+
+class RedisResponseCache:
+    def __init__(self, url: str):
+        import redis
+        import redis.asyncio
+
+        self.client = redis.asyncio.from_url(url)
+        # Cliente sincrono para invalidar desde hilos sin event loop
+        self.sync_client = redis.from_url(url)
+
+    async def versions(self, tags: List[str]) -> List[int]:
+        values = await self.client.mget([f"response_cache:tag:{tag}" for tag in tags])
+        return [int(value or 0) for value in values]
+
+    async def get(self, key: str) -> CachedResponse | None:
+        value = await self.client.get(f"response_cache:{key}")
+        if value is None:
+            return None
+        etag, media_type, body = value.split(b"\n", 2)
+        return CachedResponse(body=body, etag=etag.decode(), media_type=media_type.decode())
+
+    async def set(self, key: str, response: CachedResponse, ttl: int):
+        value = b"\n".join([response.etag.encode(), response.media_type.encode(), response.body])
+        await self.client.set(f"response_cache:{key}", value, ex=ttl)
+
+    async def invalidate(self, *tags: str):
+        async with self.client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"response_cache:tag:{tag}")
+            await pipe.execute()
+
+    def invalidate_sync(self, *tags: str):
+        with self.sync_client.pipeline(transaction=False) as pipe:
+            for tag in tags:
+                pipe.incr(f"response_cache:tag:{tag}")
+            pipe.execute()
+
+
+@dataclass
+class CachePolicy:
+    ttl: int
+    tags: Callable[[dict], Iterable[str]]
+
+
+# Marca un endpoint GET como cacheable. tags recibe los path params y devuelve los tags
+# que invalidan la respuesta, p. ej. lambda params: ["forum:" + str(params["forum_id"])]
+def cache_response(ttl: int, tags: Callable[[dict], Iterable[str]]):
+    def decorator(endpoint):
+        endpoint.cache_policy = CachePolicy(ttl=ttl, tags=tags)
+        return endpoint
+    return decorator
+
+
+def _etag_matches(if_none_match: str | None, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip().removeprefix("W/") for value in if_none_match.split(",")]
+    return "*" in candidates or etag in candidates
+
+
+# Clase de ruta que sirve los endpoints marcados con cache_response desde la cache, con
+# ETag y respuesta 304 cuando el cliente ya tiene la version actual (If-None-Match)
+class CachedRoute(APIRoute):
+    def get_route_handler(self):
+        handler = super().get_route_handler()
+        policy: CachePolicy | None = getattr(self.endpoint, "cache_policy", None)
+        if policy is None or not RESPONSE_CACHE_ENABLED:
+            return handler
+
+        async def cached_handler(request: Request) -> Response:
+            tags = list(policy.tags(request.path_params))
+            versions = await response_cache.versions(tags)
+            query = "&".join(sorted(f"{name}={value}" for name, value in request.query_params.multi_items()))
+            key = f"{request.url.path}?{query}|" + ",".join(f"{tag}:{version}" for tag, version in zip(tags, versions))
+
+            cached = await response_cache.get(key)
+            if cached is None:
+                response = await handler(request)
+                if response.status_code != 200:
+                    return response
+                cached = CachedResponse(
+                    body=response.body,
+                    etag='"' + hashlib.sha1(response.body).hexdigest() + '"',
+                    media_type=response.media_type or "application/json"
+                )
+                await response_cache.set(key, cached, policy.ttl)
+
+            # no-cache: el cliente puede guardar la respuesta pero debe revalidarla con el ETag
+            headers = {"ETag": cached.etag, "Cache-Control": "no-cache"}
+            if _etag_matches(request.headers.get("if-none-match"), cached.etag):
+                return Response(status_code=304, headers=headers)
+            return Response(content=cached.body, media_type=cached.media_type, headers=headers)
+
+        return cached_handler
+
+
+def build_response_cache():
+    if RESPONSE_CACHE_URL:
+        return RedisResponseCache(RESPONSE_CACHE_URL)
+    return InMemoryResponseCache(RESPONSE_CACHE_MAX_ENTRIES)
+
+
+response_cache = build_response_cache()
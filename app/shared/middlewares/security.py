@@ -1,5 +1,7 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 import os
 from jose import JWTError, jwt
 from passlib.context import CryptContext
@@ -10,7 +12,20 @@ SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 1440 # 1 día 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Costo de bcrypt; al cambiarlo los hashes existentes se actualizan en el siguiente login
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+# "thread" o "process" (un proceso por nucleo evita competir con el GIL del worker)
+PASSWORD_HASH_EXECUTOR = os.getenv("PASSWORD_HASH_EXECUTOR", "thread")
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", os.cpu_count() or 2))
+
+# min_rounds y max_rounds hacen que needs_update marque los hashes con otro costo
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__rounds=BCRYPT_ROUNDS,
+    bcrypt__min_rounds=BCRYPT_ROUNDS,
+    bcrypt__max_rounds=BCRYPT_ROUNDS
+)
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
@@ -18,6 +33,37 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
 def get_password_hash(password: str) -> str:
     return pwd_context.hash(password)
 
+# Devuelve (valido, nuevo_hash); nuevo_hash no es None si el hash usa un costo distinto al configurado
+def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(plain_password, hashed_password)
+
+
+# bcrypt consume ~250ms de CPU por llamada, por eso se ejecuta fuera del event loop
+# en un executor dedicado y acotado
+_password_executor = None
+
+def get_password_executor():
+    global _password_executor
+    if _password_executor is None:
+        if PASSWORD_HASH_EXECUTOR == "process":
+            _password_executor = ProcessPoolExecutor(max_workers=PASSWORD_HASH_WORKERS)
+        else:
+            _password_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+    return _password_executor
+
+async def _run_in_password_executor(function, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_password_executor(), function, *args)
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_in_password_executor(verify_password, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await _run_in_password_executor(get_password_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await _run_in_password_executor(verify_and_update_password, plain_password, hashed_password)
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
     if expires_delta:
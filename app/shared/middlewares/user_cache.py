@@ -0,0 +1,50 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+# Cache LRU con TTL de usuarios autenticados, indexado por el "sub" del token (mail)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", 60))
+USER_CACHE_MAX_SIZE = int(os.getenv("USER_CACHE_MAX_SIZE", 1024))
+
+
+class UserCache:
+    def __init__(self, ttl: float, max_size: int):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, subject: str):
+        with self._lock:
+            entry = self._entries.get(subject)
+            if entry is None:
+                return None
+            expires_at, user = entry
+            if expires_at < time.monotonic():
+                del self._entries[subject]
+                return None
+            self._entries.move_to_end(subject)
+            return user
+
+    def set(self, subject: str, user):
+        if self.ttl <= 0 or self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[subject] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(subject)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *subjects: str | None):
+        with self._lock:
+            for subject in subjects:
+                if subject is not None:
+                    self._entries.pop(subject, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache(USER_CACHE_TTL_SECONDS, USER_CACHE_MAX_SIZE)
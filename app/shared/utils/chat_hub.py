@@ -0,0 +1,148 @@
+import asyncio
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Awaitable, Callable, Dict, Set
+from fastapi import WebSocket
+
+logger = logging.getLogger(__name__)
+
+# Sin CHAT_BROKER_URL los mensajes solo llegan a los websockets del mismo worker.
+# Con varios workers se usa un broker compartido, p. ej. redis://localhost:6379/0
+CHAT_BROKER_URL = os.getenv("CHAT_BROKER_URL")
+
+Handler = Callable[[str, str], Awaitable[None]]
+
+
+# Interfaz del broker: publish envia a todos los workers, subscribe registra el handler
+# que recibe (canal, mensaje) para los canales con websockets conectados en este worker
+class Broker:
+    async def publish(self, channel: str, message: str):
+        raise NotImplementedError
+
+    async def subscribe(self, channel: str, handler: Handler):
+        raise NotImplementedError
+
+    async def unsubscribe(self, channel: str):
+        raise NotImplementedError
+
+    async def close(self):
+        pass
+
+
+# Broker en memoria: entrega directamente dentro del proceso (un solo worker y tests)
+class InMemoryBroker(Broker):
+    def __init__(self):
+        self.handlers: Dict[str, Handler] = {}
+
+    async def publish(self, channel: str, message: str):
+        handler = self.handlers.get(channel)
+        if handler is not None:
+            await handler(channel, message)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers[channel] = handler
+
+    async def unsubscribe(self, channel: str):
+        self.handlers.pop(channel, None)
+
+
+# Broker sobre Redis pub/sub para compartir los mensajes entre workers
+class RedisBroker(Broker):
+    def __init__(self, url: str):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url, decode_responses=True)
+        self.pubsub = self.client.pubsub()
+        self.handlers: Dict[str, Handler] = {}
+        self.reader: asyncio.Task | None = None
+
+    async def publish(self, channel: str, message: str):
+        await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: Handler):
+        self.handlers[channel] = handler
+        await self.pubsub.subscribe(channel)
+        if self.reader is None:
+            self.reader = asyncio.create_task(self._read())
+
+    async def unsubscribe(self, channel: str):
+        self.handlers.pop(channel, None)
+        await self.pubsub.unsubscribe(channel)
+
+    async def _read(self):
+        while True:
+            try:
+                message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+                if message is None:
+                    continue
+                handler = self.handlers.get(message["channel"])
+                if handler is not None:
+                    await handler(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Error leyendo mensajes del broker de chat")
+                await asyncio.sleep(1)
+
+    async def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+        await self.pubsub.close()
+        await self.client.close()
+
+
+# Hub de websockets por chat: cada worker se suscribe a un canal solo mientras tenga
+# participantes conectados a ese chat y reparte cada mensaje entre ellos
+class ChatHub:
+    def __init__(self, broker: Broker):
+        self.broker = broker
+        self.connections: Dict[str, Set[WebSocket]] = defaultdict(set)
+        self._lock = asyncio.Lock()
+
+    async def connect(self, channel: str, websocket: WebSocket):
+        async with self._lock:
+            if not self.connections[channel]:
+                await self.broker.subscribe(channel, self._deliver)
+            self.connections[channel].add(websocket)
+
+    async def disconnect(self, channel: str, websocket: WebSocket):
+        async with self._lock:
+            sockets = self.connections.get(channel)
+            if sockets is None:
+                return
+            sockets.discard(websocket)
+            if not sockets:
+                del self.connections[channel]
+                await self.broker.unsubscribe(channel)
+
+    async def publish(self, channel: str, event: str, data: dict):
+        await self.broker.publish(channel, json.dumps({"event": event, "data": data}, default=str))
+
+    async def _deliver(self, channel: str, message: str):
+        sockets = list(self.connections.get(channel, ()))
+        results = await asyncio.gather(*(websocket.send_text(message) for websocket in sockets), return_exceptions=True)
+        for websocket, result in zip(sockets, results):
+            if isinstance(result, Exception):
+                self.connections.get(channel, set()).discard(websocket)
+
+    async def close(self):
+        await self.broker.close()
+
+
+def chat_channel(chat_id: int) -> str:
+    return f"chat:{chat_id}"
+
+
+def sale_chat_channel(sale_chat_id: int) -> str:
+    return f"sale_chat:{sale_chat_id}"
+
+
+def build_broker() -> Broker:
+    if CHAT_BROKER_URL:
+        return RedisBroker(CHAT_BROKER_URL)
+    return InMemoryBroker()
+
+
+chat_hub = ChatHub(build_broker())
@@ -0,0 +1,114 @@
+import logging
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Iterable, Set
+from sqlalchemy import func, inspect, select, update
+from sqlalchemy.orm import Session
+from app.models.comment import Comment
+from app.models.Forum import Forum
+from app.models.forum_posts import ForumPosts
+from app.models.User import Follower, User
+from app.models.user_forum import UserForum
+
+logger = logging.getLogger(__name__)
+
+# Contadores desnormalizados y la columna de la tabla hija que cuentan
+COUNTERS = [
+    (ForumPosts.comment_count, Comment.post_id),
+    (Forum.post_count, ForumPosts.forum_id),
+    (Forum.member_count, UserForum.id_forum),
+    (User.follower_count, Follower.id_user),
+    (User.following_count, Follower.follower_id),
+]
+
+
+def _owner(counter):
+    model = counter.class_
+    return model, inspect(model).primary_key[0]
+
+
+# Suma delta al contador dentro de la transaccion actual (UPDATE ... SET c = c + delta, sin
+# carreras entre peticiones); el commit queda a cargo de quien llama. Se usa un UPDATE de Core
+# para no disparar los eventos de ORM (p. ej. la invalidacion del indice de busqueda)
+def adjust_counter(db: Session, counter, entity_id: int, delta: int = 1):
+    adjust_counters(db, counter, [entity_id], delta)
+
+
+# Igual que adjust_counter para varias entidades con un solo UPDATE (operaciones en lote)
+def adjust_counters(db: Session, counter, entity_ids: Iterable[int], delta: int = 1):
+    entity_ids = list(entity_ids)
+    if not entity_ids:
+        return
+    model, pk = _owner(counter)
+    column = model.__table__.c[counter.key]
+    db.execute(update(model.__table__).where(pk.in_(entity_ids)).values({column: column + delta}))
+    # Si la entidad ya esta en la sesion se recarga el contador en el proximo acceso
+    for entity_id in entity_ids:
+        instance = db.identity_map.get(inspect(model).identity_key_from_primary_key((entity_id,)))
+        if instance is not None:
+            db.expire(instance, [counter.key])
+
+
+# Resta a cada entidad la cantidad de filas hijas que se van a borrar; rows son pares
+# (id de la entidad, cantidad) y se agrupan para hacer un UPDATE por cada cantidad distinta
+def _release(db: Session, counter, rows):
+    by_count = defaultdict(list)
+    for entity_id, count in rows:
+        by_count[count].append(entity_id)
+    for count, entity_ids in by_count.items():
+        adjust_counters(db, counter, entity_ids, -count)
+
+
+@dataclass
+class ReleasedCounters:
+    forum_ids: Set[int] = field(default_factory=set)
+    post_ids: Set[int] = field(default_factory=set)
+    user_ids: Set[int] = field(default_factory=set)
+
+
+# Descuenta de los contadores las filas que la base borrara en cascada al eliminar un usuario
+# (membresias, posts, comentarios y seguimientos). Se llama antes de borrar el usuario, en la
+# misma transaccion; devuelve las entidades afectadas para invalidar las caches.
+def release_user_counters(db: Session, user_id: int) -> ReleasedCounters:
+    released = ReleasedCounters()
+
+    memberships = db.query(UserForum.id_forum, func.count()).filter(UserForum.id_user == user_id).group_by(UserForum.id_forum).all()
+    _release(db, Forum.member_count, memberships)
+    posts = db.query(ForumPosts.forum_id, func.count()).filter(ForumPosts.user_id == user_id).group_by(ForumPosts.forum_id).all()
+    _release(db, Forum.post_count, posts)
+    released.forum_ids.update(forum_id for forum_id, _ in memberships + posts)
+
+    comments = db.query(Comment.post_id, func.count()).filter(Comment.user_id == user_id).group_by(Comment.post_id).all()
+    _release(db, ForumPosts.comment_count, comments)
+    released.post_ids.update(post_id for post_id, _ in comments)
+
+    followed = db.query(Follower.id_user, func.count()).filter(Follower.follower_id == user_id).group_by(Follower.id_user).all()
+    _release(db, User.follower_count, followed)
+    followers = db.query(Follower.follower_id, func.count()).filter(Follower.id_user == user_id).group_by(Follower.follower_id).all()
+    _release(db, User.following_count, followers)
+    released.user_ids.update(other_id for other_id, _ in followed + followers)
+    return released
+
+
+# Recalcula en bloque todos los contadores desde las tablas hijas y corrige solo las filas
+# desalineadas (p. ej. por borrados en cascada de la base). Devuelve las filas corregidas por contador.
+def reconcile_counters(db: Session) -> dict:
+    corrected = {}
+    for counter, child_key in COUNTERS:
+        model, pk = _owner(counter)
+        column = model.__table__.c[counter.key]
+        actual = select(func.count()).where(child_key == pk).correlate(model.__table__).scalar_subquery()
+        result = db.execute(update(model.__table__).where(column != actual).values({column: actual}))
+        corrected[f"{model.__tablename__}.{counter.key}"] = result.rowcount
+    db.commit()
+    return corrected
+
+
+# Uso como tarea programada: python -m app.shared.utils.counters
+if __name__ == "__main__":
+    from app.shared.config.db import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as session:
+        for name, rows in reconcile_counters(session).items():
+            logger.info("%s: %s filas corregidas", name, rows)
@@ -0,0 +1,37 @@
+from collections import defaultdict
+from typing import List
+from sqlalchemy.orm import Session
+from app.models.Forum import Forum
+from app.models.User import User
+from app.models.user_forum import UserForum
+
+
+# Agrega creator (y opcionalmente la lista de miembros) a una lista de foros con una consulta
+# por dato, en lugar de varias consultas por foro. users_count sale del contador member_count.
+def attach_forum_stats(db: Session, forums: List[Forum], include_creator: bool = True, include_users: bool = False) -> List[Forum]:
+    if not forums:
+        return forums
+    forum_ids = [forum.id_forum for forum in forums]
+
+    creators = {}
+    if include_creator:
+        creator_ids = {forum.id_user for forum in forums}
+        creators = {user.id_user: user for user in db.query(User).filter(User.id_user.in_(creator_ids)).all()}
+
+    members = defaultdict(list)
+    if include_users:
+        rows = (
+            db.query(UserForum.id_forum, User)
+            .join(User, User.id_user == UserForum.id_user)
+            .filter(UserForum.id_forum.in_(forum_ids))
+            .all()
+        )
+        for forum_id, user in rows:
+            members[forum_id].append(user)
+
+    for forum in forums:
+        if include_creator:
+            forum.creator = creators.get(forum.id_user)
+        if include_users:
+            forum.users = members[forum.id_forum]
+    return forums
@@ -0,0 +1,174 @@
+import io
+import logging
+import os
+from sqlalchemy import event, inspect, select, update
+from sqlalchemy.orm import Session
+from app.models.files_model import Files
+from app.models.Forum import Forum
+from app.models.interfaces import JobStatus
+from app.models.job import Job
+from app.models.sale_post import SalePost
+from app.models.User import User
+from app.shared.config.db import SessionLocal
+from app.shared.config.s3_files import upload_service
+from app.shared.middlewares.response_cache import response_cache
+from app.shared.utils.jobs import enqueue, register_job
+
+logger = logging.getLogger(__name__)
+
+# Variantes que se generan de cada imagen: nombre y lado mayor en pixeles (nunca se amplia)
+IMAGE_VARIANT_SIZES = {
+    name: int(size)
+    for name, size in (item.split(":") for item in os.getenv("IMAGE_VARIANT_SIZES", "thumb:320,medium:1080").split(","))
+}
+IMAGE_VARIANT_QUALITY = int(os.getenv("IMAGE_VARIANT_QUALITY", 80))
+IMAGE_PIPELINE_ENABLED = os.getenv("IMAGE_PIPELINE_ENABLED", "true").lower() == "true"
+
+# Columna con la URL original y columna JSON donde se guardan sus variantes ({nombre: url})
+IMAGE_TARGETS = {
+    "post_file": (Files.url, Files.variants),
+    "forum_image": (Forum.image_url, Forum.image_variants),
+    "forum_background": (Forum.background_image_url, Forum.background_image_variants),
+    "user_profile": (User.profile_image_url, User.profile_image_variants),
+    "user_background": (User.background_image_url, User.background_image_variants),
+    "sale_post": (SalePost.image_url, SalePost.image_variants),
+}
+
+# Columna que identifica la entidad de cada imagen y tags de la cache de respuestas que la
+# muestran (las imagenes de usuario aparecen como creador de foros y vendedor)
+IMAGE_CACHE_TAGS = {
+    "post_file": (Files.post_id, lambda post_id: [f"post:{post_id}"]),
+    "forum_image": (Forum.id_forum, lambda forum_id: ["forums", f"forum:{forum_id}"]),
+    "forum_background": (Forum.id_forum, lambda forum_id: ["forums", f"forum:{forum_id}"]),
+    "user_profile": (User.id_user, lambda user_id: ["forums", "sale_posts"]),
+    "user_background": (User.id_user, lambda user_id: ["forums", "sale_posts"]),
+    "sale_post": (SalePost.id_sale_post, lambda sale_post_id: ["sale_posts"]),
+}
+
+
+# Genera miniaturas y versiones WebP de las imagenes subidas como trabajos en segundo plano
+# (app/shared/utils/jobs.py), fuera de la peticion. Las variantes se guardan en el almacenamiento
+# junto al original y sus URLs en la fila que aun apunta a esa imagen (si la imagen se
+# reemplazo antes, no se guarda nada).
+class ImagePipeline:
+    # Encola el procesamiento en la transaccion de quien llama (antes de su commit)
+    def schedule(self, db: Session, target: str, *urls: str | None):
+        if not IMAGE_PIPELINE_ENABLED:
+            return
+        for url in urls:
+            if url:
+                enqueue(db, "images.process", target=target, url=url)
+
+    # Programa las imagenes de los campos de URL indicados de una entidad, p. ej. ["image_url"]
+    def schedule_fields(self, db: Session, instance, fields):
+        for target, (url_column, _) in IMAGE_TARGETS.items():
+            if url_column.class_ is type(instance) and url_column.key in fields:
+                self.schedule(db, target, getattr(instance, url_column.key))
+
+    def process(self, target: str, url: str):
+        # Sin variantes (no es una imagen o no es de nuestro almacenamiento) se guarda {}
+        # para no volver a procesarla
+        self.save(target, url, self.render(url) or {})
+
+    def render(self, url: str) -> dict | None:
+        # Pillow solo es necesario en los despliegues que generan variantes
+        from PIL import Image, ImageOps, UnidentifiedImageError
+
+        key = upload_service.key_for_url(url)
+        if key is None:
+            return None
+        try:
+            image = Image.open(io.BytesIO(upload_service.storage.get(key)))
+            image.load()
+        except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+            # PDFs, documentos o imagenes invalidas se sirven solo en su version original
+            return None
+
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ("RGB", "RGBA"):
+            image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+        stem = key.rsplit(".", 1)[0]
+        variants = {}
+        for name, size in IMAGE_VARIANT_SIZES.items():
+            variant = image.copy()
+            variant.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            variant.save(buffer, "WEBP", quality=IMAGE_VARIANT_QUALITY, method=4)
+            buffer.seek(0)
+            variant_key = f"variants/{stem}_{name}.webp"
+            upload_service.storage.put(buffer, variant_key, "image/webp")
+            variants[name] = upload_service.storage.url(variant_key)
+        return variants
+
+    # UPDATE de Core para no disparar los eventos de ORM (p. ej. el indice de busqueda); despues
+    # se invalidan las respuestas cacheadas que muestran la imagen
+    def save(self, target: str, url: str, variants: dict):
+        url_column, variants_column = IMAGE_TARGETS[target]
+        key_column, cache_tags = IMAGE_CACHE_TAGS[target]
+        table = url_column.class_.__table__
+        with SessionLocal() as db:
+            entity_ids = set(db.scalars(select(key_column).where(url_column == url)))
+            db.execute(update(table).where(table.c[url_column.key] == url).values({table.c[variants_column.key]: variants}))
+            db.commit()
+        tags = {tag for entity_id in entity_ids for tag in cache_tags(entity_id)}
+        if tags:
+            response_cache.invalidate_sync(*tags)
+
+
+image_pipeline = ImagePipeline()
+
+
+@register_job("images.process", max_attempts=3)
+def process_image(target: str, url: str):
+    image_pipeline.process(target, url)
+
+
+# Al cambiar la URL de una imagen se descartan las variantes de la anterior
+def _reset_variants(variants_key: str):
+    def listener(target, value, oldvalue, initiator):
+        if value != oldvalue:
+            setattr(target, variants_key, None)
+    return listener
+
+
+for _url_column, _variants_column in IMAGE_TARGETS.values():
+    event.listen(_url_column, "set", _reset_variants(_variants_column.key))
+
+
+# Encola las variantes de las imagenes existentes que aun no las tienen, recorriendo cada tabla
+# por clave primaria en lotes. Se omiten las URLs que ya tienen un trabajo pendiente o en curso,
+# asi que se puede volver a ejecutar antes de que la cola se vacie
+# (uso: python -m app.shared.utils.image_variants)
+def backfill(batch_size: int = 1000):
+    with SessionLocal() as db:
+        payloads = db.scalars(
+            select(Job.payload).where(Job.kind == "images.process", Job.status.in_([JobStatus.Pendiente, JobStatus.EnCurso]))
+        )
+        queued = {(payload["target"], payload["url"]) for payload in payloads}
+        for target, (url_column, variants_column) in IMAGE_TARGETS.items():
+            pk = inspect(url_column.class_).primary_key[0]
+            last_id = None
+            total = 0
+            while True:
+                query = select(pk, url_column).where(url_column.is_not(None), variants_column.is_(None))
+                if last_id is not None:
+                    query = query.where(pk > last_id)
+                rows = db.execute(query.order_by(pk).limit(batch_size)).all()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                urls = []
+                for _, url in rows:
+                    if (target, url) not in queued:
+                        queued.add((target, url))
+                        urls.append(url)
+                image_pipeline.schedule(db, target, *urls)
+                db.commit()
+                total += len(urls)
+            logger.info("%s: %s imagenes encoladas", target, total)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    backfill()
@@ -0,0 +1,108 @@
+from dataclasses import dataclass
+from typing import Dict, List, Tuple
+from sqlalchemy import and_, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session, aliased
+from app.models.chat import Chat
+from app.models.message import Message
+from app.models.read_marker import ChatReadMarker, SaleChatReadMarker
+from app.models.sale_message import SaleMessage
+from app.models.sale_schat import SaleChat
+from app.models.User import User
+
+
+@dataclass(frozen=True)
+class InboxSpec:
+    chat_model: type
+    chat_pk: str
+    participants: Tuple[str, str]
+    message_model: type
+    message_chat: str
+    message_pk: str
+    marker_model: type
+    marker_chat: str
+
+
+CHAT_INBOX = InboxSpec(Chat, "id_chat", ("sender_id", "receiver_id"), Message, "chat_id", "id_message", ChatReadMarker, "chat_id")
+SALE_CHAT_INBOX = InboxSpec(SaleChat, "id_sale_chat", ("seller_id", "buyer_id"), SaleMessage, "sale_chat_id", "id_sale_message", SaleChatReadMarker, "sale_chat_id")
+
+
+# Conversaciones de un usuario con el ultimo mensaje y los no leidos de cada una, en cuatro
+# consultas fijas: chats, ultimo mensaje (subconsulta correlacionada con LIMIT 1 por chat, que
+# usa el indice (chat, date_message, id) igual que un LATERAL), conteo de no leidos agrupado
+# contra los marcadores de lectura, y participantes.
+# Devuelve [(chat, ultimo mensaje o None, no leidos)] ordenado por actividad reciente, y los usuarios por id.
+def load_inbox(db: Session, spec: InboxSpec, user_id: int) -> Tuple[List[Tuple[object, object, int]], Dict[int, User]]:
+    chat_pk = getattr(spec.chat_model, spec.chat_pk)
+    first, second = (getattr(spec.chat_model, column) for column in spec.participants)
+    chats = db.query(spec.chat_model).filter((first == user_id) | (second == user_id)).all()
+    if not chats:
+        return [], {}
+    chat_ids = [getattr(chat, spec.chat_pk) for chat in chats]
+
+    message = spec.message_model
+    message_chat = getattr(message, spec.message_chat)
+    message_pk = getattr(message, spec.message_pk)
+
+    inner = aliased(message)
+    latest_id = (
+        select(getattr(inner, spec.message_pk))
+        .where(getattr(inner, spec.message_chat) == chat_pk, inner.deleted_at.is_(None))
+        .order_by(inner.date_message.desc(), getattr(inner, spec.message_pk).desc())
+        .limit(1)
+        .correlate(spec.chat_model)
+        .scalar_subquery()
+    )
+    latest = {
+        getattr(row, spec.message_chat): row
+        for row in db.query(message).join(spec.chat_model, message_pk == latest_id).filter(chat_pk.in_(chat_ids)).all()
+    }
+
+    marker = spec.marker_model
+    marker_chat = getattr(marker, spec.marker_chat)
+    unread = dict(
+        db.query(message_chat, func.count(message_pk))
+        .outerjoin(marker, and_(marker_chat == message_chat, marker.user_id == user_id))
+        .filter(
+            message_chat.in_(chat_ids),
+            message.sender_id != user_id,
+            message.deleted_at.is_(None),
+            message_pk > func.coalesce(marker.last_read_message_id, 0)
+        )
+        .group_by(message_chat)
+        .all()
+    )
+
+    user_ids = {getattr(chat, column) for chat in chats for column in spec.participants}
+    users = {user.id_user: user for user in db.query(User).filter(User.id_user.in_(user_ids)).all()}
+
+    entries = [(chat, latest.get(getattr(chat, spec.chat_pk)), unread.get(getattr(chat, spec.chat_pk), 0)) for chat in chats]
+
+    # Primero los chats con el mensaje mas reciente; los chats sin mensajes al final
+    def activity(entry):
+        chat, last_message, _ = entry
+        if last_message is None:
+            return (0, getattr(chat, spec.chat_pk))
+        return (1, last_message.date_message, getattr(last_message, spec.message_pk))
+
+    entries.sort(key=activity, reverse=True)
+    return entries, users
+
+
+# Marca como leidos todos los mensajes actuales del chat para el usuario
+def mark_read(db: Session, spec: InboxSpec, chat_id: int, user_id: int):
+    message = spec.message_model
+    last_id = db.query(func.max(getattr(message, spec.message_pk))).filter(getattr(message, spec.message_chat) == chat_id).scalar() or 0
+    marker_chat = getattr(spec.marker_model, spec.marker_chat)
+    db_marker = db.query(spec.marker_model).filter(spec.marker_model.user_id == user_id, marker_chat == chat_id).first()
+    if db_marker is None:
+        db.add(spec.marker_model(user_id=user_id, last_read_message_id=last_id, **{spec.marker_chat: chat_id}))
+        try:
+            db.commit()
+            return
+        except IntegrityError:
+            # Otra peticion creo el marcador al mismo tiempo
+            db.rollback()
+            db_marker = db.query(spec.marker_model).filter(spec.marker_model.user_id == user_id, marker_chat == chat_id).first()
+    db_marker.last_read_message_id = max(db_marker.last_read_message_id, last_id)
+    db.commit()
@@ -0,0 +1,167 @@
+import logging
+import os
+import random
+import socket
+import threading
+import traceback
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List
+from sqlalchemy import and_, event, or_, update
+from sqlalchemy.orm import Session
+from app.models.interfaces import JobStatus
+from app.models.job import Job
+from app.shared.config.db import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Hilos que ejecutan trabajos en cada worker de la API (0 = solo con el proceso dedicado,
+# python -m app.shared.utils.jobs)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", 2))
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", 2))
+# Un trabajo EnCurso sin terminar tras este tiempo se considera abandonado y se vuelve a tomar
+JOB_LOCK_TIMEOUT = int(os.getenv("JOB_LOCK_TIMEOUT", 300))
+JOB_BACKOFF_BASE = float(os.getenv("JOB_BACKOFF_BASE", 5))
+JOB_BACKOFF_MAX = float(os.getenv("JOB_BACKOFF_MAX", 3600))
+
+
+@dataclass
+class JobHandler:
+    function: Callable
+    max_attempts: int
+
+
+JOB_HANDLERS: Dict[str, JobHandler] = {}
+
+
+# Registra una funcion como trabajo; recibe el payload como argumentos con nombre y debe ser
+# idempotente (un trabajo puede ejecutarse mas de una vez si el worker se cae)
+def register_job(kind: str, max_attempts: int = 5):
+    def decorator(function):
+        JOB_HANDLERS[kind] = JobHandler(function, max_attempts)
+        return function
+    return decorator
+
+
+# Agrega un trabajo a la sesion: se guarda con el commit de quien llama (si la escritura se
+# revierte, el trabajo tambien) y los workers se despiertan despues del commit
+def enqueue(db: Session, kind: str, **payload):
+    handler = JOB_HANDLERS[kind]
+    db.add(Job(kind=kind, payload=payload, max_attempts=handler.max_attempts))
+    event.listen(db, "after_commit", lambda session: job_queue.wake(), once=True)
+
+
+def backoff(attempts: int) -> timedelta:
+    seconds = min(JOB_BACKOFF_MAX, JOB_BACKOFF_BASE * 2 ** (attempts - 1))
+    return timedelta(seconds=seconds * random.uniform(0.8, 1.2))
+
+
+class JobQueue:
+    def __init__(self):
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def wake(self):
+        self._wake.set()
+
+    def start(self, workers: int):
+        self._stop.clear()
+        for number in range(workers):
+            thread = threading.Thread(target=self._run, name=f"jobs-{number}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 10):
+        self._stop.set()
+        self._wake.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                if self.run_next():
+                    continue
+            except Exception:
+                logger.exception("Error en el worker de trabajos")
+            self._wake.wait(JOB_POLL_INTERVAL)
+            self._wake.clear()
+
+    # Toma un trabajo con un UPDATE condicional: si otro worker lo tomo antes no cambia
+    # ninguna fila y se prueba con el siguiente. En Postgres SKIP LOCKED evita esperar.
+    def _claim(self, db: Session) -> Job | None:
+        now = datetime.now()
+        ready = or_(
+            and_(Job.status == JobStatus.Pendiente, Job.run_at <= now),
+            and_(Job.status == JobStatus.EnCurso, Job.locked_at < now - timedelta(seconds=JOB_LOCK_TIMEOUT))
+        )
+        candidates = db.query(Job.id_job, Job.attempts).filter(ready).order_by(Job.run_at).limit(5).with_for_update(skip_locked=True).all()
+        for id_job, attempts in candidates:
+            claimed = db.execute(
+                update(Job)
+                .where(Job.id_job == id_job, Job.attempts == attempts, ready)
+                .values(status=JobStatus.EnCurso, locked_at=now, locked_by=self.name, attempts=attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if claimed.rowcount == 1:
+                db.commit()
+                return db.get(Job, id_job)
+        db.rollback()
+        return None
+
+    # Ejecuta el siguiente trabajo disponible; devuelve False si no habia ninguno
+    def run_next(self) -> bool:
+        with SessionLocal() as db:
+            job = self._claim(db)
+            if job is None:
+                return False
+            handler = JOB_HANDLERS.get(job.kind)
+            try:
+                if handler is None:
+                    raise LookupError(f"Tipo de trabajo desconocido: {job.kind}")
+                handler.function(**job.payload)
+            except Exception:
+                logger.exception("Fallo el trabajo %s (%s), intento %s", job.id_job, job.kind, job.attempts)
+                job.last_error = traceback.format_exc()[-4000:]
+                job.locked_at = None
+                job.locked_by = None
+                if handler is None or job.attempts >= job.max_attempts:
+                    job.status = JobStatus.Fallido
+                else:
+                    job.status = JobStatus.Pendiente
+                    job.run_at = datetime.now() + backoff(job.attempts)
+            else:
+                db.delete(job)
+            db.commit()
+            return True
+
+
+job_queue = JobQueue()
+
+
+# Vuelve a encolar un trabajo Fallido con sus intentos reiniciados
+def retry_job(db: Session, job: Job):
+    job.status = JobStatus.Pendiente
+    job.attempts = 0
+    job.run_at = datetime.now()
+    job.last_error = None
+    db.commit()
+    job_queue.wake()
+
+
+# Proceso dedicado para los trabajos (con JOB_WORKERS=0 en la API)
+if __name__ == "__main__":
+    import time
+    import app.shared.utils.image_variants  # noqa: F401  registra sus trabajos
+    import app.shared.utils.timeline  # noqa: F401
+
+    logging.basicConfig(level=logging.INFO)
+    job_queue.start(int(os.getenv("JOB_PROCESS_WORKERS", 4)))
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        job_queue.stop()
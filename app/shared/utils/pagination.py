@@ -0,0 +1,101 @@
+import base64
+import json
+from datetime import datetime, timedelta
+from typing import Any, List, Sequence, Tuple
+from fastapi import HTTPException, Query, status
+from sqlalchemy import tuple_
+import os
+
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 20))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
+# Margen de la sincronizacion incremental: solo se entregan cambios con marca de tiempo anterior
+# a ahora - SYNC_SETTLE_SECONDS. La marca se asigna al hacer flush y no al commit, asi que una
+# transaccion mas lenta puede confirmar despues una marca menor que la de otra ya confirmada; sin
+# el margen el cursor del cliente la dejaria atras para siempre. Debe superar la duracion maxima
+# de una transaccion de escritura mas el desfase de reloj entre servidores.
+SYNC_SETTLE_SECONDS = float(os.getenv("SYNC_SETTLE_SECONDS", 5))
+
+
+# Parametros comunes de paginacion para los endpoints de listado
+class PageParams:
+    def __init__(
+        self,
+        cursor: str | None = Query(None, description="Cursor opaco devuelto como next_cursor en la pagina anterior"),
+        limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    ):
+        self.cursor = cursor
+        self.limit = limit
+
+
+def _encode_value(value: Any):
+    if isinstance(value, datetime):
+        return {"dt": value.isoformat()}
+    return value
+
+
+def _decode_value(value: Any):
+    if isinstance(value, dict) and "dt" in value:
+        return datetime.fromisoformat(value["dt"])
+    return value
+
+
+# El cursor es un JSON en base64 url-safe; el cliente no debe interpretarlo
+def encode_cursor(values: Sequence[Any]) -> str:
+    raw = json.dumps([_encode_value(value) for value in values], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(values, list):
+            raise ValueError("cursor")
+        return [_decode_value(value) for value in values]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+
+
+# Aplica el filtro keyset y el orden sobre una Query o un Select.
+# columns es la clave de orden, p. ej. (ForumPosts.publication_date, ForumPosts.id_post);
+# la ultima columna debe ser unica para que el orden sea total.
+def apply_keyset(query, columns: Sequence, cursor: str | None, limit: int, descending: bool = True):
+    if cursor:
+        values = decode_cursor(cursor)
+        if len(values) != len(columns):
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Cursor inválido")
+        key = tuple_(*columns)
+        query = query.filter(key < tuple_(*values) if descending else key > tuple_(*values))
+    order = [column.desc() if descending else column.asc() for column in columns]
+    # Se pide un elemento extra para saber si existe una pagina siguiente
+    return query.order_by(*order).limit(limit + 1)
+
+
+# Recorta la fila extra y calcula el next_cursor a partir de la ultima fila de la pagina
+def cut_page(rows: Sequence, columns: Sequence, limit: int) -> Tuple[List, str | None]:
+    rows = list(rows)
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns])
+
+
+def paginate(query, columns: Sequence, cursor: str | None, limit: int, descending: bool = True) -> Tuple[List, str | None]:
+    rows = apply_keyset(query, columns, cursor, limit, descending).all()
+    return cut_page(rows, columns, limit)
+
+
+# Variante para sincronizacion: recorre en orden ascendente desde el cursor y siempre
+# devuelve un cursor (el de la ultima fila, o el recibido si no hay cambios).
+# La primera columna es la marca de modificacion; los cambios de los ultimos SYNC_SETTLE_SECONDS
+# se entregan en una llamada posterior (en tiempo real llegan por el websocket del chat).
+def paginate_since(query, columns: Sequence, cursor: str | None, limit: int) -> Tuple[List, str | None, bool]:
+    query = query.filter(columns[0] <= datetime.now() - timedelta(seconds=SYNC_SETTLE_SECONDS))
+    rows = list(apply_keyset(query, columns, cursor, limit, descending=False).all())
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if not rows:
+        return rows, cursor, False
+    last = rows[-1]
+    return rows, encode_cursor([getattr(last, column.key) for column in columns]), has_more
@@ -0,0 +1,71 @@
+from collections import defaultdict
+from typing import List
+from sqlalchemy.orm import Session
+from app.models.files_model import Files
+from app.models.forum_posts import ForumPosts
+from app.models.Forum import Forum
+from app.models.User import User
+from app.schemas.pagination_schema import Page
+from app.schemas.post_schema import PostResponse
+from app.shared.utils.pagination import paginate
+
+
+# Construye las respuestas de varios posts con un numero fijo de consultas
+# (posts, archivos, foros y autores), sin importar cuantos posts se pidan.
+# comment_count sale del contador de forum_posts. Se respeta el orden de post_ids.
+def build_post_responses(db: Session, post_ids: List[int]) -> List[PostResponse]:
+    if not post_ids:
+        return []
+
+    posts = db.query(ForumPosts).filter(ForumPosts.id_post.in_(post_ids)).all()
+    posts_by_id = {post.id_post: post for post in posts}
+
+    # URLs de los archivos y sus variantes agrupadas por post
+    urls_by_post = defaultdict(list)
+    variants_by_post = defaultdict(list)
+    files = db.query(Files.post_id, Files.url, Files.variants).filter(Files.post_id.in_(post_ids)).order_by(Files.id_file).all()
+    for post_id, url, variants in files:
+        urls_by_post[post_id].append(url)
+        variants_by_post[post_id].append(variants)
+
+    # Foros y autores en una sola consulta cada uno
+    forum_ids = {post.forum_id for post in posts}
+    forums = {forum.id_forum: forum for forum in db.query(Forum).filter(Forum.id_forum.in_(forum_ids)).all()}
+    user_ids = {post.user_id for post in posts}
+    users = {user.id_user: user for user in db.query(User).filter(User.id_user.in_(user_ids)).all()}
+
+    result = []
+    for post_id in post_ids:
+        post = posts_by_id.get(post_id)
+        if post is None:
+            continue
+        result.append(PostResponse(
+            id_post=post.id_post,
+            title=post.title,
+            content=post.content,
+            publication_date=post.publication_date,
+            forum_id=post.forum_id,
+            user=users[post.user_id],
+            comment_count=post.comment_count,
+            image_urls=urls_by_post[post.id_post],
+            image_variants=variants_by_post[post.id_post],
+            forum=forums[post.forum_id],
+            tag=post.tag
+        ))
+    return result
+
+
+# Igual que build_post_responses pero para un solo post
+def build_post_response(db: Session, post_id: int) -> PostResponse | None:
+    responses = build_post_responses(db, [post_id])
+    return responses[0] if responses else None
+
+
+# Clave de orden para paginar posts (mas recientes primero)
+POST_PAGE_KEY = (ForumPosts.publication_date, ForumPosts.id_post)
+
+
+# Pagina una consulta sobre POST_PAGE_KEY e hidrata solo los posts de la pagina
+def paginate_posts(db: Session, query, cursor: str | None, limit: int) -> Page[PostResponse]:
+    rows, next_cursor = paginate(query, POST_PAGE_KEY, cursor, limit)
+    return Page[PostResponse](items=build_post_responses(db, [row.id_post for row in rows]), next_cursor=next_cursor)
@@ -0,0 +1,193 @@
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from functools import reduce
+from math import log
+from typing import Dict, List, Sequence, Tuple
+from sqlalchemy import event, func, literal_column
+from sqlalchemy.orm import Session
+from app.models.Forum import Forum
+from app.models.forum_posts import ForumPosts
+from app.models.sale_post import SalePost
+from app.models.User import User
+
+# "auto" usa full-text de Postgres si la base es Postgres y el indice en memoria en otro caso
+SEARCH_BACKEND = os.getenv("SEARCH_BACKEND", "auto")
+SEARCH_CONFIG = os.getenv("SEARCH_CONFIG", "spanish")
+
+WEIGHTS = {"A": 1.0, "B": 0.4, "C": 0.2, "D": 0.1}
+
+
+@dataclass(frozen=True)
+class SearchTarget:
+    model: type
+    id_column: object
+    # (columna, peso) en el orden en que se concatenan en el documento
+    fields: Tuple[Tuple[object, str], ...]
+
+
+# Las expresiones deben coincidir con los indices GIN de la migracion 0003_search
+SEARCH_TARGETS: Dict[str, SearchTarget] = {
+    "posts": SearchTarget(ForumPosts, ForumPosts.id_post, ((ForumPosts.title, "A"), (ForumPosts.tag, "A"), (ForumPosts.content, "B"))),
+    "forums": SearchTarget(Forum, Forum.id_forum, ((Forum.name, "A"), (Forum.description, "B"))),
+    "users": SearchTarget(User, User.id_user, ((User.name, "A"), (User.lastname, "A"))),
+    "sale_posts": SearchTarget(SalePost, SalePost.id_sale_post, ((SalePost.title, "A"), (SalePost.description, "B"))),
+}
+
+
+# Postgres: tsvector con pesos, stemming en español y sin acentos (f_unaccent), rankeado con ts_rank_cd
+class PostgresSearchBackend:
+    def __init__(self, config: str):
+        self.config = literal_column(f"'{config}'::regconfig")
+
+    def document(self, target: SearchTarget):
+        vectors = [
+            func.setweight(
+                func.to_tsvector(self.config, func.f_unaccent(func.coalesce(column, literal_column("''")))),
+                literal_column(f"'{weight}'")
+            )
+            for column, weight in target.fields
+        ]
+        return reduce(lambda left, right: left.op("||")(right), vectors)
+
+    def search(self, db: Session, target: SearchTarget, text: str, offset: int, limit: int) -> List[Tuple[int, float]]:
+        document = self.document(target)
+        tsquery = func.websearch_to_tsquery(self.config, func.f_unaccent(text))
+        rank = func.ts_rank_cd(document, tsquery)
+        rows = (
+            db.query(target.id_column, rank.label("rank"))
+            .filter(document.op("@@")(tsquery))
+            .order_by(rank.desc(), target.id_column.desc())
+            .offset(offset)
+            .limit(limit)
+            .all()
+        )
+        return [(row[0], float(row[1])) for row in rows]
+
+
+STOPWORDS = frozenset(
+    "a al algo como con de del el en entre es esta este ha hay la las le lo los mas me mi muy no o "
+    "para pero por que se si sin sobre su sus te tu un una uno unos unas y ya yo".split()
+)
+SUFFIXES = ("amientos", "imientos", "amiento", "imiento", "aciones", "uciones", "idades", "mente",
+            "acion", "ucion", "idad", "istas", "ista", "ismos", "ismo", "ables", "ibles", "able", "ible")
+
+
+def fold(text: str) -> str:
+    normalized = unicodedata.normalize("NFKD", text.lower())
+    return "".join(char for char in normalized if not unicodedata.combining(char))
+
+
+# Stemmer ligero para español: quita sufijos derivativos, plurales y la vocal final
+def stem(word: str) -> str:
+    for suffix in SUFFIXES:
+        if len(word) - len(suffix) >= 3 and word.endswith(suffix):
+            word = word[:-len(suffix)]
+            break
+    if len(word) > 4 and word.endswith("es"):
+        word = word[:-2]
+    elif len(word) > 3 and word.endswith("s"):
+        word = word[:-1]
+    if len(word) > 3 and word[-1] in "aeo":
+        word = word[:-1]
+    return word
+
+
+def tokenize(text: str | None) -> List[str]:
+    if not text:
+        return []
+    return [stem(word) for word in re.findall(r"\w+", fold(text)) if word not in STOPWORDS]
+
+
+class InvertedIndex:
+    def __init__(self):
+        self.postings: Dict[str, Dict[int, float]] = defaultdict(dict)
+        self.size = 0
+
+    def build(self, rows: Sequence, weights: Sequence[str]):
+        self.postings.clear()
+        self.size = len(rows)
+        for row in rows:
+            scores = Counter()
+            for value, weight in zip(row[1:], weights):
+                for token in tokenize(value):
+                    scores[token] += WEIGHTS[weight]
+            for token, score in scores.items():
+                self.postings[token][row[0]] = score
+
+    # Todos los terminos deben aparecer (igual que websearch_to_tsquery); el score es tf ponderado * idf
+    def search(self, text: str) -> List[Tuple[int, float]]:
+        terms = set(tokenize(text))
+        if not terms:
+            return []
+        postings = [self.postings.get(term, {}) for term in terms]
+        matches = set.intersection(*(set(posting) for posting in postings))
+        ranked = []
+        for doc_id in matches:
+            score = sum(posting[doc_id] * log(1 + self.size / len(posting)) for posting in postings)
+            ranked.append((doc_id, score))
+        ranked.sort(key=lambda hit: (hit[1], hit[0]), reverse=True)
+        return ranked
+
+
+# Respaldo para SQLite (tests y desarrollo): un indice invertido en memoria por objetivo,
+# que se reconstruye la primera vez que se consulta despues de un cambio en su tabla.
+# Los cambios se detectan con eventos del ORM, asi que solo ve las escrituras de este proceso.
+class InMemorySearchBackend:
+    def __init__(self):
+        self._indexes: Dict[str, InvertedIndex] = {}
+        self._stale = set(SEARCH_TARGETS)
+        self._lock = threading.Lock()
+        for name, target in SEARCH_TARGETS.items():
+            for event_name in ("after_insert", "after_update", "after_delete"):
+                event.listen(target.model, event_name, self._mark_stale(name))
+        event.listen(Session, "after_bulk_update", self._mark_bulk_stale)
+        event.listen(Session, "after_bulk_delete", self._mark_bulk_stale)
+
+    def _mark_stale(self, name: str):
+        def listener(mapper, connection, instance):
+            self._stale.add(name)
+        return listener
+
+    def _mark_bulk_stale(self, update_context):
+        for name, target in SEARCH_TARGETS.items():
+            if update_context.mapper.class_ is target.model:
+                self._stale.add(name)
+
+    def index_for(self, db: Session, name: str) -> InvertedIndex:
+        with self._lock:
+            if name in self._stale or name not in self._indexes:
+                target = SEARCH_TARGETS[name]
+                rows = db.query(target.id_column, *(column for column, _ in target.fields)).all()
+                index = InvertedIndex()
+                index.build(rows, [weight for _, weight in target.fields])
+                self._indexes[name] = index
+                self._stale.discard(name)
+            return self._indexes[name]
+
+    def search(self, db: Session, name: str, text: str, offset: int, limit: int) -> List[Tuple[int, float]]:
+        return self.index_for(db, name).search(text)[offset:offset + limit]
+
+
+class SearchEngine:
+    def __init__(self, backend: str, config: str):
+        self.backend = backend
+        self.postgres = PostgresSearchBackend(config)
+        self.memory = InMemorySearchBackend()
+
+    def uses_postgres(self, db: Session) -> bool:
+        if self.backend == "auto":
+            return db.get_bind().dialect.name == "postgresql"
+        return self.backend == "postgres"
+
+    # Devuelve [(id, rank)] ordenado por relevancia
+    def search(self, db: Session, name: str, text: str, offset: int, limit: int) -> List[Tuple[int, float]]:
+        if self.uses_postgres(db):
+            return self.postgres.search(db, SEARCH_TARGETS[name], text, offset, limit)
+        return self.memory.search(db, name, text, offset, limit)
+
+
+search_engine = SearchEngine(SEARCH_BACKEND, SEARCH_CONFIG)
@@ -0,0 +1,197 @@
+import os
+from datetime import datetime
+from typing import Iterable, Set
+from sqlalchemy import and_, func, insert, or_, select, tuple_, union, update
+from sqlalchemy.orm import Session
+from app.models.Forum import Forum
+from app.models.forum_posts import ForumPosts
+from app.models.interfaces import GroupType
+from app.models.timeline import TimelineEntry
+from app.models.User import Follower, User
+from app.models.user_forum import UserForum
+from app.shared.config.db import SessionLocal
+from app.shared.utils.jobs import register_job
+
+# Cantidad maxima de entradas por usuario; se recorta cuando se supera en un 10%
+TIMELINE_MAX_ENTRIES = int(os.getenv("TIMELINE_MAX_ENTRIES", 500))
+# Los foros con mas miembros no se copian a cada timeline: se leen al vuelo (fan-out on read)
+TIMELINE_FANOUT_LIMIT = int(os.getenv("TIMELINE_FANOUT_LIMIT", 1000))
+# Posts recientes que se agregan al unirse a un foro o seguir a un usuario
+TIMELINE_BACKFILL = int(os.getenv("TIMELINE_BACKFILL", 50))
+
+
+def _member_forums(user_id: int):
+    return select(UserForum.id_forum).where(UserForum.id_user == user_id)
+
+
+def _followed_authors(user_id: int):
+    return select(Follower.id_user).where(Follower.follower_id == user_id)
+
+
+# Posts que un usuario ve en su feed: los de sus foros, los propios y los de usuarios
+# que sigue publicados en foros publicos
+def _visible_to(user_id: int):
+    return or_(
+        ForumPosts.forum_id.in_(_member_forums(user_id)),
+        ForumPosts.user_id == user_id,
+        and_(ForumPosts.user_id.in_(_followed_authors(user_id)), Forum.privacy == GroupType.Publico)
+    )
+
+
+# Usa el contador desnormalizado member_count en lugar de contar user_forum
+def large_forum_ids(db: Session, forum_ids) -> Set[int]:
+    rows = db.query(Forum.id_forum).filter(Forum.id_forum.in_(forum_ids), Forum.member_count > TIMELINE_FANOUT_LIMIT).all()
+    return {row.id_forum for row in rows}
+
+
+def _add_entries(db: Session, user_id: int, condition, limit: int):
+    existing = select(TimelineEntry.post_id).where(TimelineEntry.user_id == user_id)
+    posts = (
+        db.query(ForumPosts.id_post, ForumPosts.publication_date)
+        .join(Forum, Forum.id_forum == ForumPosts.forum_id)
+        .filter(condition, ForumPosts.id_post.notin_(existing))
+        .order_by(ForumPosts.publication_date.desc(), ForumPosts.id_post.desc())
+        .limit(limit)
+        .all()
+    )
+    if posts:
+        db.execute(insert(TimelineEntry), [
+            {"user_id": user_id, "post_id": post.id_post, "publication_date": post.publication_date} for post in posts
+        ])
+
+
+# Recorta los timelines que superan TIMELINE_MAX_ENTRIES (con un margen para no recortar en cada escritura)
+def trim_timelines(db: Session, user_ids: Iterable[int]):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    oversized = (
+        db.query(TimelineEntry.user_id)
+        .filter(TimelineEntry.user_id.in_(user_ids))
+        .group_by(TimelineEntry.user_id)
+        .having(func.count(TimelineEntry.id_entry) > TIMELINE_MAX_ENTRIES + TIMELINE_MAX_ENTRIES // 10)
+        .all()
+    )
+    for (user_id,) in oversized:
+        boundary = (
+            db.query(TimelineEntry.publication_date, TimelineEntry.post_id)
+            .filter(TimelineEntry.user_id == user_id)
+            .order_by(TimelineEntry.publication_date.desc(), TimelineEntry.post_id.desc())
+            .offset(TIMELINE_MAX_ENTRIES)
+            .first()
+        )
+        db.query(TimelineEntry).filter(
+            TimelineEntry.user_id == user_id,
+            tuple_(TimelineEntry.publication_date, TimelineEntry.post_id) <= tuple_(*boundary)
+        ).delete(synchronize_session=False)
+
+
+# Copia un post nuevo al timeline de su autor, de los miembros del foro (si el foro no es
+# grande) y de los seguidores del autor que pueden verlo. Se ejecuta como trabajo en segundo
+# plano (app/shared/utils/jobs.py), con su propia sesion.
+@register_job("timeline.fan_out_post")
+def fan_out_post(post_id: int):
+    with SessionLocal() as db:
+        post = db.get(ForumPosts, post_id)
+        if post is None:
+            return
+        forum = db.get(Forum, post.forum_id)
+        recipients = {post.user_id}
+
+        followers = select(Follower.follower_id).where(Follower.id_user == post.user_id)
+        if forum.privacy != GroupType.Publico:
+            followers = followers.where(Follower.follower_id.in_(select(UserForum.id_user).where(UserForum.id_forum == post.forum_id)))
+        recipients.update(db.scalars(followers))
+
+        if not large_forum_ids(db, [post.forum_id]):
+            recipients.update(db.scalars(select(UserForum.id_user).where(UserForum.id_forum == post.forum_id)))
+        # ensure_timeline pudo haber agregado el post a algun timeline mientras tanto
+        recipients.difference_update(db.scalars(select(TimelineEntry.user_id).where(TimelineEntry.post_id == post.id_post)))
+        if not recipients:
+            return
+
+        db.execute(insert(TimelineEntry), [
+            {"user_id": user_id, "post_id": post.id_post, "publication_date": post.publication_date} for user_id in recipients
+        ])
+        trim_timelines(db, recipients)
+        db.commit()
+
+
+# Construye una sola vez el timeline de un usuario anterior al feed; timeline_built_at lo marca
+# como construido aunque quede vacio. UPDATE de Core para no disparar los eventos de ORM
+def ensure_timeline(db: Session, user_id: int):
+    if db.query(User.timeline_built_at).filter(User.id_user == user_id).scalar() is not None:
+        return
+    _add_entries(db, user_id, _visible_to(user_id), TIMELINE_MAX_ENTRIES)
+    db.execute(update(User.__table__).where(User.__table__.c.id_user == user_id).values(timeline_built_at=datetime.now()))
+    db.commit()
+
+
+# Los hooks de membresia y seguimiento escriben en la transaccion de quien llama, que hace
+# un unico commit junto con el cambio que los origina
+def on_forum_joined(db: Session, user_id: int, forum_id: int):
+    on_forums_joined(db, user_id, [forum_id])
+
+
+# Union a varios foros a la vez: un solo relleno con los posts recientes de todos
+def on_forums_joined(db: Session, user_id: int, forum_ids: Iterable[int]):
+    forum_ids = list(set(forum_ids))
+    if not forum_ids:
+        return
+    large_forums = large_forum_ids(db, forum_ids)
+    forum_ids = [forum_id for forum_id in forum_ids if forum_id not in large_forums]
+    if forum_ids:
+        _add_entries(db, user_id, ForumPosts.forum_id.in_(forum_ids), TIMELINE_BACKFILL)
+        trim_timelines(db, [user_id])
+
+
+# Quita los posts del foro salvo los propios y los de usuarios seguidos en foros publicos
+def on_forum_left(db: Session, user_id: int, forum_id: int):
+    hidden = (
+        select(ForumPosts.id_post)
+        .join(Forum, Forum.id_forum == ForumPosts.forum_id)
+        .where(
+            ForumPosts.forum_id == forum_id,
+            ForumPosts.user_id != user_id,
+            ~and_(ForumPosts.user_id.in_(_followed_authors(user_id)), Forum.privacy == GroupType.Publico)
+        )
+    )
+    db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id, TimelineEntry.post_id.in_(hidden)).delete(synchronize_session=False)
+
+
+def on_user_followed(db: Session, user_id: int, author_id: int):
+    on_users_followed(db, user_id, [author_id])
+
+
+def on_users_followed(db: Session, user_id: int, author_ids: Iterable[int]):
+    author_ids = list(author_ids)
+    if not author_ids:
+        return
+    condition = and_(
+        ForumPosts.user_id.in_(author_ids),
+        or_(Forum.privacy == GroupType.Publico, ForumPosts.forum_id.in_(_member_forums(user_id)))
+    )
+    _add_entries(db, user_id, condition, TIMELINE_BACKFILL)
+    trim_timelines(db, [user_id])
+
+
+# Quita los posts del autor que no estan en foros del usuario
+def on_user_unfollowed(db: Session, user_id: int, author_id: int):
+    hidden = select(ForumPosts.id_post).where(
+        ForumPosts.user_id == author_id,
+        ForumPosts.forum_id.notin_(_member_forums(user_id))
+    )
+    db.query(TimelineEntry).filter(TimelineEntry.user_id == user_id, TimelineEntry.post_id.in_(hidden)).delete(synchronize_session=False)
+
+
+# Consulta del feed sobre (publication_date, id_post): el timeline precalculado, unido con
+# los posts de los foros grandes del usuario cuando los hay
+def feed_query(db: Session, user_id: int):
+    entries = select(TimelineEntry.publication_date.label("publication_date"), TimelineEntry.post_id.label("id_post")).where(TimelineEntry.user_id == user_id)
+    large_forums = large_forum_ids(db, _member_forums(user_id))
+    if large_forums:
+        live = select(ForumPosts.publication_date, ForumPosts.id_post).where(ForumPosts.forum_id.in_(large_forums))
+        feed = union(entries, live).subquery()
+    else:
+        feed = entries.subquery()
+    return db.query(feed.c.publication_date, feed.c.id_post), (feed.c.publication_date, feed.c.id_post)
@@ -0,0 +1,301 @@
+# Prueba de carga de la API sobre una base cargada con benchmarks/seed.py.
+#
+#   STORAGE_BACKEND=local DATABASE_URL=... uvicorn main:app --workers 4
+#   python -m benchmarks.run --base-url http://localhost:8000 --duration 60 --concurrency 32 --output baseline.json
+#   python -m benchmarks.run ... --output optimizado.json --baseline baseline.json
+#
+# Cada hilo simula un usuario autenticado que elige escenarios al azar segun su peso. El
+# reporte incluye throughput, latencias p50/p95/p99 y consultas SQL por peticion (tomadas del
+# encabezado Server-Timing) por escenario. Con --baseline se muestra la variacion contra una
+# corrida anterior. El escenario de subida necesita STORAGE_BACKEND=local en la API.
+import argparse
+import json
+import random
+import re
+import statistics
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List
+import requests
+from benchmarks.seed import BENCH_MAIL, BENCH_PASSWORD
+
+QUERIES_PATTERN = re.compile(r'db;[^,]*desc="(\d+) queries"')
+SEARCH_TERMS = ["matematicas", "lectura comprension", "proyecto de ciencias", "material didactico", "reciclaje", "fracciones"]
+
+
+@dataclass
+class Sample:
+    scenario: str
+    status: int
+    seconds: float
+    queries: int | None
+
+
+@dataclass
+class VirtualUser:
+    id_user: int
+    mail: str
+    session: requests.Session
+    chat_ids: List[int] = field(default_factory=list)
+
+
+# Ids descubiertos a traves de la API al iniciar, compartidos por todos los hilos
+@dataclass
+class Context:
+    base_url: str
+    forum_ids: List[int]
+    post_ids: List[int]
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: List[Sample] = []
+
+    def request(self, user: VirtualUser, scenario: str, method: str, url: str, **kwargs) -> requests.Response:
+        start = time.perf_counter()
+        response = user.session.request(method, url, **kwargs)
+        elapsed = time.perf_counter() - start
+        match = QUERIES_PATTERN.search(response.headers.get("server-timing", ""))
+        self.record(Sample(scenario, response.status_code, elapsed, int(match.group(1)) if match else None))
+        return response
+
+    def record(self, sample: Sample):
+        with self._lock:
+            self.samples.append(sample)
+
+
+def login(base_url: str, mail: str, recorder: Recorder | None = None, user: VirtualUser | None = None) -> dict:
+    data = {"username": mail, "password": BENCH_PASSWORD}
+    if recorder is not None:
+        response = recorder.request(user, "login", "POST", f"{base_url}/token", data=data)
+    else:
+        response = requests.post(f"{base_url}/token", data=data)
+    response.raise_for_status()
+    return response.json()
+
+
+def ids_from_page(response: requests.Response, key: str) -> List[int]:
+    if response.status_code != 200:
+        return []
+    return [item[key] for item in response.json()["items"]]
+
+
+# Escenarios: cada uno recibe (contexto, usuario, recorder, rng) y hace una o mas peticiones
+def scenario_login(ctx, user, recorder, rng):
+    login(ctx.base_url, user.mail, recorder, user)
+
+
+def scenario_feed(ctx, user, recorder, rng):
+    response = recorder.request(user, "feed", "GET", f"{ctx.base_url}/feed/")
+    # Una parte de los usuarios sigue desplazandose a la pagina siguiente
+    if response.status_code == 200 and response.json().get("next_cursor") and rng.random() < 0.3:
+        recorder.request(user, "feed_next_page", "GET", f"{ctx.base_url}/feed/", params={"cursor": response.json()["next_cursor"]})
+
+
+def scenario_post_list(ctx, user, recorder, rng):
+    recorder.request(user, "post_list", "GET", f"{ctx.base_url}/post/")
+
+
+def scenario_forum_posts(ctx, user, recorder, rng):
+    recorder.request(user, "forum_posts", "GET", f"{ctx.base_url}/posts/forum/{rng.choice(ctx.forum_ids)}")
+
+
+def scenario_post_detail(ctx, user, recorder, rng):
+    post_id = rng.choice(ctx.post_ids)
+    recorder.request(user, "post_detail", "GET", f"{ctx.base_url}/post/{post_id}")
+    recorder.request(user, "post_comments", "GET", f"{ctx.base_url}/comments/post/{post_id}")
+
+
+def scenario_forum_list(ctx, user, recorder, rng):
+    recorder.request(user, "forum_list", "GET", f"{ctx.base_url}/forum/")
+
+
+def scenario_forum_detail(ctx, user, recorder, rng):
+    recorder.request(user, "forum_detail", "GET", f"{ctx.base_url}/forum/{rng.choice(ctx.forum_ids)}")
+
+
+def scenario_chat_inbox(ctx, user, recorder, rng):
+    recorder.request(user, "chat_inbox", "GET", f"{ctx.base_url}/chat/inbox")
+
+
+def scenario_chat_history(ctx, user, recorder, rng):
+    if user.chat_ids:
+        recorder.request(user, "chat_history", "GET", f"{ctx.base_url}/message/chat/{rng.choice(user.chat_ids)}")
+
+
+def scenario_search(ctx, user, recorder, rng):
+    recorder.request(user, "search", "GET", f"{ctx.base_url}/search/", params={"q": rng.choice(SEARCH_TERMS), "type": rng.choice(["posts", "forums"])})
+
+
+def scenario_create_post(ctx, user, recorder, rng):
+    data = {"title": "Benchmark", "content": " ".join(rng.choices(SEARCH_TERMS, k=12)), "forum_id": rng.choice(ctx.forum_ids)}
+    recorder.request(user, "create_post", "POST", f"{ctx.base_url}/post/", data=data)
+
+
+def scenario_create_comment(ctx, user, recorder, rng):
+    comment = {"comment_text": " ".join(rng.choices(SEARCH_TERMS, k=5)), "post_id": rng.choice(ctx.post_ids)}
+    recorder.request(user, "create_comment", "POST", f"{ctx.base_url}/comment/", json=comment)
+
+
+def scenario_send_message(ctx, user, recorder, rng):
+    if user.chat_ids:
+        recorder.request(user, "send_message", "POST", f"{ctx.base_url}/message/{rng.choice(user.chat_ids)}", params={"message": "hola desde el benchmark"})
+
+
+# Subida directa: URL prefirmada, POST al almacenamiento local (en lugar de S3) y confirmacion
+def scenario_upload(ctx, user, recorder, rng):
+    content = rng.randbytes(rng.randint(20_000, 200_000))
+    presign = recorder.request(user, "upload_presign", "POST", f"{ctx.base_url}/upload/presign", json={"filename": "foto.png", "content_type": "image/png", "size": len(content)})
+    if presign.status_code != 200:
+        return
+    upload = presign.json()
+    url = upload["url"] if upload["url"].startswith("http") else ctx.base_url + upload["url"]
+    recorder.request(user, "upload_file", "POST", url, data=upload["fields"], files={"file": ("foto.png", content, "image/png")})
+    recorder.request(user, "upload_confirm", "POST", f"{ctx.base_url}/user/images/confirm", json={"profile_image_key": upload["key"]})
+
+
+SCENARIOS: Dict[str, tuple[int, Callable]] = {
+    "login": (1, scenario_login),
+    "feed": (10, scenario_feed),
+    "post_list": (4, scenario_post_list),
+    "forum_posts": (6, scenario_forum_posts),
+    "post_detail": (6, scenario_post_detail),
+    "forum_list": (4, scenario_forum_list),
+    "forum_detail": (3, scenario_forum_detail),
+    "chat_inbox": (3, scenario_chat_inbox),
+    "chat_history": (5, scenario_chat_history),
+    "search": (3, scenario_search),
+    "create_post": (1, scenario_create_post),
+    "create_comment": (2, scenario_create_comment),
+    "send_message": (2, scenario_send_message),
+    "upload": (1, scenario_upload),
+}
+
+
+def prepare(base_url: str, users: int) -> tuple[Context, List[VirtualUser]]:
+    virtual_users = []
+    for n in range(users):
+        mail = BENCH_MAIL.format(n)
+        try:
+            token = login(base_url, mail)
+        except requests.HTTPError:
+            continue
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token['access_token']}"
+        virtual_users.append(VirtualUser(token["token_data"]["id_user"], mail, session))
+    if not virtual_users:
+        raise SystemExit("No se pudo iniciar sesion con los usuarios de benchmark; ejecutar antes benchmarks/seed.py")
+
+    first = virtual_users[0].session
+    forum_ids = ids_from_page(first.get(f"{base_url}/forum/", params={"limit": 100}), "id_forum")
+    post_ids = ids_from_page(first.get(f"{base_url}/post/", params={"limit": 100}), "id_post")
+    for user in virtual_users:
+        inbox = user.session.get(f"{base_url}/chat/inbox")
+        if inbox.status_code == 200:
+            user.chat_ids = [chat["id_chat"] for chat in inbox.json()]
+    return Context(base_url, forum_ids, post_ids), virtual_users
+
+
+def drive(ctx: Context, user: VirtualUser, recorder: Recorder, scenarios, deadline: float, seed_value: int):
+    rng = random.Random(seed_value)
+    names = list(scenarios)
+    weights = [scenarios[name][0] for name in names]
+    while time.perf_counter() < deadline:
+        name = rng.choices(names, weights)[0]
+        try:
+            scenarios[name][1](ctx, user, recorder, rng)
+        except requests.RequestException:
+            # Errores de conexion: cuentan como error y no como latencia
+            recorder.record(Sample(name, 0, 0.0, None))
+
+
+def run(ctx: Context, users: List[VirtualUser], scenarios, seconds: float, concurrency: int, seed_value: int) -> Recorder:
+    recorder = Recorder()
+    deadline = time.perf_counter() + seconds
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(drive, ctx, users[n % len(users)], recorder, scenarios, deadline, seed_value + n) for n in range(concurrency)]
+    for future in futures:
+        future.result()
+    return recorder
+
+
+def percentile(values: List[float], fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def summarize(samples: List[Sample], seconds: float) -> Dict[str, dict]:
+    groups = defaultdict(list)
+    for sample in samples:
+        groups[sample.scenario].append(sample)
+        groups["total"].append(sample)
+    report = {}
+    for name, group in sorted(groups.items()):
+        latencies = [sample.seconds * 1000 for sample in group if sample.status]
+        queries = [sample.queries for sample in group if sample.queries is not None]
+        report[name] = {
+            "requests": len(group),
+            "errors": sum(1 for sample in group if not 200 <= sample.status < 400),
+            "rps": round(len(group) / seconds, 2),
+            "p50_ms": round(percentile(latencies, 0.50), 2) if latencies else None,
+            "p95_ms": round(percentile(latencies, 0.95), 2) if latencies else None,
+            "p99_ms": round(percentile(latencies, 0.99), 2) if latencies else None,
+            "queries_per_request": round(statistics.mean(queries), 2) if queries else None,
+        }
+    return report
+
+
+def print_report(report: Dict[str, dict], baseline: Dict[str, dict] | None):
+    columns = ["requests", "errors", "rps", "p50_ms", "p95_ms", "p99_ms", "queries_per_request"]
+    print(f"{'escenario':<18}" + "".join(f"{column:>22}" for column in columns))
+    for name, row in report.items():
+        cells = []
+        for column in columns:
+            value = row[column]
+            cell = "-" if value is None else str(value)
+            previous = (baseline or {}).get(name, {}).get(column)
+            if value is not None and previous:
+                cell += f" ({(value - previous) / previous * 100:+.0f}%)"
+            cells.append(f"{cell:>22}")
+        print(f"{name:<18}" + "".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prueba de carga de la API")
+    parser.add_argument("--base-url", default="http://localhost:8000")
+    parser.add_argument("--duration", type=float, default=60, help="segundos de medicion")
+    parser.add_argument("--warmup", type=float, default=10, help="segundos de calentamiento (no se reportan)")
+    parser.add_argument("--concurrency", type=int, default=16, help="usuarios simultaneos (hilos)")
+    parser.add_argument("--users", type=int, default=50, help="usuarios distintos que inician sesion")
+    parser.add_argument("--scenarios", help="lista separada por comas; por defecto todos")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="guarda el reporte en JSON")
+    parser.add_argument("--baseline", help="reporte JSON anterior para comparar")
+    args = parser.parse_args()
+
+    scenarios = SCENARIOS
+    if args.scenarios:
+        scenarios = {name: SCENARIOS[name] for name in args.scenarios.split(",")}
+
+    ctx, users = prepare(args.base_url.rstrip("/"), args.users)
+    if args.warmup:
+        run(ctx, users, scenarios, args.warmup, args.concurrency, args.seed)
+    recorder = run(ctx, users, scenarios, args.duration, args.concurrency, args.seed)
+    report = summarize(recorder.samples, args.duration)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["report"]
+    print_report(report, baseline)
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({"args": vars(args), "report": report}, file, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+# Carga una base local con volumenes realistas para las pruebas de carga (ver benchmarks/run.py).
+#
+#   DATABASE_URL=postgresql://... alembic upgrade head
+#   DATABASE_URL=postgresql://... python -m benchmarks.seed --scale 1
+#
+# Se ejecuta sobre una base vacia. --scale multiplica todos los volumenes (0.05 para una prueba rapida). Con la misma semilla
+# (--seed) los datos generados son los mismos, asi las corridas se pueden comparar entre si.
+# Los usuarios son bench{n}@educalink.test con la contrasena BENCH_PASSWORD.
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+from sqlalchemy import func, insert, select
+from app.models.chat import Chat
+from app.models.comment import Comment
+from app.models.Forum import Forum
+from app.models.forum_posts import ForumPosts
+from app.models.interfaces import EducationLevel, GroupType, SaleType, State
+from app.models.message import Message
+from app.models.sale_post import SalePost
+from app.models.User import Follower, User
+from app.models.user_forum import UserForum
+from app.shared.config.db import SessionLocal
+from app.shared.middlewares.security import get_password_hash
+from app.shared.utils.counters import reconcile_counters
+from app.shared.utils.timeline import ensure_timeline
+
+BENCH_PASSWORD = "bench-password"
+BENCH_MAIL = "bench{}@educalink.test"
+
+# Volumenes con --scale 1
+VOLUMES = {
+    "users": 5_000,
+    "forums": 2_000,
+    "memberships_per_user": 8,
+    "follows_per_user": 15,
+    "posts": 200_000,
+    "comments": 400_000,
+    "chats": 10_000,
+    "messages": 300_000,
+    "sale_posts": 20_000,
+}
+
+BATCH_SIZE = 5_000
+
+WORDS = (
+    "matematicas lectura escritura ciencias historia geografia arte musica educacion fisica "
+    "proyecto tarea evaluacion planeacion material didactico actividad grupo alumnos padres "
+    "maestra maestro escuela clase recreo cuaderno libro lapiz colores juego dinamica taller "
+    "fracciones sumas restas multiplicacion division lectura comprension ortografia poema cuento "
+    "experimento plantas animales agua energia reciclaje comunidad valores convivencia inclusion"
+).split()
+
+
+def sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words))
+
+
+def random_date(rng: random.Random, start: datetime, days: int) -> datetime:
+    return start + timedelta(seconds=rng.randrange(days * 86400))
+
+
+def insert_batches(db, model, rows):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) == BATCH_SIZE:
+            db.execute(insert(model), batch)
+            batch = []
+    if batch:
+        db.execute(insert(model), batch)
+    db.commit()
+
+
+def ids_of(db, column, since: int):
+    return list(db.scalars(select(column).where(column > since).order_by(column)))
+
+
+def seed(scale: float, seed_value: int, build_timelines: bool):
+    rng = random.Random(seed_value)
+    volumes = {name: max(1, int(value * scale)) for name, value in VOLUMES.items()}
+    volumes["memberships_per_user"] = VOLUMES["memberships_per_user"]
+    volumes["follows_per_user"] = VOLUMES["follows_per_user"]
+    volumes["users"] = max(2, volumes["users"])
+    start = datetime.now() - timedelta(days=365)
+    password = get_password_hash(BENCH_PASSWORD)
+    levels = list(EducationLevel)
+
+    with SessionLocal() as db:
+        if db.query(User.id_user).filter(User.mail == BENCH_MAIL.format(0)).first() is not None:
+            raise SystemExit("La base ya tiene datos de benchmark; usar una base vacia")
+
+        def step(name, started):
+            print(f"{name}: {time.perf_counter() - started:.1f}s")
+
+        started = time.perf_counter()
+        offset = db.scalar(select(func.coalesce(func.max(User.id_user), 0)))
+        insert_batches(db, User, ({
+            "name": rng.choice(WORDS).title(),
+            "lastname": rng.choice(WORDS).title(),
+            "mail": BENCH_MAIL.format(n),
+            "password": password,
+            "user_type": "User",
+            "education_level": rng.choice(levels),
+            "grade": rng.randint(1, 6),
+            "creation_date": random_date(rng, start, 30),
+            "state": State.Activo,
+            "deleted": False,
+        } for n in range(volumes["users"])))
+        users = ids_of(db, User.id_user, offset)
+        step("users", started)
+
+        started = time.perf_counter()
+        offset = db.scalar(select(func.coalesce(func.max(Forum.id_forum), 0)))
+        insert_batches(db, Forum, ({
+            "name": f"{sentence(rng, 3).title()} {n}",
+            "description": sentence(rng, 25),
+            "creation_date": random_date(rng, start, 60),
+            "education_level": rng.choice(levels),
+            "grade": rng.randint(1, 6),
+            # Uno de cada cinco foros es privado
+            "privacy": GroupType.Privado if rng.random() < 0.2 else GroupType.Publico,
+            "user_name": "bench",
+            "id_user": rng.choice(users),
+        } for n in range(volumes["forums"])))
+        forums = ids_of(db, Forum.id_forum, offset)
+        step("forums", started)
+
+        # Membresias con distribucion sesgada: pocos foros concentran muchos miembros
+        started = time.perf_counter()
+        memberships = {}
+        for user_id in users:
+            count = min(len(forums), rng.randint(1, 2 * volumes["memberships_per_user"]))
+            joined = {forums[min(int(rng.paretovariate(1.2)) - 1, len(forums) - 1)] if rng.random() < 0.5 else rng.choice(forums) for _ in range(count)}
+            memberships[user_id] = list(joined)
+        insert_batches(db, UserForum, (
+            {"id_user": user_id, "id_forum": forum_id, "join_date": random_date(rng, start, 60)}
+            for user_id, joined in memberships.items() for forum_id in joined
+        ))
+        step("memberships", started)
+
+        started = time.perf_counter()
+        follows = set()
+        for user_id in users:
+            for _ in range(rng.randint(0, 2 * volumes["follows_per_user"])):
+                author = rng.choice(users)
+                if author != user_id:
+                    follows.add((author, user_id))
+        insert_batches(db, Follower, ({"id_user": author, "follower_id": follower} for author, follower in follows))
+        step("followers", started)
+
+        started = time.perf_counter()
+        offset = db.scalar(select(func.coalesce(func.max(ForumPosts.id_post), 0)))
+
+        def post_rows():
+            for _ in range(volumes["posts"]):
+                user_id = rng.choice(users)
+                yield {
+                    "title": sentence(rng, 5)[:100],
+                    "content": sentence(rng, rng.randint(20, 120)),
+                    "publication_date": random_date(rng, start, 365),
+                    "forum_id": rng.choice(memberships[user_id]),
+                    "user_id": user_id,
+                    "tag": rng.choice(WORDS),
+                }
+        insert_batches(db, ForumPosts, post_rows())
+        posts = ids_of(db, ForumPosts.id_post, offset)
+        step("posts", started)
+
+        started = time.perf_counter()
+        insert_batches(db, Comment, ({
+            "user_id": rng.choice(users),
+            "comment_text": sentence(rng, rng.randint(5, 40)),
+            "comment_date": random_date(rng, start, 365),
+            "post_id": rng.choice(posts),
+        } for _ in range(volumes["comments"])))
+        step("comments", started)
+
+        started = time.perf_counter()
+        offset = db.scalar(select(func.coalesce(func.max(Chat.id_chat), 0)))
+        pairs = set()
+        while len(pairs) < min(volumes["chats"], len(users) * (len(users) - 1) // 2):
+            pairs.add(tuple(rng.sample(users, 2)))
+        insert_batches(db, Chat, ({"sender_id": sender, "receiver_id": receiver} for sender, receiver in pairs))
+        chats = dict(db.execute(select(Chat.id_chat, Chat.sender_id).where(Chat.id_chat > offset)).all())
+        receivers = dict(db.execute(select(Chat.id_chat, Chat.receiver_id).where(Chat.id_chat > offset)).all())
+        chat_ids = list(chats)
+        step("chats", started)
+
+        started = time.perf_counter()
+
+        def message_rows():
+            for _ in range(volumes["messages"]):
+                chat_id = rng.choice(chat_ids)
+                sent = random_date(rng, start, 365)
+                yield {
+                    "sender_id": chats[chat_id] if rng.random() < 0.5 else receivers[chat_id],
+                    "chat_id": chat_id,
+                    "message": sentence(rng, rng.randint(2, 30)),
+                    "date_message": sent,
+                    "updated_at": sent,
+                }
+        insert_batches(db, Message, message_rows())
+        step("messages", started)
+
+        started = time.perf_counter()
+        insert_batches(db, SalePost, ({
+            "title": sentence(rng, 4)[:100],
+            "description": sentence(rng, rng.randint(10, 60)),
+            "price": Decimal(rng.randint(1000, 500000)) / 100,
+            "publication_date": random_date(rng, start, 365),
+            "sale_type": rng.choice(list(SaleType)),
+            "seller_id": rng.choice(users),
+        } for _ in range(volumes["sale_posts"])))
+        step("sale_posts", started)
+
+        # Las inserciones masivas no pasan por los endpoints: se recalculan los contadores
+        started = time.perf_counter()
+        reconcile_counters(db)
+        step("counters", started)
+
+        if build_timelines:
+            started = time.perf_counter()
+            for user_id in users:
+                ensure_timeline(db, user_id)
+            step("timelines", started)
+
+    print(f"Usuarios {BENCH_MAIL.format(0)} .. {BENCH_MAIL.format(volumes['users'] - 1)}, contrasena {BENCH_PASSWORD!r}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Carga datos de prueba para los benchmarks")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiplicador de los volumenes (1 = %s posts)" % VOLUMES["posts"])
+    parser.add_argument("--seed", type=int, default=42, help="semilla para generar siempre los mismos datos")
+    parser.add_argument("--skip-timelines", action="store_true", help="no precalcular los timelines del feed")
+    args = parser.parse_args()
+    seed(args.scale, args.seed, not args.skip_timelines)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 from fastapi import FastAPI, Depends,status, HTTPException
 from sqlalchemy.orm import Session
 from typing import List
+import os
 # from pymongo.mongo_client import MongoClient
 # from app.shared.config.mongoConnection import client
 from app.routes.upload_router import uploadRoutes
 from app.shared.config.db import engine, get_db, Base
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
+from app.shared.config.s3_files import STORAGE_BACKEND, LOCAL_STORAGE_PATH, LOCAL_STORAGE_URL
 from app.routes.user_router import userRoutes
 from app.routes.employeeRouter import employeeRoutes
 from app.routes.forum_router import forumRoutes
@@ -15,6 +18,13 @@ from app.routes.sale_post_router import salePostRoutes
 from app.routes.chat_router import chatRoutes
 from app.routes.message_router import messageRoutes
 from app.routes.ads_router import adsRoutes
+from app.routes.metrics_router import metricsRoutes
+from app.routes.search_router import searchRoutes
+from app.routes.feed_router import feedRoutes
+from app.routes.jobs_router import jobsRoutes
+from app.shared.utils.chat_hub import chat_hub
+from app.shared.utils.jobs import JOB_WORKERS, job_queue
+from app.shared.middlewares.request_metrics import RequestMetricsMiddleware
 app = FastAPI()
 
 app.include_router(userRoutes)
@@ -27,6 +37,30 @@ app.include_router(chatRoutes)
 app.include_router(messageRoutes)
 app.include_router(adsRoutes)
 app.include_router(uploadRoutes)
+app.include_router(metricsRoutes)
+app.include_router(searchRoutes)
+app.include_router(feedRoutes)
+app.include_router(jobsRoutes)
+
+# Con el almacenamiento local (desarrollo y tests) los archivos se sirven desde la propia API
+if STORAGE_BACKEND == "local":
+    os.makedirs(LOCAL_STORAGE_PATH, exist_ok=True)
+    app.mount(LOCAL_STORAGE_URL, StaticFiles(directory=LOCAL_STORAGE_PATH), name="uploads")
+
+# Cierra la conexion del broker de chat (Redis) al apagar el worker
+@app.on_event("shutdown")
+async def close_chat_hub():
+    await chat_hub.close()
+
+# Hilos que ejecutan los trabajos en segundo plano (app/shared/utils/jobs.py)
+@app.on_event("startup")
+def start_job_workers():
+    job_queue.start(JOB_WORKERS)
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_queue.stop()
+
 origins = [
     "http://localhost",
     "http://localhost:8080",
@@ -42,5 +76,11 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-Base.metadata.create_all(bind=engine)
+# Latencia, sentencias SQL y tiempo en la base de datos por ruta (GET /metrics y Server-Timing)
+app.add_middleware(RequestMetricsMiddleware)
+
+# El esquema se gestiona con migraciones (`alembic upgrade head`); create_all solo
+# se usa en desarrollo/tests con DB_AUTO_CREATE=true
+if os.getenv("DB_AUTO_CREATE", "false").lower() == "true":
+    Base.metadata.create_all(bind=engine)
 
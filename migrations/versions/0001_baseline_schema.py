@@ -0,0 +1,183 @@
+"""baseline schema
+
+Esquema tal como lo creaba Base.metadata.create_all en main.py. En bases de datos
+existentes se marca con `alembic stamp 0001_baseline` en lugar de aplicarse.
+
+Revision ID: 0001_baseline
+Revises:
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+revision = '0001_baseline'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+# Los tipos enum se crean una sola vez al inicio (create_type=False evita que cada
+# create_table intente crearlos de nuevo en Postgres); en SQLite se guardan como VARCHAR
+education_level = postgresql.ENUM('Primaria', 'Preescolar', name='educationlevel', create_type=False)
+state = postgresql.ENUM('Activo', 'Bloqueado', name='state', create_type=False)
+group_type = postgresql.ENUM('Privado', 'Publico', name='grouptype', create_type=False)
+post_status = postgresql.ENUM('Disponible', 'Vendido', name='poststatus', create_type=False)
+sale_type = postgresql.ENUM(
+    'Material_didactico', 'Recursos_de_clase', 'Libros', 'Juguetes', 'Mobiliario',
+    'Decoracion', 'Electronica', 'Uniformes', 'Otros', name='saletype', create_type=False
+)
+ENUMS = (education_level, state, group_type, post_status, sale_type)
+
+
+def user_fk(column, **kwargs):
+    return sa.Column(column, sa.Integer, sa.ForeignKey('user.id_user', ondelete='CASCADE', onupdate='CASCADE'), nullable=False, **kwargs)
+
+
+def upgrade():
+    bind = op.get_bind()
+    for enum in ENUMS:
+        enum.create(bind, checkfirst=True)
+
+    op.create_table(
+        'user',
+        sa.Column('id_user', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('background_image_url', sa.Text, nullable=True),
+        sa.Column('profile_image_url', sa.Text, nullable=True),
+        sa.Column('lastname', sa.String(255), nullable=False),
+        sa.Column('mail', sa.String(255), nullable=False),
+        sa.Column('password', sa.String(255), nullable=False),
+        sa.Column('user_type', sa.String(255), nullable=False),
+        sa.Column('education_level', education_level, nullable=False),
+        sa.Column('grade', sa.Integer, nullable=False),
+        sa.Column('creation_date', sa.DateTime, nullable=False),
+        sa.Column('state', state, nullable=True),
+        sa.Column('deleted', sa.Boolean, nullable=True),
+    )
+    op.create_index('ix_user_id_user', 'user', ['id_user'])
+
+    op.create_table(
+        'follower',
+        sa.Column('id_follower', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('id_user'),
+        user_fk('follower_id'),
+    )
+    op.create_index('ix_follower_id_follower', 'follower', ['id_follower'])
+
+    op.create_table(
+        'forum',
+        sa.Column('id_forum', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('name', sa.String(255), nullable=False),
+        sa.Column('background_image_url', sa.String(255), nullable=True),
+        sa.Column('image_url', sa.String(255), nullable=True),
+        sa.Column('description', sa.Text, nullable=False),
+        sa.Column('creation_date', sa.DateTime, nullable=False),
+        sa.Column('education_level', education_level, nullable=False),
+        sa.Column('grade', sa.Integer, nullable=False),
+        sa.Column('privacy', group_type, nullable=False),
+        sa.Column('user_name', sa.String(100), nullable=False),
+        user_fk('id_user'),
+        sa.Column('password', sa.String(255), nullable=True),
+    )
+    op.create_index('ix_forum_id_forum', 'forum', ['id_forum'])
+
+    op.create_table(
+        'user_forum',
+        sa.Column('id_member', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('id_user'),
+        sa.Column('id_forum', sa.Integer, sa.ForeignKey('forum.id_forum', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('join_date', sa.DateTime, nullable=False),
+    )
+    op.create_index('ix_user_forum_id_member', 'user_forum', ['id_member'])
+
+    op.create_table(
+        'forum_posts',
+        sa.Column('id_post', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('title', sa.String(100), nullable=False),
+        sa.Column('content', sa.Text, nullable=False),
+        sa.Column('publication_date', sa.DateTime, nullable=False),
+        sa.Column('forum_id', sa.Integer, sa.ForeignKey('forum.id_forum', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        user_fk('user_id'),
+        sa.Column('tag', sa.String(100), nullable=True),
+    )
+
+    op.create_table(
+        'comment',
+        sa.Column('id_comment', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('user_id'),
+        sa.Column('comment_text', sa.Text, nullable=False),
+        sa.Column('comment_date', sa.DateTime, nullable=False),
+        sa.Column('post_id', sa.Integer, sa.ForeignKey('forum_posts.id_post', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+    )
+
+    op.create_table(
+        'post_files',
+        sa.Column('id_file', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('post_id', sa.Integer, sa.ForeignKey('forum_posts.id_post', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('url', sa.String(255), nullable=False),
+    )
+
+    op.create_table(
+        'ads',
+        sa.Column('id_ad', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('title', sa.String(100), nullable=False),
+        sa.Column('description', sa.Text, nullable=False),
+        sa.Column('image_url', sa.String(255), nullable=False),
+        sa.Column('link', sa.String(255), nullable=False),
+        sa.Column('created_at', sa.DateTime, nullable=True),
+    )
+
+    op.create_table(
+        'chat',
+        sa.Column('id_chat', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('sender_id'),
+        user_fk('receiver_id'),
+    )
+
+    op.create_table(
+        'messages',
+        sa.Column('id_message', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('sender_id'),
+        sa.Column('chat_id', sa.Integer, sa.ForeignKey('chat.id_chat', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('message', sa.Text, nullable=False),
+        sa.Column('date_message', sa.DateTime, nullable=False),
+    )
+
+    op.create_table(
+        'sale_chat',
+        sa.Column('id_sale_chat', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('seller_id'),
+        user_fk('buyer_id'),
+    )
+
+    op.create_table(
+        'sale_message',
+        sa.Column('id_sale_message', sa.Integer, primary_key=True, autoincrement=True),
+        user_fk('sender_id'),
+        sa.Column('sale_chat_id', sa.Integer, sa.ForeignKey('sale_chat.id_sale_chat', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('message', sa.Text, nullable=False),
+        sa.Column('date_message', sa.DateTime, nullable=False),
+    )
+
+    op.create_table(
+        'sale_posts',
+        sa.Column('id_sale_post', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('title', sa.String(100), nullable=False),
+        sa.Column('description', sa.Text, nullable=False),
+        sa.Column('price', sa.Numeric(10, 2), nullable=False),
+        sa.Column('image_url', sa.Text, nullable=True),
+        sa.Column('publication_date', sa.DateTime, nullable=False),
+        sa.Column('sale_type', sale_type, nullable=False),
+        sa.Column('status', post_status, nullable=True),
+        user_fk('seller_id'),
+    )
+
+
+def downgrade():
+    for table in ('sale_posts', 'sale_message', 'sale_chat', 'messages', 'chat', 'ads', 'post_files',
+                  'comment', 'forum_posts', 'user_forum', 'forum', 'follower', 'user'):
+        op.drop_table(table)
+    bind = op.get_bind()
+    for enum in ENUMS:
+        enum.drop(bind, checkfirst=True)
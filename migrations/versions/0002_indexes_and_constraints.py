@@ -0,0 +1,85 @@
+"""indexes and unique constraints
+
+Indices para las llaves foraneas y columnas de filtro mas usadas, correo unico y
+unicidad de user_forum / follower. Antes de crear las restricciones se eliminan
+las filas duplicadas de user_forum y follower (se conserva la de menor id). Los
+correos duplicados en user no se resuelven automaticamente (son cuentas distintas):
+la migracion se detiene y los lista para corregirlos a mano.
+
+Revision ID: 0002_indexes
+Revises: 0001_baseline
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0002_indexes'
+down_revision = '0001_baseline'
+branch_labels = None
+depends_on = None
+
+# (nombre, tabla, columnas, unico)
+INDEXES = [
+    ('ix_user_mail', 'user', ['mail'], True),
+    ('ix_follower_follower_id', 'follower', ['follower_id'], False),
+    ('ix_forum_id_user', 'forum', ['id_user'], False),
+    ('ix_forum_grade_education_level', 'forum', ['grade', 'education_level'], False),
+    ('ix_forum_creation_date_id_forum', 'forum', ['creation_date', 'id_forum'], False),
+    ('ix_user_forum_id_forum', 'user_forum', ['id_forum'], False),
+    ('ix_forum_posts_tag', 'forum_posts', ['tag'], False),
+    ('ix_forum_posts_publication_date_id_post', 'forum_posts', ['publication_date', 'id_post'], False),
+    ('ix_forum_posts_forum_id_publication_date', 'forum_posts', ['forum_id', 'publication_date', 'id_post'], False),
+    ('ix_forum_posts_user_id_publication_date', 'forum_posts', ['user_id', 'publication_date', 'id_post'], False),
+    ('ix_comment_post_id_comment_date', 'comment', ['post_id', 'comment_date', 'id_comment'], False),
+    ('ix_comment_user_id', 'comment', ['user_id'], False),
+    ('ix_post_files_post_id', 'post_files', ['post_id'], False),
+    ('ix_chat_sender_id_receiver_id', 'chat', ['sender_id', 'receiver_id'], False),
+    ('ix_chat_receiver_id', 'chat', ['receiver_id'], False),
+    ('ix_messages_chat_id_date_message', 'messages', ['chat_id', 'date_message', 'id_message'], False),
+    ('ix_messages_sender_id', 'messages', ['sender_id'], False),
+    ('ix_sale_chat_seller_id', 'sale_chat', ['seller_id'], False),
+    ('ix_sale_chat_buyer_id', 'sale_chat', ['buyer_id'], False),
+    ('ix_sale_message_sale_chat_id_date_message', 'sale_message', ['sale_chat_id', 'date_message', 'id_sale_message'], False),
+    ('ix_sale_message_sender_id', 'sale_message', ['sender_id'], False),
+    ('ix_sale_posts_sale_type', 'sale_posts', ['sale_type'], False),
+    ('ix_sale_posts_seller_id_status', 'sale_posts', ['seller_id', 'status'], False),
+    ('ix_sale_posts_publication_date_id_sale_post', 'sale_posts', ['publication_date', 'id_sale_post'], False),
+]
+
+
+def upgrade():
+    duplicated_mails = op.get_bind().execute(sa.text(
+        'SELECT mail, COUNT(*) FROM "user" GROUP BY mail HAVING COUNT(*) > 1 ORDER BY mail'
+    )).all()
+    if duplicated_mails:
+        listed = ", ".join(f"{mail} ({count})" for mail, count in duplicated_mails)
+        raise RuntimeError(
+            "No se puede crear el indice unico ix_user_mail: hay correos repetidos en user. "
+            f"Unifica o corrige estas cuentas y vuelve a ejecutar la migracion: {listed}"
+        )
+
+    op.execute(
+        "DELETE FROM user_forum WHERE id_member NOT IN "
+        "(SELECT MIN(id_member) FROM user_forum GROUP BY id_user, id_forum)"
+    )
+    op.execute(
+        "DELETE FROM follower WHERE id_follower NOT IN "
+        "(SELECT MIN(id_follower) FROM follower GROUP BY id_user, follower_id)"
+    )
+    with op.batch_alter_table('user_forum') as batch:
+        batch.create_unique_constraint('uq_user_forum_user_forum', ['id_user', 'id_forum'])
+    with op.batch_alter_table('follower') as batch:
+        batch.create_unique_constraint('uq_follower_user_follower', ['id_user', 'follower_id'])
+
+    for name, table, columns, unique in INDEXES:
+        op.create_index(name, table, columns, unique=unique)
+
+
+def downgrade():
+    for name, table, columns, unique in reversed(INDEXES):
+        op.drop_index(name, table_name=table)
+    with op.batch_alter_table('follower') as batch:
+        batch.drop_constraint('uq_follower_user_follower', type_='unique')
+    with op.batch_alter_table('user_forum') as batch:
+        batch.drop_constraint('uq_user_forum_user_forum', type_='unique')
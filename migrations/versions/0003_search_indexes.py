@@ -0,0 +1,67 @@
+"""full-text and trigram search indexes
+
+Solo aplica en Postgres. Crea las extensiones unaccent y pg_trgm, la funcion inmutable
+f_unaccent (unaccent no es IMMUTABLE y no puede usarse directamente en un indice), los
+indices GIN de texto completo que usa /search y los indices trigram que aceleran los
+ILIKE '%...%' de los endpoints /.../search/{name}.
+
+Las expresiones de los indices deben coincidir con SEARCH_TARGETS en
+app/shared/utils/search_engine.py para que el planner los use.
+
+Revision ID: 0003_search
+Revises: 0002_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = '0003_search'
+down_revision = '0002_indexes'
+branch_labels = None
+depends_on = None
+
+
+def weighted(column, weight):
+    return f"setweight(to_tsvector('spanish'::regconfig, f_unaccent(coalesce({column}, ''))), '{weight}')"
+
+
+# (nombre, tabla, [(columna, peso)])
+FULL_TEXT_INDEXES = [
+    ('ix_forum_posts_search', 'forum_posts', [('title', 'A'), ('tag', 'A'), ('content', 'B')]),
+    ('ix_forum_search', 'forum', [('name', 'A'), ('description', 'B')]),
+    ('ix_user_search', 'user', [('name', 'A'), ('lastname', 'A')]),
+    ('ix_sale_posts_search', 'sale_posts', [('title', 'A'), ('description', 'B')]),
+]
+
+# (nombre, tabla, columna)
+TRIGRAM_INDEXES = [
+    ('ix_forum_posts_title_trgm', 'forum_posts', 'title'),
+    ('ix_forum_name_trgm', 'forum', 'name'),
+    ('ix_user_name_trgm', 'user', 'name'),
+    ('ix_sale_posts_title_trgm', 'sale_posts', 'title'),
+]
+
+
+def upgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS unaccent")
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE OR REPLACE FUNCTION f_unaccent(text) RETURNS text "
+        "LANGUAGE sql IMMUTABLE PARALLEL SAFE STRICT AS "
+        "$$ SELECT public.unaccent('public.unaccent'::regdictionary, $1) $$"
+    )
+    for name, table, fields in FULL_TEXT_INDEXES:
+        document = " || ".join(weighted(column, weight) for column, weight in fields)
+        op.execute(f'CREATE INDEX {name} ON "{table}" USING GIN (({document}))')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.execute(f'CREATE INDEX {name} ON "{table}" USING GIN ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, _, _ in TRIGRAM_INDEXES + FULL_TEXT_INDEXES:
+        op.execute(f"DROP INDEX IF EXISTS {name}")
+    op.execute("DROP FUNCTION IF EXISTS f_unaccent(text)")
@@ -0,0 +1,42 @@
+"""message sync columns
+
+updated_at y deleted_at en messages y sale_message para la sincronizacion
+incremental; updated_at se inicializa con date_message.
+
+Revision ID: 0004_message_sync
+Revises: 0003_search
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0004_message_sync'
+down_revision = '0003_search'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna del chat, llave primaria)
+TABLES = [
+    ('messages', 'chat_id', 'id_message'),
+    ('sale_message', 'sale_chat_id', 'id_sale_message'),
+]
+
+
+def upgrade():
+    for table, chat_column, pk in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column('updated_at', sa.DateTime, nullable=True))
+            batch.add_column(sa.Column('deleted_at', sa.DateTime, nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = date_message")
+        with op.batch_alter_table(table) as batch:
+            batch.alter_column('updated_at', existing_type=sa.DateTime, nullable=False)
+        op.create_index(f'ix_{table}_{chat_column}_updated_at', table, [chat_column, 'updated_at', pk])
+
+
+def downgrade():
+    for table, chat_column, pk in TABLES:
+        op.drop_index(f'ix_{table}_{chat_column}_updated_at', table_name=table)
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column('deleted_at')
+            batch.drop_column('updated_at')
@@ -0,0 +1,42 @@
+"""chat read markers
+
+Tablas chat_read_marker y sale_chat_read_marker para los contadores de no leidos del inbox.
+
+Revision ID: 0005_read_markers
+Revises: 0004_message_sync
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0005_read_markers'
+down_revision = '0004_message_sync'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna del chat, tabla del chat, columna referenciada, nombre de la restriccion unica)
+TABLES = [
+    ('chat_read_marker', 'chat_id', 'chat', 'id_chat', 'uq_chat_read_marker_user_chat'),
+    ('sale_chat_read_marker', 'sale_chat_id', 'sale_chat', 'id_sale_chat', 'uq_sale_chat_read_marker_user_sale_chat'),
+]
+
+
+def upgrade():
+    for table, chat_column, chat_table, chat_pk, unique_name in TABLES:
+        op.create_table(
+            table,
+            sa.Column('id_marker', sa.Integer, primary_key=True, autoincrement=True),
+            sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id_user', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+            sa.Column(chat_column, sa.Integer, sa.ForeignKey(f'{chat_table}.{chat_pk}', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+            sa.Column('last_read_message_id', sa.Integer, nullable=False),
+            sa.Column('read_at', sa.DateTime, nullable=False),
+            sa.UniqueConstraint('user_id', chat_column, name=unique_name),
+        )
+        op.create_index(f'ix_{table}_{chat_column}', table, [chat_column])
+
+
+def downgrade():
+    for table, chat_column, _, _, _ in reversed(TABLES):
+        op.drop_index(f'ix_{table}_{chat_column}', table_name=table)
+        op.drop_table(table)
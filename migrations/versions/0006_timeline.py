@@ -0,0 +1,36 @@
+"""home timeline
+
+Tabla timeline_entry para el feed precalculado. Los timelines de usuarios existentes
+se construyen al vuelo la primera vez que piden su feed.
+
+Revision ID: 0006_timeline
+Revises: 0005_read_markers
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0006_timeline'
+down_revision = '0005_read_markers'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'timeline_entry',
+        sa.Column('id_entry', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('user_id', sa.Integer, sa.ForeignKey('user.id_user', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('post_id', sa.Integer, sa.ForeignKey('forum_posts.id_post', ondelete='CASCADE', onupdate='CASCADE'), nullable=False),
+        sa.Column('publication_date', sa.DateTime, nullable=False),
+        sa.UniqueConstraint('user_id', 'post_id', name='uq_timeline_entry_user_post'),
+    )
+    op.create_index('ix_timeline_entry_post_id', 'timeline_entry', ['post_id'])
+    op.create_index('ix_timeline_entry_user_id_publication_date', 'timeline_entry', ['user_id', 'publication_date', 'post_id'])
+
+
+def downgrade():
+    op.drop_index('ix_timeline_entry_user_id_publication_date', table_name='timeline_entry')
+    op.drop_index('ix_timeline_entry_post_id', table_name='timeline_entry')
+    op.drop_table('timeline_entry')
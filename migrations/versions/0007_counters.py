@@ -0,0 +1,44 @@
+"""denormalized counters
+
+Contadores mantenidos por los endpoints: comment_count en forum_posts, post_count y
+member_count en forum, follower_count y following_count en user. Se inicializan desde las
+tablas hijas; despues se pueden recalcular con `python -m app.shared.utils.counters`.
+
+Revision ID: 0007_counters
+Revises: 0006_timeline
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0007_counters'
+down_revision = '0006_timeline'
+branch_labels = None
+depends_on = None
+
+# (tabla, columna, clave primaria, tabla hija, clave foranea)
+COUNTERS = [
+    ('forum_posts', 'comment_count', 'id_post', 'comment', 'post_id'),
+    ('forum', 'post_count', 'id_forum', 'forum_posts', 'forum_id'),
+    ('forum', 'member_count', 'id_forum', 'user_forum', 'id_forum'),
+    ('user', 'follower_count', 'id_user', 'follower', 'id_user'),
+    ('user', 'following_count', 'id_user', 'follower', 'follower_id'),
+]
+
+
+def upgrade():
+    for table, column, _, _, _ in COUNTERS:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column(column, sa.Integer, nullable=False, server_default='0'))
+    for table, column, pk, child, fk in COUNTERS:
+        op.execute(
+            f'UPDATE "{table}" SET {column} = '
+            f'(SELECT COUNT(*) FROM "{child}" WHERE "{child}".{fk} = "{table}".{pk})'
+        )
+
+
+def downgrade():
+    for table, column, _, _, _ in reversed(COUNTERS):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
@@ -0,0 +1,38 @@
+"""image variants
+
+Columnas JSON con las URLs de las variantes redimensionadas de cada imagen. Las imagenes
+existentes se procesan con `python -m app.shared.utils.image_variants`.
+
+Revision ID: 0008_image_variants
+Revises: 0007_counters
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0008_image_variants'
+down_revision = '0007_counters'
+branch_labels = None
+depends_on = None
+
+COLUMNS = [
+    ('post_files', 'variants'),
+    ('forum', 'image_variants'),
+    ('forum', 'background_image_variants'),
+    ('user', 'profile_image_variants'),
+    ('user', 'background_image_variants'),
+    ('sale_posts', 'image_variants'),
+]
+
+
+def upgrade():
+    for table, column in COLUMNS:
+        with op.batch_alter_table(table) as batch:
+            batch.add_column(sa.Column(column, sa.JSON, nullable=True))
+
+
+def downgrade():
+    for table, column in reversed(COLUMNS):
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column(column)
@@ -0,0 +1,40 @@
+"""background jobs
+
+Cola de trabajos en segundo plano (ver app/shared/utils/jobs.py).
+
+Revision ID: 0009_jobs
+Revises: 0008_image_variants
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0009_jobs'
+down_revision = '0008_image_variants'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'job',
+        sa.Column('id_job', sa.Integer, primary_key=True, autoincrement=True),
+        sa.Column('kind', sa.String(100), nullable=False),
+        sa.Column('payload', sa.JSON, nullable=False),
+        sa.Column('status', sa.Enum('Pendiente', 'EnCurso', 'Fallido', name='jobstatus'), nullable=False),
+        sa.Column('attempts', sa.Integer, nullable=False),
+        sa.Column('max_attempts', sa.Integer, nullable=False),
+        sa.Column('run_at', sa.DateTime, nullable=False),
+        sa.Column('locked_at', sa.DateTime, nullable=True),
+        sa.Column('locked_by', sa.String(100), nullable=True),
+        sa.Column('last_error', sa.Text, nullable=True),
+        sa.Column('created_at', sa.DateTime, nullable=False),
+    )
+    op.create_index('ix_job_status_run_at', 'job', ['status', 'run_at'])
+
+
+def downgrade():
+    op.drop_index('ix_job_status_run_at', table_name='job')
+    op.drop_table('job')
+    sa.Enum(name='jobstatus').drop(op.get_bind(), checkfirst=True)
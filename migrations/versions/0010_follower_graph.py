@@ -0,0 +1,28 @@
+"""follower graph indexes
+
+Indices (id_user, id_follower) y (follower_id, id_follower) para paginar seguidores y
+seguidos sin ordenar en memoria. El segundo reemplaza a ix_follower_follower_id.
+
+Revision ID: 0010_follower_graph
+Revises: 0009_jobs
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+
+revision = '0010_follower_graph'
+down_revision = '0009_jobs'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_follower_id_user_id_follower', 'follower', ['id_user', 'id_follower'])
+    op.create_index('ix_follower_follower_id_id_follower', 'follower', ['follower_id', 'id_follower'])
+    op.drop_index('ix_follower_follower_id', table_name='follower')
+
+
+def downgrade():
+    op.create_index('ix_follower_follower_id', 'follower', ['follower_id'])
+    op.drop_index('ix_follower_follower_id_id_follower', table_name='follower')
+    op.drop_index('ix_follower_id_user_id_follower', table_name='follower')
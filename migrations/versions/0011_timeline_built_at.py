@@ -0,0 +1,31 @@
+"""timeline built marker
+
+timeline_built_at en user marca que el timeline del feed ya se construyo, aunque este
+vacio. Los usuarios que ya tienen entradas se marcan como construidos.
+
+Revision ID: 0011_timeline_built_at
+Revises: 0010_follower_graph
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+revision = '0011_timeline_built_at'
+down_revision = '0010_follower_graph'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('user') as batch:
+        batch.add_column(sa.Column('timeline_built_at', sa.DateTime, nullable=True))
+    op.execute(
+        'UPDATE "user" SET timeline_built_at = CURRENT_TIMESTAMP '
+        'WHERE id_user IN (SELECT DISTINCT user_id FROM timeline_entry)'
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('user') as batch:
+        batch.drop_column('timeline_built_at')